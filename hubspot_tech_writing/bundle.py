@@ -0,0 +1,170 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import threading
+import types
+import typing as t
+import zipfile
+from pathlib import Path
+
+from hubspot_tech_writing.util.common import cache_directory
+from hubspot_tech_writing.util.html import HTMLImageTranslator
+from hubspot_tech_writing.util.image import ImageOptimizer
+from hubspot_tech_writing.util.io import file_digest, text_digest
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class BundleImage:
+    name: str
+    digest: str
+    path: str
+
+    @property
+    def placeholder(self) -> str:
+        return f"{Bundle.PLACEHOLDER_PREFIX}{self.digest}"
+
+
+class Bundle:
+    """
+    A self-contained, content-addressed artifact of a converted document, which can
+    be published to HubSpot without converting the document again.
+
+    The bundle is a ZIP file, containing the final HTML with placeholders for images,
+    the images, optimized when requested, stored by content hash, and `bundle.json`,
+    describing them. Bundles built from the same inputs are identical byte by byte.
+    """
+
+    VERSION = 1
+    METADATA = "bundle.json"
+    HTML = "post.html"
+    PLACEHOLDER_PREFIX = "hstw-image:"
+
+    # A fixed timestamp for all bundle members, in order to build reproducible bundles.
+    TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+
+    def __init__(self, name: str, html: str, images: t.Optional[t.List[BundleImage]] = None):
+        self.name = name
+        self.html = html
+        self.images = images or []
+        # Image files, by bundle member path, when building.
+        self.files: t.Dict[str, Path] = {}
+
+    def __str__(self):
+        return f"{self.__class__.__name__} name={self.name}, images={len(self.images)}, digest={self.digest}"
+
+    @property
+    def digest(self) -> str:
+        """
+        Identify the bundle by the content hashes of its HTML and images.
+        """
+        parts = [self.name, text_digest(self.html)] + sorted(image.digest for image in self.images)
+        return text_digest("\n".join(parts))
+
+    @classmethod
+    def build(
+        cls,
+        source: t.Union[str, Path],
+        html: str,
+        name: t.Optional[str] = None,
+        optimizer: t.Optional[ImageOptimizer] = None,
+    ) -> "Bundle":
+        """
+        Collect the local images of a converted document, and replace their references by placeholders.
+        """
+        bundle = cls(name=name or Path(source).stem, html=html)
+        lock = threading.Lock()
+
+        def collect(source: t.Union[str, Path], name: str):
+            digest = file_digest(source)
+            image = BundleImage(name=name, digest=digest, path=f"images/{digest}{Path(source).suffix.lower()}")
+            with lock:
+                if image.path not in bundle.files:
+                    bundle.images.append(image)
+                    bundle.files[image.path] = Path(source)
+            return types.SimpleNamespace(url=image.placeholder)
+
+        hit = HTMLImageTranslator(html=html, source_path=source, uploader=collect, optimizer=optimizer)
+        hit.discover().process()
+        bundle.html = str(hit.html_out)
+        bundle.images.sort(key=lambda image: image.path)
+        return bundle
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "version": self.VERSION,
+            "name": self.name,
+            "digest": self.digest,
+            "html": {"path": self.HTML, "digest": text_digest(self.html)},
+            "images": [dataclasses.asdict(image) for image in self.images],
+        }
+
+    def write(self, path: t.Union[str, Path]) -> Path:
+        """
+        Write bundle to ZIP file.
+        """
+        path = Path(path)
+        logger.info(f"Writing bundle: {path} ({self})")
+
+        def member(name: str, compress: bool) -> zipfile.ZipInfo:
+            info = zipfile.ZipInfo(name, date_time=self.TIMESTAMP)
+            info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            return info
+
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr(member(self.METADATA, True), json.dumps(self.to_dict(), indent=2, sort_keys=True))
+            archive.writestr(member(self.HTML, True), self.html)
+            # Images are compressed already.
+            for image in self.images:
+                with archive.open(member(image.path, False), "w") as target, open(self.files[image.path], "rb") as fp:
+                    while chunk := fp.read(1024 * 1024):
+                        target.write(chunk)
+        return path
+
+    @classmethod
+    def read(cls, path: t.Union[str, Path], directory: t.Optional[t.Union[str, Path]] = None) -> "Bundle":
+        """
+        Read bundle from ZIP file, and extract its images into a content-addressed directory,
+        verifying their content hashes.
+        """
+        directory = Path(directory) if directory else cache_directory() / "bundles"
+        with zipfile.ZipFile(path) as archive:
+            data = json.loads(archive.read(cls.METADATA))
+            if data.get("version") != cls.VERSION:
+                raise ValueError(f"Unsupported bundle version: {data.get('version')}")
+            bundle = cls(
+                name=data["name"],
+                html=archive.read(data["html"]["path"]).decode("utf-8"),
+                images=[BundleImage(**image) for image in data["images"]],
+            )
+            if text_digest(bundle.html) != data["html"]["digest"]:
+                raise ValueError(f"Bundle is corrupt, HTML does not match its digest: {path}")
+            for image in bundle.images:
+                target = directory / Path(image.path).name
+                if not target.exists():
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    tmppath = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+                    with archive.open(image.path) as fp, open(tmppath, "wb") as out:
+                        digest = hashlib.sha256()
+                        while chunk := fp.read(1024 * 1024):
+                            digest.update(chunk)
+                            out.write(chunk)
+                    if digest.hexdigest() != image.digest:
+                        tmppath.unlink()
+                        raise ValueError(f"Bundle is corrupt, image does not match its digest: {image.path}")
+                    tmppath.replace(target)
+                bundle.files[image.path] = target
+        logger.info(f"Read bundle: {path} ({bundle})")
+        return bundle
+
+    def render(self, urls: t.Dict[str, str]) -> str:
+        """
+        Replace image placeholders by URLs, given by bundle member path.
+        """
+        html = self.html
+        for image in self.images:
+            html = html.replace(image.placeholder, urls[image.path])
+        return html
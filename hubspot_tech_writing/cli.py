@@ -5,8 +5,27 @@ import typing as t
 import click
 from click_aliases import ClickAliasedGroup
 
-from hubspot_tech_writing.core import convert, delete_blogpost, delete_file, linkcheck, upload
+from hubspot_tech_writing.core import (
+    Portal,
+    build,
+    convert,
+    delete_blogpost,
+    delete_blogposts,
+    delete_file,
+    delete_files,
+    export,
+    linkcheck,
+    publish,
+    publish_bundle,
+    publish_bundles,
+    upload,
+    upload_many,
+)
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.serve import JobRunner, serve
 from hubspot_tech_writing.util.cli import boot_click, docstring_format_verbatim, make_command
+from hubspot_tech_writing.util.image import ImageOptimizer
+from hubspot_tech_writing.util.store import BlogPostIndex, PublishJournal, UploadManifest
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +97,143 @@ def help_upload():
     # and upload to HubSpot in one go.
     hstw upload https://github.com/tech-writing/hubspot-tech-writing/raw/main/tests/data/hubspot-blog-post-original.md --name=testdrive
 
+    # Files are only uploaded when their content changed since the last upload,
+    # and blog posts are updated without looking them up by name again.
+    # The upload manifest and blog post index are stored per HubSpot portal in
+    # `~/.cache/hubspot-tech-writing`. Use `--manifest-file=` to choose a different
+    # location for the upload manifest, or `--no-manifest` to always upload all files,
+    # and to look up all blog posts.
+    hstw upload document.md --folder-path=/blog/2023/topic --no-manifest
+
+    # Upload many documents at once. They are converted concurrently, images
+    # they share are uploaded only once, and blog posts are created and updated
+    # using batch requests.
+    hstw upload docs/*.md --content-group-id=26956288532 --folder-path=/blog/2023/topic
+
+    # When an upload got interrupted, continue where it stopped, skipping
+    # the images and blog posts the previous run uploaded already. Invoke it
+    # with the same sources and name. Use `--no-journal` to skip recording
+    # completed steps, when interrupted runs do not need to be resumed.
+    hstw upload docs/*.md --content-group-id=26956288532 --folder-path=/blog/2023/topic --resume
+
+    # Downscale images wider than 1600 pixels, and recompress them, before uploading.
+    # Optimized images are cached, so each image is optimized only once. This needs
+    # the Pillow package, install it using `pip install 'hubspot-tech-writing[image]'`.
+    hstw upload document.md --folder-path=/blog/2023/topic --optimize-images --max-image-width=1600
+
+    # Also generate narrower variants of images, and reference them using `srcset`,
+    # so browsers on small screens download smaller images. Variants are cached,
+    # and uploaded only once, like optimized images.
+    hstw upload document.md --folder-path=/blog/2023/topic --image-widths=480,960,1920
+
+    # Publish to multiple HubSpot portals, like staging and production, at once.
+    # Documents are converted, and images are optimized, only once. Each portal
+    # uses its own upload manifest and rate limiter. Using the environment
+    # variable, separate access tokens by whitespace.
+    hstw upload document.md --folder-path=/blog/2023/topic --access-token=pat-na1-staging --access-token=pat-na1-production
+
+    # Compress large request bodies, like updates of long blog posts, using gzip.
+    # When the server rejects compressed requests, they are sent uncompressed.
+    hstw upload document.md --folder-path=/blog/2023/topic --compress
+
+    # Report API calls per endpoint, latencies, transferred bytes, retries,
+    # and cache hits at the end of the run, and write them to a JSON file.
+    hstw --metrics-file=metrics.json upload document.md --folder-path=/blog/2023/topic
+
+    """  # noqa: E501
+
+
+def help_build():
+    """
+    Convert a document, and write it into a bundle, for publishing it later, once or many times.
+
+    The bundle contains the final HTML, with placeholders for images, and the images,
+    optimized when requested. Bundles built from the same inputs are identical.
+
+    Synopsis
+    ========
+
+    # Build bundle from Markdown file.
+    hstw build document.md -o document.bundle
+
+    # Optimize images while building the bundle.
+    hstw build document.md -o document.bundle --optimize-images --max-image-width=1600
+
+    # Also include narrower variants of images, for responsive images.
+    hstw build document.md -o document.bundle --image-widths=480,960,1920
+
+    """  # noqa: E501
+
+
+def help_publish():
+    """
+    Publish a bundle built by `hstw build` to the HubSpot API, without converting the document again.
+
+    Synopsis
+    ========
+
+    # Publish bundle to a Blog (content group), uploading its images to a folder.
+    hstw publish document.bundle --content-group-id=26956288532 --folder-path=/blog/2023/topic
+
+    # Promote the same bundle to multiple HubSpot portals, like staging and production.
+    hstw publish document.bundle --folder-path=/blog/2023/topic --access-token=pat-na1-staging --access-token=pat-na1-production
+
+    """  # noqa: E501
+
+
+def help_export():
+    """
+    Export blog posts from the HubSpot API to local files.
+
+    Synopsis
+    ========
+
+    # Export all blog posts of a Blog (content group) to the `out` directory.
+    # Each blog post is written to `out/posts/<id>.html`, and its metadata to
+    # `out/posts/<id>.json`. Running it again only exports blog posts which
+    # have been updated since the previous export.
+    hstw export out --content-group-id=26956288532
+
+    # Also download images hosted on HubSpot, referenced by blog posts, to `out/images`.
+    hstw export out --content-group-id=26956288532 --images
+
+    # Write all blog posts to a single JSONL file, `out/posts.jsonl`, one per line.
+    hstw export out --content-group-id=26956288532 --format=jsonl
+
+    """  # noqa: E501
+
+
+def help_serve():
+    """
+    Run a long-running server, which accepts convert, linkcheck, and upload jobs.
+
+    The converter, the HubSpot API clients and their connections, and all caches
+    stay resident, so each job only pays for its actual work. Jobs are JSON
+    documents, submitted using `POST /<job>`. They are run concurrently.
+
+    On TCP ports, clients authenticate using a secret token, which is generated
+    when the server starts, and written to a file only accessible to the current
+    user. Requests from web browsers are rejected.
+
+    Synopsis
+    ========
+
+    # Serve jobs on http://127.0.0.1:8765, using the access token from the environment.
+    hstw serve --token-file=/tmp/hstw.token
+
+    # Serve jobs on a Unix domain socket, only accessible to the current user.
+    hstw serve --socket=/tmp/hstw.sock
+
+    # Submit jobs.
+    export AUTH="Authorization: Bearer $(cat /tmp/hstw.token)"
+    curl --json '{"source": "/path/to/article.md"}' -H "$AUTH" http://127.0.0.1:8765/convert
+    curl --json '{"text": "# Hello"}' --unix-socket /tmp/hstw.sock http://localhost/convert
+    curl --json '{"source": "/path/to/article.md"}' -H "$AUTH" http://127.0.0.1:8765/linkcheck
+    curl --json '{"source": "/path/to/article.md", "name": "testdrive", "folder_path": "/blog/testdrive"}' -H "$AUTH" http://127.0.0.1:8765/upload
+
+    # Display server status, including the number of completed and failed jobs.
+    curl -H "$AUTH" http://127.0.0.1:8765/status
+
     """  # noqa: E501
 
 
@@ -85,8 +241,8 @@ def help_delete():
     """
     Delete blog posts or files.
 
-    The program will prompt you about deleting items, per item, after
-    presenting a representation to be able to identify it.
+    The program will prompt you about deleting items once, after
+    presenting a summary to be able to identify them.
 
     In order to acknowledge delete operations upfront, define the environment
     variable `CONFIRM=yes`.
@@ -105,6 +261,24 @@ def help_delete():
 
     # Delete file by path.
     hstw delete file --path=/testdrive/foo.png
+
+    Bulk operations
+    ===============
+
+    # Delete all blog posts of a Blog (content group) matching a name pattern.
+    hstw delete posts --content-group-id=26956288532 --pattern='testdrive-*'
+
+    # Delete all files within a folder hierarchy.
+    hstw delete files --path-prefix=/testdrive
+
+    # Delete all PNG files within a folder hierarchy.
+    hstw delete files --path-prefix=/testdrive --pattern='*.png'
+
+    Deleted files are removed from the upload manifest of the HubSpot portal.
+    When uploading with `--manifest-file=`, use the same option when deleting.
+
+    # Delete files, and remove them from a custom upload manifest.
+    hstw delete files --path-prefix=/testdrive --manifest-file=manifest.json
     """  # noqa: E501
 
 
@@ -121,18 +295,169 @@ path_option = click.option(
     required=False,
     help="The path to the file on HubSpot hubfs",
 )
+pattern_option = click.option(
+    "--pattern",
+    type=str,
+    required=False,
+    help="Shell-style wildcard pattern for matching item names, like `testdrive-*`",
+)
+manifest_file_option = click.option(
+    "--manifest-file",
+    type=click.Path(dir_okay=False),
+    required=False,
+    help="The upload manifest file to remove deleted files from. "
+    "By default, it is stored per HubSpot portal in the user's cache directory.",
+)
+no_manifest_option = click.option(
+    "--no-manifest",
+    is_flag=True,
+    required=False,
+    help="Do not remove deleted files from the upload manifest.",
+)
 access_token_option = click.option(
     "--access-token", type=str, required=False, envvar="HUBSPOT_ACCESS_TOKEN", help="HubSpot API access token"
 )
 
+access_tokens_option = click.option(
+    "--access-token",
+    "access_tokens",
+    type=str,
+    multiple=True,
+    envvar="HUBSPOT_ACCESS_TOKEN",
+    help="HubSpot API access token. Use multiple times for publishing to multiple portals.",
+)
+
+
+def parse_widths(ctx: click.Context, param: click.Parameter, value: t.Optional[str]) -> t.List[int]:
+    if not value:
+        return []
+    try:
+        widths = [int(width) for width in value.split(",") if width.strip()]
+    except ValueError as ex:
+        raise click.BadParameter("Use comma-separated widths in pixels, like `480,960,1920`") from ex
+    if any(width <= 0 for width in widths):
+        raise click.BadParameter("Widths must be positive")
+    return widths
+
+
+image_widths_option = click.option(
+    "--image-widths",
+    type=str,
+    callback=parse_widths,
+    required=False,
+    help="Also generate variants of images with these comma-separated widths, like `480,960,1920`, "
+    "and reference them as responsive images. Implies `--optimize-images`.",
+)
+
+
+def make_optimizer(
+    optimize_images: bool, max_image_width: int, image_widths: t.List[int]
+) -> t.Optional[ImageOptimizer]:
+    if not optimize_images and not image_widths:
+        return None
+    return ImageOptimizer(max_width=max_image_width, widths=image_widths)
+
+
+def unique_access_tokens(access_tokens: t.Sequence[str]) -> t.List[str]:
+    """
+    Publish to each portal only once, even when its access token is given multiple times.
+    """
+    unique = list(dict.fromkeys(access_tokens))
+    if len(unique) < len(access_tokens):
+        logger.warning(f"Ignoring {len(access_tokens) - len(unique)} duplicate access tokens")
+    return unique
+
+
+def make_manifest(access_token: str, manifest_file: t.Optional[str], no_manifest: bool) -> t.Optional[UploadManifest]:
+    """
+    Select the upload manifest of a HubSpot portal, or the given manifest file.
+    """
+    if no_manifest:
+        return None
+    if manifest_file:
+        return UploadManifest(path=manifest_file)
+    return UploadManifest.for_access_token(access_token)
+
+
+def make_portal(
+    access_token: str,
+    manifest_file: t.Optional[str],
+    no_manifest: bool,
+    resume: bool,
+    compress: bool = False,
+    sources: t.Sequence[str] = (),
+    name: t.Optional[str] = None,
+    no_journal: bool = False,
+) -> Portal:
+    """
+    Set up the upload manifest, blog post index, and journal of a HubSpot portal.
+    The journal is specific to the published sources and blog post name.
+    """
+    if resume and no_journal:
+        raise click.UsageError("The `--resume` option can not be used together with `--no-journal`")
+    portal = Portal(access_token=access_token)
+    if compress:
+        portal.hubspot_adapter = HubSpotAdapter(access_token=access_token, compression=True)
+    portal.manifest = make_manifest(access_token, manifest_file, no_manifest)
+    if portal.manifest is not None:
+        portal.blogpost_index = BlogPostIndex.for_access_token(access_token)
+
+    # Record completed steps, so an interrupted run can be resumed. The journal is discarded on success.
+    if no_journal:
+        return portal
+    portal.journal = PublishJournal.for_access_token(access_token, sources=sources, name=name)
+    if resume:
+        logger.info(f"Resuming upload: {portal.journal}")
+    else:
+        portal.journal.reset()
+    return portal
+
 
 @click.group(cls=ClickAliasedGroup)
 @click.version_option(package_name="hubspot-tech-writing")
 @click.option("--verbose", is_flag=True, required=False, help="Turn on logging")
 @click.option("--debug", is_flag=True, required=False, help="Turn on logging with debug level")
+@click.option(
+    "--metrics", "with_metrics", is_flag=True, required=False, help="Display summary of API call metrics at the end"
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    required=False,
+    help="Write API call metrics to JSON file, and display their summary at the end",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    required=False,
+    help="Display wall clock and CPU time spent per processing stage at the end",
+)
+@click.option(
+    "--profile-file",
+    type=click.Path(dir_okay=False),
+    required=False,
+    help="Also profile all function calls, of all threads, display the most expensive ones at the end, "
+    "and write the statistics to a `.prof` file, for `pstats` or `snakeviz`",
+)
 @click.pass_context
-def cli(ctx: click.Context, verbose: bool, debug: bool):
-    return boot_click(ctx, verbose, debug)
+def cli(
+    ctx: click.Context,
+    verbose: bool,
+    debug: bool,
+    with_metrics: bool,
+    metrics_file: str,
+    profile: bool,
+    profile_file: str,
+):
+    return boot_click(
+        ctx,
+        verbose,
+        debug,
+        with_metrics=with_metrics,
+        metrics_file=metrics_file,
+        profile=profile,
+        profile_file=profile_file,
+    )
 
 
 @make_command(cli, "convert", help_convert)
@@ -159,7 +484,7 @@ def linkcheck_cli(source: str):
 
 
 @make_command(cli, "upload", help_upload)
-@click.argument("source")
+@click.argument("sources", nargs=-1, required=True)
 @click.option(
     "--name",
     type=str,
@@ -184,16 +509,405 @@ def linkcheck_cli(source: str):
     required=False,
     help="The folder path for storing files. Alternatively, use folder id.",
 )
+@click.option(
+    "--manifest-file",
+    type=click.Path(dir_okay=False),
+    required=False,
+    help="The upload manifest file. By default, it is stored per HubSpot portal in the user's cache directory.",
+)
+@click.option(
+    "--no-manifest",
+    is_flag=True,
+    required=False,
+    help="Do not use the upload manifest and blog post index, and upload all files again.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    required=False,
+    help="Continue an interrupted upload, skipping the steps the previous run completed.",
+)
+@click.option(
+    "--no-journal",
+    is_flag=True,
+    required=False,
+    help="Do not record completed steps, which makes interrupted runs impossible to resume, but saves disk writes.",
+)
+@click.option(
+    "--optimize-images",
+    is_flag=True,
+    required=False,
+    help="Downscale and recompress images referenced by documents before uploading them.",
+)
+@click.option(
+    "--max-image-width",
+    type=int,
+    default=2000,
+    show_default=True,
+    help="The maximum width of optimized images, in pixels.",
+)
+@click.option(
+    "--compress",
+    is_flag=True,
+    required=False,
+    help="Compress large request bodies, like blog post updates, using gzip.",
+)
+@image_widths_option
+@access_tokens_option
+def upload_cli(
+    access_tokens: t.Tuple[str, ...],
+    sources: t.Tuple[str, ...],
+    name: str,
+    content_group_id: str,
+    folder_id: str,
+    folder_path: str,
+    manifest_file: str,
+    no_manifest: bool,
+    resume: bool,
+    no_journal: bool,
+    optimize_images: bool,
+    max_image_width: int,
+    compress: bool,
+    image_widths: t.List[int],
+):
+    if len(sources) > 1 and name:
+        raise click.UsageError("The `--name` option can not be used when uploading multiple files")
+    if len(set(access_tokens)) > 1 and manifest_file:
+        raise click.UsageError("The `--manifest-file` option can not be used when publishing to multiple portals")
+    portals = [
+        make_portal(
+            access_token,
+            manifest_file=manifest_file,
+            no_manifest=no_manifest,
+            resume=resume,
+            compress=compress,
+            sources=sources,
+            name=name,
+            no_journal=no_journal,
+        )
+        for access_token in unique_access_tokens(access_tokens) or [""]
+    ]
+
+    optimizer = make_optimizer(optimize_images, max_image_width, image_widths)
+    try:
+        if len(portals) > 1:
+            published = publish(
+                portals=portals,
+                sources=list(sources),
+                name=name,
+                content_group_id=content_group_id,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                optimizer=optimizer,
+            )
+            if len(published) < len(portals):
+                logger.error(
+                    f"Publishing to {len(portals) - len(published)} of {len(portals)} portals failed. "
+                    f"Exiting with an error."
+                )
+                raise SystemExit(1)
+        elif len(sources) > 1:
+            portal = portals[0]
+            results = upload_many(
+                access_token=portal.access_token,
+                sources=list(sources),
+                content_group_id=content_group_id,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                manifest=portal.manifest,
+                hubspot_adapter=portal.hubspot_adapter,
+                blogpost_index=portal.blogpost_index,
+                journal=portal.journal,
+                optimizer=optimizer,
+            )
+            if len(results) < len(sources):
+                logger.error(
+                    f"Uploading {len(sources) - len(results)} of {len(sources)} items failed. Exiting with an error."
+                )
+                raise SystemExit(1)
+        else:
+            portal = portals[0]
+            upload(
+                access_token=portal.access_token,
+                source=sources[0],
+                name=name,
+                content_group_id=content_group_id,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                manifest=portal.manifest,
+                hubspot_adapter=portal.hubspot_adapter,
+                blogpost_index=portal.blogpost_index,
+                journal=portal.journal,
+                optimizer=optimizer,
+            )
+    finally:
+        if optimizer is not None:
+            optimizer.close()
+    for portal in portals:
+        if portal.journal is not None:
+            portal.journal.reset()
+
+
+@make_command(cli, "build", help_build)
+@click.argument("source")
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False),
+    required=False,
+    help="The bundle file. By default, it is named after the blog post.",
+)
+@click.option(
+    "--name",
+    type=str,
+    required=False,
+    help="The name of the blog post. By default, the name will be derived from the file name.",
+)
+@click.option(
+    "--optimize-images",
+    is_flag=True,
+    required=False,
+    help="Downscale and recompress images referenced by the document.",
+)
+@click.option(
+    "--max-image-width",
+    type=int,
+    default=2000,
+    show_default=True,
+    help="The maximum width of optimized images, in pixels.",
+)
+@image_widths_option
+def build_cli(
+    source: str, output: str, name: str, optimize_images: bool, max_image_width: int, image_widths: t.List[int]
+):
+    optimizer = make_optimizer(optimize_images, max_image_width, image_widths)
+    try:
+        path = build(source=source, target=output, name=name, optimizer=optimizer)
+    finally:
+        if optimizer is not None:
+            optimizer.close()
+    click.echo(path)
+
+
+@make_command(cli, "publish", help_publish)
+@click.argument("bundle", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--name",
+    type=str,
+    required=False,
+    help="The name of the blog post. By default, the name stored in the bundle is used.",
+)
+@click.option(
+    "--content-group-id",
+    type=str,
+    required=False,
+    help="The Blog (content group) identifier. Needed when creating a post",
+)
+@click.option(
+    "--folder-id",
+    type=str,
+    required=False,
+    help="The folder id for storing images. Alternatively, use folder name.",
+)
+@click.option(
+    "--folder-path",
+    type=str,
+    required=False,
+    help="The folder path for storing images. Alternatively, use folder id.",
+)
+@click.option(
+    "--no-manifest",
+    is_flag=True,
+    required=False,
+    help="Do not use the upload manifest and blog post index, and upload all images again.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    required=False,
+    help="Continue an interrupted publish, skipping the steps the previous run completed.",
+)
+@click.option(
+    "--no-journal",
+    is_flag=True,
+    required=False,
+    help="Do not record completed steps, which makes interrupted runs impossible to resume, but saves disk writes.",
+)
+@click.option(
+    "--compress",
+    is_flag=True,
+    required=False,
+    help="Compress large request bodies, like blog post updates, using gzip.",
+)
+@access_tokens_option
+def publish_cli(
+    access_tokens: t.Tuple[str, ...],
+    bundle: str,
+    name: str,
+    content_group_id: str,
+    folder_id: str,
+    folder_path: str,
+    no_manifest: bool,
+    resume: bool,
+    no_journal: bool,
+    compress: bool,
+):
+    portals = [
+        make_portal(
+            access_token,
+            manifest_file=None,
+            no_manifest=no_manifest,
+            resume=resume,
+            compress=compress,
+            sources=[bundle],
+            name=name,
+            no_journal=no_journal,
+        )
+        for access_token in unique_access_tokens(access_tokens) or [""]
+    ]
+    if len(portals) > 1:
+        published = publish_bundles(
+            portals=portals,
+            bundle=bundle,
+            name=name,
+            content_group_id=content_group_id,
+            folder_id=folder_id,
+            folder_path=folder_path,
+        )
+    else:
+        portal = portals[0]
+        published = {
+            portal.label: publish_bundle(
+                access_token=portal.access_token,
+                bundle=bundle,
+                name=name,
+                content_group_id=content_group_id,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                manifest=portal.manifest,
+                hubspot_adapter=portal.hubspot_adapter,
+                blogpost_index=portal.blogpost_index,
+                journal=portal.journal,
+            )
+        }
+    # Keep the journals of failed portals, so publishing to them can be resumed.
+    for portal in portals:
+        if portal.label in published and portal.journal is not None:
+            portal.journal.reset()
+    if len(published) < len(portals):
+        logger.error(
+            f"Publishing to {len(portals) - len(published)} of {len(portals)} portals failed. Exiting with an error."
+        )
+        raise SystemExit(1)
+
+
+@make_command(cli, "export", help_export)
+@click.argument("target", type=click.Path(file_okay=False))
+@click.option(
+    "--content-group-id",
+    type=str,
+    required=False,
+    help="The Blog (content group) identifier. By default, blog posts of all blogs are exported.",
+)
+@click.option(
+    "--format",
+    "format_",
+    type=click.Choice(["html", "jsonl"]),
+    default="html",
+    show_default=True,
+    help="Write HTML and JSON files per blog post, or a single JSONL file.",
+)
+@click.option(
+    "--images",
+    is_flag=True,
+    required=False,
+    help="Download images hosted on HubSpot, referenced by blog posts.",
+)
 @access_token_option
-def upload_cli(access_token: str, source: str, name: str, content_group_id: str, folder_id: str, folder_path: str):
-    upload(
+def export_cli(access_token: str, target: str, content_group_id: str, format_: str, images: bool):
+    result = export(
         access_token=access_token,
-        source=source,
-        name=name,
+        target=target,
         content_group_id=content_group_id,
-        folder_id=folder_id,
-        folder_path=folder_path,
+        format=format_,
+        images=images,
+    )
+    if result.images_failed:
+        logger.error(f"Downloading {result.images_failed} images failed. Exiting with an error.")
+        raise SystemExit(1)
+
+
+@make_command(cli, "serve", help_serve)
+@click.option("--host", type=str, default="127.0.0.1", show_default=True, help="The address to listen on.")
+@click.option("--port", type=int, default=8765, show_default=True, help="The port to listen on.")
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    required=False,
+    help="Listen on a Unix domain socket instead of a TCP port.",
+)
+@click.option(
+    "--token-file",
+    "token_path",
+    type=click.Path(dir_okay=False),
+    required=False,
+    help="Where to write the secret token clients authenticate with. [default: serve.token in the cache directory]",
+)
+@click.option(
+    "--workers",
+    type=int,
+    required=False,
+    help=f"The maximum number of jobs to run concurrently. [default: {HubSpotAdapter.CONCURRENCY}]",
+)
+@click.option(
+    "--no-manifest",
+    is_flag=True,
+    required=False,
+    help="Do not use the upload manifest and blog post index, and upload all files again.",
+)
+@click.option(
+    "--optimize-images",
+    is_flag=True,
+    required=False,
+    help="Downscale and recompress images referenced by documents before uploading them.",
+)
+@click.option(
+    "--max-image-width",
+    type=int,
+    default=2000,
+    show_default=True,
+    help="The maximum width of optimized images, in pixels.",
+)
+@click.option(
+    "--compress",
+    is_flag=True,
+    required=False,
+    help="Compress large request bodies, like blog post updates, using gzip.",
+)
+@image_widths_option
+@access_token_option
+def serve_cli(
+    access_token: str,
+    host: str,
+    port: int,
+    socket_path: str,
+    token_path: str,
+    workers: int,
+    no_manifest: bool,
+    optimize_images: bool,
+    max_image_width: int,
+    compress: bool,
+    image_widths: t.List[int],
+):
+    runner = JobRunner(
+        access_token=access_token,
+        compress=compress,
+        manifest=not no_manifest,
+        optimizer=make_optimizer(optimize_images, max_image_width, image_widths),
+        workers=workers,
     )
+    serve(runner, host=host, port=port, socket_path=socket_path, token_path=token_path)
 
 
 @cli.group(cls=ClickAliasedGroup, help=docstring_format_verbatim(help_delete.__doc__))
@@ -217,6 +931,38 @@ def delete_blogpost_cli(access_token: str, id_: str, name: str):
 @make_command(delete, "file", help_delete)
 @id_option
 @path_option
+@manifest_file_option
+@no_manifest_option
+@access_token_option
+def delete_file_cli(access_token: str, id_: str, path: str, manifest_file: str, no_manifest: bool):
+    manifest = make_manifest(access_token, manifest_file, no_manifest)
+    delete_file(access_token=access_token, identifier=id_, path=path, manifest=manifest)
+
+
+@make_command(delete, "posts", help_delete, aliases=["blogposts"])
+@pattern_option
+@click.option(
+    "--content-group-id",
+    type=str,
+    required=False,
+    help="The Blog (content group) identifier.",
+)
+@access_token_option
+def delete_blogposts_cli(access_token: str, pattern: str, content_group_id: str):
+    delete_blogposts(access_token=access_token, name_pattern=pattern, content_group_id=content_group_id)
+
+
+@make_command(delete, "files", help_delete)
+@click.option(
+    "--path-prefix",
+    type=str,
+    required=False,
+    help="The folder path on HubSpot hubfs, including all subfolders",
+)
+@pattern_option
+@manifest_file_option
+@no_manifest_option
 @access_token_option
-def delete_file_cli(access_token: str, id_: str, path: str):
-    delete_file(access_token=access_token, identifier=id_, path=path)
+def delete_files_cli(access_token: str, path_prefix: str, pattern: str, manifest_file: str, no_manifest: bool):
+    manifest = make_manifest(access_token, manifest_file, no_manifest)
+    delete_files(access_token=access_token, path_prefix=path_prefix, name_pattern=pattern, manifest=manifest)
@@ -1,7 +1,10 @@
+import dataclasses
 import functools
 import logging
+import threading
 import typing as t
 import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 
@@ -9,16 +12,25 @@ import hubspot
 import markdown
 import mkdocs_linkcheck as lc
 from hubspot.cms.blogs.blog_posts import BlogPost
+from hubspot.files import File
 
+from hubspot_tech_writing.bundle import Bundle
+from hubspot_tech_writing.export import BlogExporter, ExportResult
 from hubspot_tech_writing.html import postprocess
 from hubspot_tech_writing.hubspot_api import HubSpotAdapter, HubSpotBlogPost, HubSpotFile
-from hubspot_tech_writing.util.common import ContentTypeResolver
+from hubspot_tech_writing.preflight import Preflight
+from hubspot_tech_writing.util.common import ContentTypeResolver, cache_directory
 from hubspot_tech_writing.util.html import HTMLImageTranslator
-from hubspot_tech_writing.util.io import to_io
+from hubspot_tech_writing.util.image import ImageOptimizer
+from hubspot_tech_writing.util.io import file_digest, text_digest, to_io
+from hubspot_tech_writing.util.pipeline import Pipeline
+from hubspot_tech_writing.util.profiling import profiled
+from hubspot_tech_writing.util.store import BlogPostIndex, PublishJournal, UploadManifest
 
 logger = logging.getLogger(__name__)
 
 
+@profiled("convert")
 def convert(source: t.Union[str, Path, t.IO]):
     """
     m = markdown2.Markdown(extras=[
@@ -43,6 +55,7 @@ def convert(source: t.Union[str, Path, t.IO]):
     return postprocess(html)
 
 
+@profiled("linkcheck")
 def linkcheck(source: str):
     # Suppress unclosed socket warning from linkchecker.
     # sys:1: ResourceWarning: unclosed <socket.socket ...)>
@@ -67,6 +80,105 @@ def linkcheck(source: str):
     return outcome1 and outcome2
 
 
+def to_html(source: t.Union[str, Path]) -> str:
+    """
+    Convert text document to HTML, or read an HTML document.
+    """
+    ctr = ContentTypeResolver(name=source)
+    if ctr.is_markup():
+        return convert(source)
+    elif ctr.is_html():  # noqa: RET505
+        return Path(source).read_text()
+    else:
+        raise ValueError(f"Unknown file type: {ctr.suffix}")
+
+
+def render(
+    source: t.Union[str, Path],
+    uploader: t.Optional[t.Callable] = None,
+    optimizer: t.Optional[ImageOptimizer] = None,
+    html: t.Optional[str] = None,
+) -> str:
+    """
+    Convert text document to HTML, upload its images using `uploader`, and replace their references.
+    When an `optimizer` is given, images are optimized before uploading them.
+    When the document has been converted already, pass its `html`.
+    """
+    if html is None:
+        html = to_html(source)
+
+    if uploader is not None:
+        hit = HTMLImageTranslator(html=html, source_path=source, uploader=uploader, optimizer=optimizer)
+        hit.discover().process()
+        html = str(hit.html_out)
+    return html
+
+
+class SharedUploader:
+    """
+    Upload each file only once, even when it is referenced by multiple documents processed concurrently.
+    """
+
+    def __init__(self, uploader: t.Callable):
+        self.uploader = uploader
+        self.futures: t.Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, source: t.Union[str, Path], name: str):
+        key = str(Path(source).resolve())
+        with self.lock:
+            future = self.futures.get(key)
+            owner = future is None
+            if future is None:
+                future = self.futures[key] = Future()
+        if owner:
+            try:
+                future.set_result(self.uploader(source=source, name=name))
+            except Exception as ex:
+                future.set_exception(ex)
+        return future.result()
+
+
+def load_blogpost(
+    hsa: HubSpotAdapter,
+    name: str,
+    content_group_id: t.Optional[str],
+    post: t.Optional[BlogPost],
+    blogpost_index: t.Optional[BlogPostIndex] = None,
+    journal: t.Optional[PublishJournal] = None,
+) -> HubSpotBlogPost:
+    """
+    Create the blog post, unless it has been looked up already as `post`, or is known already.
+    """
+    identifier = journal.get_post(name) if journal is not None else None
+    if identifier is not None:
+        return HubSpotBlogPost(hubspot_adapter=hsa, identifier=identifier, fetch=False)
+    if post is None and content_group_id and (blogpost_index is None or blogpost_index.get(name) is None):
+        logger.info(f"Creating blog post: {name}")
+        post = hsa.create_blogpost(name, content_group_id)
+    article = HubSpotBlogPost(
+        hubspot_adapter=hsa, name=name, content_group_id=content_group_id, index=blogpost_index, post=post
+    )
+    if journal is not None and article.identifier:
+        journal.put_post(name, article.identifier)
+    return article
+
+
+def save_blogpost(article: HubSpotBlogPost, name: str, html: str, journal: t.Optional[PublishJournal] = None):
+    """
+    Save the blog post, unless a previous, interrupted run saved the same content already.
+    """
+    digest = text_digest(html)
+    if journal is not None and journal.get_body(name) == digest and journal.get_post(name):
+        logger.info(f"Blog post has been saved by the previous run, skipping: id={article.identifier}")
+        return BlogPost(id=article.identifier, name=name)
+    article.set(post_body=html)
+    result = article.save()
+    if journal is not None:
+        journal.put_body(name, digest)
+    return result
+
+
 def upload(
     access_token: str,
     source: t.Union[str, Path],
@@ -74,41 +186,83 @@ def upload(
     content_group_id: t.Optional[str] = None,
     folder_id: t.Optional[str] = None,
     folder_path: t.Optional[str] = None,
+    manifest: t.Optional[UploadManifest] = None,
+    hubspot_adapter: t.Optional[HubSpotAdapter] = None,
+    blogpost_index: t.Optional[BlogPostIndex] = None,
+    journal: t.Optional[PublishJournal] = None,
+    optimizer: t.Optional[ImageOptimizer] = None,
+    html: t.Optional[str] = None,
 ):
+    """
+    Upload a document as blog post, or another file.
+    When the document has been converted already, pass its `html`.
+    """
     source_path = Path(source)
 
     ctr = ContentTypeResolver(name=source_path)
 
     logger.info(f"Uploading file: {source}")
-    hsa = HubSpotAdapter(access_token=access_token)
+    hsa = hubspot_adapter or HubSpotAdapter(access_token=access_token)
 
     # Upload text files as blog posts.
     if ctr.is_text():
-        # Convert markup to HTML.
-        if ctr.is_markup():
-            html = convert(source)
-        elif ctr.is_html():
-            html = Path(source).read_text()
-        else:
-            raise ValueError(f"Unknown file type: {ctr.suffix}")
+        name = name or source_path.stem
+        preflight = Preflight(
+            hubspot_adapter=hsa,
+            content_group_id=content_group_id,
+            folder_id=folder_id,
+            folder_path=folder_path,
+            blogpost_index=blogpost_index,
+            journal=journal,
+        )
+        preflight.check_folder().verify()
 
-        # Collect and converge images.
+        uploader = None
         if not folder_id and not folder_path:
             logger.warning("Images will not be uploaded, please supply folder id or folder name")
         else:
             uploader = functools.partial(
-                upload, access_token=access_token, folder_id=folder_id, folder_path=folder_path
+                upload,
+                access_token=access_token,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                manifest=manifest,
+                hubspot_adapter=hsa,
+                journal=journal,
             )
-            hit = HTMLImageTranslator(html=html, source_path=source_path, uploader=uploader)
-            hit.discover().process()
-            html = hit.html_out
 
-        # Upload blog post.
-        name = name or source_path.stem
-        article = HubSpotBlogPost(hubspot_adapter=hsa, name=name, content_group_id=content_group_id)
-        post: BlogPost = article.post
-        post.post_body = html
-        return article.save()
+        def check(html: str, post: t.Optional[BlogPost]):
+            """
+            Verify images and blog post before uploading anything.
+            """
+            if preflight.has_folder:
+                preflight.check_images(source, html)
+            preflight.verify()
+
+        def load(post: t.Optional[BlogPost], _) -> HubSpotBlogPost:
+            return load_blogpost(hsa, name, content_group_id, post, blogpost_index=blogpost_index, journal=journal)
+
+        def save(html: str, article: HubSpotBlogPost):
+            return save_blogpost(article, name, html, journal=journal)
+
+        # Convert the document while looking up the blog post, and upload images while creating the blog post.
+        # Only saving the blog post waits for all other stages.
+        with ThreadPoolExecutor(max_workers=hsa.CONCURRENCY) as executor:
+            pipeline = Pipeline(executor)
+            if html is None:
+                pipeline.stage("convert", to_html, source)
+            else:
+                pipeline.stage("convert", lambda: html)
+            pipeline.stage("lookup", preflight.require_blogpost, name)
+            pipeline.stage("preflight", check, after=["convert", "lookup"])
+            pipeline.stage(
+                "render",
+                lambda html, _: render(source, uploader=uploader, optimizer=optimizer, html=html),
+                after=["convert", "preflight"],
+            )
+            pipeline.stage("post", load, after=["lookup", "preflight"])
+            pipeline.stage("save", save, after=["render", "post"])
+            return pipeline.result("save")
 
         # Only in emergency situations.
         # article.delete()  # noqa: ERA001
@@ -116,14 +270,352 @@ def upload(
     # Upload other files as File objects.
     elif ctr.is_file():  # noqa: RET505
         name = name or source_path.name
+        folder = str(folder_id or folder_path)
+        preflight = Preflight(hubspot_adapter=hsa, folder_id=folder_id, folder_path=folder_path)
+        preflight.check_folder(required=True).check_file(source).verify()
+
+        digest = None
+        if (manifest is not None or journal is not None) and (folder_id or folder_path):
+            digest = file_digest(source_path)
+
+        # Skip uploading files which a previous, interrupted run uploaded already.
+        if journal is not None and digest is not None:
+            entry = journal.get_file(digest=digest, folder=folder, name=name)
+            if entry is not None:
+                logger.info(f"File has been uploaded by the previous run, skipping: id={entry.id}, url={entry.url}")
+                return entry
+
+        # Skip uploading files which have not changed since the last upload, unless they have been deleted since.
+        if manifest is not None and digest is not None:
+            entry = manifest.get(digest=digest, folder=folder, name=name)
+            if entry is not None and not hsa.has_file(entry.id, folder_id=folder_id, folder_path=folder_path):
+                logger.info(f"File has been deleted, uploading it again: id={entry.id}, url={entry.url}")
+                manifest.forget([entry.id])
+                entry = None
+            hsa.metrics.cache("upload-manifest", hit=entry is not None)
+            if entry is not None:
+                logger.info(f"File is unchanged, skipping upload: id={entry.id}, url={entry.url}")
+                return entry
+
         file = HubSpotFile(hubspot_adapter=hsa, source=source, name=name, folder_id=folder_id, folder_path=folder_path)
-        return file.save()
+        result = file.save()
+        if manifest is not None and digest is not None:
+            manifest.put(digest=digest, folder=folder, name=name, file=result)
+        if journal is not None and digest is not None:
+            journal.put_file(digest=digest, folder=folder, name=name, file=result)
+        return result
     return None
 
     # Only in emergency situations.
     # file.delete()  # noqa: ERA001
 
 
+def upload_many(
+    access_token: str,
+    sources: t.List[t.Union[str, Path]],
+    content_group_id: t.Optional[str] = None,
+    folder_id: t.Optional[str] = None,
+    folder_path: t.Optional[str] = None,
+    manifest: t.Optional[UploadManifest] = None,
+    hubspot_adapter: t.Optional[HubSpotAdapter] = None,
+    blogpost_index: t.Optional[BlogPostIndex] = None,
+    journal: t.Optional[PublishJournal] = None,
+    optimizer: t.Optional[ImageOptimizer] = None,
+    converted: t.Optional[t.Dict[str, str]] = None,
+) -> t.List[t.Any]:
+    """
+    Upload many documents as blog posts, and other files, in one go.
+
+    Documents are converted concurrently, and images they share are uploaded
+    only once. Blog posts are created and updated using batch requests, so
+    publishing a whole blog needs a few API calls per 100 blog posts.
+    The blog post names are derived from the file names. Files and blog posts
+    which failed are logged, and missing from the results.
+
+    When a journal of a previous, interrupted run is given, files and blog
+    posts it completed already are skipped. When an image optimizer is given,
+    images referenced by documents are optimized before uploading them.
+    When documents have been converted already, pass their HTML by source
+    path using `converted`.
+    """
+    hsa = hubspot_adapter or HubSpotAdapter(access_token=access_token)
+    documents = [source for source in sources if ContentTypeResolver(name=source).is_text()]
+    files = [source for source in sources if not ContentTypeResolver(name=source).is_text()]
+
+    names = [Path(source).stem for source in documents]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Multiple documents would be uploaded as the same blog post: {', '.join(duplicates)}")
+
+    # Verify files, images, and blog posts before uploading anything, in order to fail early.
+    preflight = Preflight(
+        hubspot_adapter=hsa,
+        content_group_id=content_group_id,
+        folder_id=folder_id,
+        folder_path=folder_path,
+        blogpost_index=blogpost_index,
+        journal=journal,
+    )
+    preflight.check_folder(required=bool(files))
+    for source in files:
+        preflight.check_file(source)
+    if converted is not None:
+        htmls = [converted[str(source)] for source in documents]
+    else:
+        with ThreadPoolExecutor(max_workers=hsa.CONCURRENCY) as executor:
+            htmls = list(executor.map(to_html, documents))
+    if preflight.has_folder:
+        for source, html in zip(documents, htmls):
+            preflight.check_images(source, html)
+    identifiers = preflight.verify().resolve_blogposts(names)
+    preflight.verify()
+
+    uploader: t.Optional[SharedUploader] = None
+    if not folder_id and not folder_path:
+        logger.warning("Images will not be uploaded, please supply folder id or folder name")
+    else:
+        uploader = SharedUploader(
+            functools.partial(
+                upload,
+                access_token=access_token,
+                folder_id=folder_id,
+                folder_path=folder_path,
+                manifest=manifest,
+                hubspot_adapter=hsa,
+                journal=journal,
+            )
+        )
+
+    logger.info(f"Uploading {len(documents)} documents and {len(files)} files")
+    with ThreadPoolExecutor(max_workers=hsa.CONCURRENCY) as executor:
+        uploads = []
+        if uploader is not None:
+            uploads = [executor.submit(uploader, source, Path(source).name) for source in files]
+        renders = [
+            executor.submit(render, source, uploader=uploader, optimizer=optimizer, html=html)
+            for source, html in zip(documents, htmls)
+        ]
+
+    # Items which failed are skipped, and missing from the results, so the others are still published.
+    results: t.List[t.Any] = []
+    for source, future in zip(files, uploads):
+        try:
+            results.append(future.result())
+        except Exception as ex:
+            logger.error(f"Uploading file failed: {source}: {ex}")
+    rendered = {}
+    for source, name, future in zip(documents, names, renders):
+        try:
+            rendered[name] = future.result()
+        except Exception as ex:
+            logger.error(f"Uploading images of document failed, skipping blog post: {source}: {ex}")
+
+    creates = []
+    updates = {}
+    digests = {name: text_digest(html) for name, html in rendered.items()}
+    for name, html in rendered.items():
+        if journal is not None and name in identifiers and journal.get_body(name) == digests[name]:
+            logger.info(f"Blog post has been saved by the previous run, skipping: id={identifiers[name]}, name={name}")
+            results.append(BlogPost(id=identifiers[name], name=name))
+        elif name in identifiers:
+            updates[identifiers[name]] = {"post_body": html}
+        else:
+            creates.append(BlogPost(name=name, slug=name, content_group_id=content_group_id, post_body=html))
+    logger.info(f"Creating {len(creates)} and updating {len(updates)} blog posts")
+    posts = hsa.create_blogposts(creates) + hsa.update_blogposts(updates)
+    for post in posts:
+        if blogpost_index is not None and post.name:
+            blogpost_index.put(post.name, post)
+        if journal is not None and post.name in digests:
+            journal.put_post(post.name, post.id)
+            journal.put_body(post.name, digests[post.name])
+    return results + posts
+
+
+def build(
+    source: t.Union[str, Path],
+    target: t.Optional[t.Union[str, Path]] = None,
+    name: t.Optional[str] = None,
+    optimizer: t.Optional[ImageOptimizer] = None,
+) -> Path:
+    """
+    Convert a document, and write it into a bundle, together with its images, for publishing it later.
+    """
+    if not ContentTypeResolver(name=source).is_text():
+        raise ValueError(f"Only documents can be bundled: {source}")
+    bundle = Bundle.build(source, to_html(source), name=name, optimizer=optimizer)
+    return bundle.write(target or f"{bundle.name}.bundle")
+
+
+def publish_bundle(
+    access_token: str,
+    bundle: t.Union[str, Path, Bundle],
+    name: t.Optional[str] = None,
+    content_group_id: t.Optional[str] = None,
+    folder_id: t.Optional[str] = None,
+    folder_path: t.Optional[str] = None,
+    manifest: t.Optional[UploadManifest] = None,
+    hubspot_adapter: t.Optional[HubSpotAdapter] = None,
+    blogpost_index: t.Optional[BlogPostIndex] = None,
+    journal: t.Optional[PublishJournal] = None,
+):
+    """
+    Publish a bundle as blog post, uploading its images, without converting the document again.
+    """
+    hsa = hubspot_adapter or HubSpotAdapter(access_token=access_token)
+    if not isinstance(bundle, Bundle):
+        bundle = Bundle.read(bundle)
+    name = name or bundle.name
+    logger.info(f"Publishing bundle: {bundle}")
+
+    preflight = Preflight(
+        hubspot_adapter=hsa,
+        content_group_id=content_group_id,
+        folder_id=folder_id,
+        folder_path=folder_path,
+        blogpost_index=blogpost_index,
+        journal=journal,
+    )
+    preflight.check_folder(required=bool(bundle.images))
+    for image in bundle.images:
+        preflight.check_file(bundle.files[image.path], limit=hsa.MAX_IMAGE_SIZE)
+    post = preflight.verify().require_blogpost(name)
+    preflight.verify()
+
+    uploader = functools.partial(
+        upload,
+        access_token=access_token,
+        folder_id=folder_id,
+        folder_path=folder_path,
+        manifest=manifest,
+        hubspot_adapter=hsa,
+        journal=journal,
+    )
+    with ThreadPoolExecutor(max_workers=HTMLImageTranslator.CONCURRENCY) as executor:
+        files = executor.map(lambda image: uploader(source=bundle.files[image.path], name=image.name), bundle.images)
+        urls = {image.path: file.url for image, file in zip(bundle.images, files)}
+
+    article = load_blogpost(hsa, name, content_group_id, post, blogpost_index=blogpost_index, journal=journal)
+    return save_blogpost(article, name, bundle.render(urls), journal=journal)
+
+
+@dataclasses.dataclass
+class Portal:
+    """
+    A HubSpot portal to publish to, with its own upload manifest, blog post index, and journal.
+    """
+
+    access_token: str
+    manifest: t.Optional[UploadManifest] = None
+    blogpost_index: t.Optional[BlogPostIndex] = None
+    journal: t.Optional[PublishJournal] = None
+    hubspot_adapter: t.Optional[HubSpotAdapter] = None
+
+    @property
+    def label(self) -> str:
+        """
+        Identify the portal in log messages, without revealing its access token.
+        """
+        return cache_directory(self.access_token).name
+
+
+def publish_portals(portals: t.List[Portal], publish_portal: t.Callable[[Portal], t.Any]) -> t.Dict[str, t.Any]:
+    """
+    Publish to multiple HubSpot portals concurrently, using `publish_portal`.
+
+    A failing portal does not stop publishing to the others. Returns the results
+    by portal label, only including the portals publishing succeeded for.
+    """
+    labels = [portal.label for portal in portals]
+    if len(set(labels)) < len(labels):
+        raise ValueError("Publishing to the same portal multiple times is not supported, remove duplicate tokens")
+    results: t.Dict[str, t.Any] = {}
+    with ThreadPoolExecutor(max_workers=len(portals)) as executor:
+        futures = {portal.label: executor.submit(publish_portal, portal) for portal in portals}
+        for label, future in futures.items():
+            try:
+                results[label] = future.result()
+            except Exception as ex:
+                logger.error(f"Publishing to portal {label} failed: {ex}")
+    return results
+
+
+def publish(
+    portals: t.List[Portal],
+    sources: t.List[t.Union[str, Path]],
+    name: t.Optional[str] = None,
+    content_group_id: t.Optional[str] = None,
+    folder_id: t.Optional[str] = None,
+    folder_path: t.Optional[str] = None,
+    optimizer: t.Optional[ImageOptimizer] = None,
+) -> t.Dict[str, t.Any]:
+    """
+    Publish documents and files to multiple HubSpot portals, like staging and production.
+
+    Documents are converted once, and images are optimized once, then they are
+    published to all portals concurrently. Each portal uses its own rate
+    limiter, upload manifest, blog post index, and journal. A failing portal
+    does not stop publishing to the others. Returns the results by portal label,
+    only including the portals publishing succeeded for.
+    """
+    documents = [source for source in sources if ContentTypeResolver(name=source).is_text()]
+    with ThreadPoolExecutor(max_workers=HubSpotAdapter.CONCURRENCY) as executor:
+        converted = dict(zip([str(source) for source in documents], executor.map(to_html, documents)))
+
+    def publish_portal(portal: Portal):
+        logger.info(f"Publishing {len(sources)} items to portal: {portal.label}")
+        options: t.Dict[str, t.Any] = {
+            "access_token": portal.access_token,
+            "content_group_id": content_group_id,
+            "folder_id": folder_id,
+            "folder_path": folder_path,
+            "manifest": portal.manifest,
+            "hubspot_adapter": portal.hubspot_adapter,
+            "blogpost_index": portal.blogpost_index,
+            "journal": portal.journal,
+            "optimizer": optimizer,
+        }
+        if len(sources) > 1:
+            return upload_many(sources=sources, converted=converted, **options)
+        source = sources[0]
+        return upload(source=source, name=name or "", html=converted.get(str(source)), **options)
+
+    return publish_portals(portals, publish_portal)
+
+
+def publish_bundles(
+    portals: t.List[Portal],
+    bundle: t.Union[str, Path, Bundle],
+    name: t.Optional[str] = None,
+    content_group_id: t.Optional[str] = None,
+    folder_id: t.Optional[str] = None,
+    folder_path: t.Optional[str] = None,
+) -> t.Dict[str, t.Any]:
+    """
+    Publish a bundle to multiple HubSpot portals concurrently, reading it only once.
+    Returns the results by portal label, only including the portals publishing succeeded for.
+    """
+    if not isinstance(bundle, Bundle):
+        bundle = Bundle.read(bundle)
+
+    def publish_portal(portal: Portal):
+        logger.info(f"Publishing bundle to portal: {portal.label}")
+        return publish_bundle(
+            access_token=portal.access_token,
+            bundle=bundle,
+            name=name,
+            content_group_id=content_group_id,
+            folder_id=folder_id,
+            folder_path=folder_path,
+            manifest=portal.manifest,
+            hubspot_adapter=portal.hubspot_adapter,
+            blogpost_index=portal.blogpost_index,
+            journal=portal.journal,
+        )
+
+    return publish_portals(portals, publish_portal)
+
+
 def delete_blogpost(access_token: str, identifier: t.Optional[str] = None, name: t.Optional[str] = None):
     hsa = HubSpotAdapter(access_token=access_token)
 
@@ -145,14 +637,71 @@ def delete_blogpost(access_token: str, identifier: t.Optional[str] = None, name:
         logger.warning(f"Blog post not found: id={identifier}, name={name}")  # pragma: nocover
 
 
-def delete_file(access_token: str, identifier: t.Optional[str] = None, path: t.Optional[str] = None):
+def delete_file(
+    access_token: str,
+    identifier: t.Optional[str] = None,
+    path: t.Optional[str] = None,
+    manifest: t.Optional[UploadManifest] = None,
+):
+    """
+    Delete files by identifier or path, and remove them from the upload manifest, if given.
+    """
     hsa = HubSpotAdapter(access_token=access_token)
 
     if identifier:
         logger.info(f"Deleting file with id '{identifier}'")
-        return hsa.delete_file_by_id(identifier)
-    elif path:  # noqa: RET505
+        deleted = hsa.delete_file_by_id(identifier)
+    elif path:
         logger.info(f"Deleting files at path '{path}'")
-        return hsa.delete_files_by_path(path)
+        deleted = hsa.delete_files_by_path(path)
     else:
         raise ValueError("Deleting files needs file id or path")
+    if manifest is not None:
+        manifest.forget(file.id for file in deleted)
+    return deleted
+
+
+def delete_blogposts(
+    access_token: str, name_pattern: t.Optional[str] = None, content_group_id: t.Optional[str] = None
+) -> t.List[BlogPost]:
+    hsa = HubSpotAdapter(access_token=access_token)
+    if not name_pattern and not content_group_id:
+        raise ValueError("Deleting blog posts needs name pattern or content group id")
+    logger.info(f"Deleting blog posts with name pattern '{name_pattern}' in content group '{content_group_id}'")
+    posts = hsa.find_blogposts(name_pattern=name_pattern, content_group_id=content_group_id)
+    return hsa.delete_blogposts(posts)
+
+
+def delete_files(
+    access_token: str,
+    path_prefix: t.Optional[str] = None,
+    name_pattern: t.Optional[str] = None,
+    manifest: t.Optional[UploadManifest] = None,
+) -> t.List[File]:
+    """
+    Delete files by path prefix and name pattern, and remove them from the upload manifest, if given.
+    """
+    hsa = HubSpotAdapter(access_token=access_token)
+    if not path_prefix and not name_pattern:
+        raise ValueError("Deleting files needs path prefix or name pattern")
+    logger.info(f"Deleting files with path prefix '{path_prefix}' and name pattern '{name_pattern}'")
+    files = hsa.find_files(path_prefix=path_prefix, name_pattern=name_pattern)
+    deleted = hsa.delete_files(files)
+    if manifest is not None:
+        manifest.forget(file.id for file in deleted)
+    return deleted
+
+
+def export(
+    access_token: str,
+    target: t.Union[str, Path],
+    content_group_id: t.Optional[str] = None,
+    format: str = "html",  # noqa: A002
+    images: bool = False,
+    hubspot_adapter: t.Optional[HubSpotAdapter] = None,
+) -> ExportResult:
+    hsa = hubspot_adapter or HubSpotAdapter(access_token=access_token)
+    exporter = BlogExporter(
+        hubspot_adapter=hsa, target=target, content_group_id=content_group_id, format=format, images=images
+    )
+    return exporter.run()
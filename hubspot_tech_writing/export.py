@@ -0,0 +1,251 @@
+import dataclasses
+import json
+import logging
+import os
+import re
+import threading
+import typing as t
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path, PurePosixPath
+from urllib.parse import unquote, urlsplit
+
+import requests
+from hubspot.cms.blogs.blog_posts import BlogPost
+
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.util.store import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+# Images hosted on HubSpot's file storage, referenced by `<img src="...">`.
+HUBFS_IMAGE = re.compile(r"""<img\s[^>]*?src=["']([^"']+/hubfs/[^"']+)["']""", re.IGNORECASE)
+
+
+@dataclasses.dataclass
+class ExportResult:
+    exported: int = 0
+    skipped: int = 0
+    images: int = 0
+    images_failed: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"Exported {self.exported} blog posts, skipped {self.skipped} unchanged ones, "
+            f"downloaded {self.images} images, {self.images_failed} failed"
+        )
+
+
+class BlogExporter:
+    """
+    Export the blog posts of a HubSpot portal to local files.
+
+    Blog posts are streamed page by page, so memory usage does not grow with
+    the number of blog posts. In `html` format, each blog post is written to
+    `posts/<id>.html`, and its metadata to `posts/<id>.json`. Blog posts whose
+    `updated` timestamp did not change since the previous export are skipped.
+    In `jsonl` format, all blog posts are written to `posts.jsonl`, one per line,
+    replacing the file atomically.
+
+    Optionally, images on HubSpot's file storage referenced by blog posts are
+    downloaded concurrently into `images/`, mirroring their hubfs paths. Images
+    which have been downloaded before are skipped. Blog posts are only recorded
+    as exported when all of their images have been downloaded, so images which
+    failed are downloaded again by the next export.
+    """
+
+    FORMATS = ["html", "jsonl"]
+    STATE_FILENAME = "export-state.json"
+
+    # The number of concurrent image downloads.
+    CONCURRENCY = 8
+
+    def __init__(
+        self,
+        hubspot_adapter: HubSpotAdapter,
+        target: t.Union[str, Path],
+        content_group_id: t.Optional[str] = None,
+        format: str = "html",  # noqa: A002
+        images: bool = False,
+        concurrency: t.Optional[int] = None,
+    ):
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown export format: {format}. Use one of: {', '.join(self.FORMATS)}")
+        self.hsa = hubspot_adapter
+        self.target = Path(target)
+        self.content_group_id = content_group_id
+        self.format = format
+        self.images = images
+        self.concurrency = concurrency or self.CONCURRENCY
+        self.result = ExportResult()
+        # The `updated` timestamps of exported blog posts, by identifier.
+        self.state: t.Dict[str, str] = {}
+        # Image downloads, by URL, and the `updated` timestamps of exported blog posts waiting for them.
+        self.downloads: t.Dict[str, Future] = {}
+        self.waiting: t.List[t.Tuple[str, str, t.List[Future]]] = []
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return (
+            f"{self.__class__.__name__} target={self.target}, content_group_id={self.content_group_id}, "
+            f"format={self.format}, images={self.images}"
+        )
+
+    @property
+    def state_path(self) -> Path:
+        return self.target / self.STATE_FILENAME
+
+    def load_state(self):
+        if self.format == "html" and self.state_path.exists():
+            with open(self.state_path, "r") as fp:
+                self.state = json.load(fp)
+
+    def serialize(self, post: BlogPost) -> t.Dict[str, t.Any]:
+        """
+        Convert blog post to JSON-compatible dictionary, using the attribute names of the HubSpot API.
+        """
+        return self.hsa.hs.cms.blogs.blog_posts.basic_api.api_client.sanitize_for_serialization(post)
+
+    def run(self) -> ExportResult:
+        """
+        Export all blog posts, and optionally their images.
+        """
+        logger.info(f"Exporting blog posts: {self}")
+        self.target.mkdir(parents=True, exist_ok=True)
+        self.load_state()
+        filters: t.Dict[str, t.Any] = {"contentGroupId": self.content_group_id} if self.content_group_id else {}
+        posts = self.hsa.iter_blogposts(**filters)
+        pending: t.Set[Future] = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                if self.format == "jsonl":
+                    self.write_jsonl(posts, executor, pending)
+                else:
+                    for post in posts:
+                        self.write_html(post, executor, pending)
+            finally:
+                wait(pending)
+                if self.format == "html":
+                    self.record_state()
+                    write_json_atomic(self.state_path, self.state)
+        logger.info(self.result.summary())
+        return self.result
+
+    def write_html(self, post: BlogPost, executor: ThreadPoolExecutor, pending: t.Set[Future]):
+        """
+        Write blog post body and metadata, unless it has not been updated since the previous export.
+        """
+        updated = post.updated.isoformat() if post.updated is not None else None
+        html_path = self.target / "posts" / f"{post.id}.html"
+        if updated is not None and self.state.get(post.id) == updated and html_path.exists():
+            logger.debug(f"Skipping unchanged blog post: id={post.id}, name={post.name}")
+            self.result.skipped += 1
+            return
+        logger.info(f"Exporting blog post: id={post.id}, name={post.name}")
+        data = self.serialize(post)
+        body = data.pop("postBody", None) or ""
+        data["images"] = self.download_images(body, executor, pending)
+        html_path.parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(html_path, body)
+        write_json_atomic(html_path.with_suffix(".json"), data)
+        if updated is not None:
+            futures = [self.downloads[url] for url in data["images"] if url in self.downloads]
+            self.waiting.append((post.id, updated, futures))
+        self.result.exported += 1
+
+    def record_state(self):
+        """
+        Record exported blog posts, unless downloading any of their images failed.
+        """
+        for identifier, updated, futures in self.waiting:
+            if all(future.done() and not future.cancelled() and future.result() for future in futures):
+                self.state[identifier] = updated
+            else:
+                logger.warning(f"Downloading images of blog post failed, it will be exported again: id={identifier}")
+        self.waiting = []
+
+    def write_jsonl(self, posts: t.Iterable[BlogPost], executor: ThreadPoolExecutor, pending: t.Set[Future]):
+        """
+        Write all blog posts to a JSONL file, one per line.
+        """
+        path = self.target / "posts.jsonl"
+        tmppath = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmppath, "w") as fp:
+            for post in posts:
+                logger.info(f"Exporting blog post: id={post.id}, name={post.name}")
+                data = self.serialize(post)
+                data["images"] = self.download_images(data.get("postBody") or "", executor, pending)
+                fp.write(json.dumps(data, sort_keys=True) + "\n")
+                self.result.exported += 1
+        os.replace(tmppath, path)
+
+    def download_images(self, html: str, executor: ThreadPoolExecutor, pending: t.Set[Future]) -> t.Dict[str, str]:
+        """
+        Download images referenced by a blog post in the background, and return their local paths, by URL.
+
+        The number of downloads in flight is bounded, so blog posts are not read ahead without limit.
+        """
+        if not self.images:
+            return {}
+        paths: t.Dict[str, str] = {}
+        for url in HUBFS_IMAGE.findall(html):
+            path = self.image_path(url)
+            if path is None:
+                continue
+            paths[url] = path.relative_to(self.target).as_posix()
+            if url in self.downloads:
+                continue
+            if path.exists():
+                logger.debug(f"Skipping existing image: {url}")
+                continue
+            while len(pending) >= self.concurrency * 2:
+                _, not_done = wait(pending, return_when=FIRST_COMPLETED)
+                pending.intersection_update(not_done)
+            future = self.downloads[url] = executor.submit(self.download, url, path)
+            pending.add(future)
+        return paths
+
+    def image_path(self, url: str) -> t.Optional[Path]:
+        """
+        Map an image URL to a local path within `images/`, mirroring its hubfs path.
+        """
+        _, _, remainder = urlsplit(url).path.partition("/hubfs/")
+        parts = [part for part in PurePosixPath(unquote(remainder)).parts if part not in ("", ".", "..", "/")]
+        if not parts:
+            return None
+        return self.target.joinpath("images", *parts)
+
+    def download(self, url: str, path: Path) -> bool:
+        """
+        Download a single image, writing it atomically, and return whether it succeeded.
+        """
+        logger.info(f"Downloading image: {url}")
+        tmppath = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self.session.get(url, stream=True, timeout=30.0) as response:
+                response.raise_for_status()
+                with open(tmppath, "wb") as fp:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        fp.write(chunk)
+            os.replace(tmppath, path)
+        except Exception as ex:
+            logger.warning(f"Downloading image failed: {url}: {ex}")
+            tmppath.unlink(missing_ok=True)
+            with self.lock:
+                self.result.images_failed += 1
+            return False
+        with self.lock:
+            self.result.images += 1
+        return True
+
+
+def write_text_atomic(path: Path, text: str):
+    """
+    Write text to file, replacing it atomically.
+    """
+    tmppath = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmppath, "w") as fp:
+        fp.write(text)
+    os.replace(tmppath, path)
@@ -2,6 +2,8 @@ import json
 import re
 import uuid
 
+from hubspot_tech_writing.util.profiling import profiled
+
 
 class CodeBlockAddon:
     """
@@ -140,6 +142,7 @@ class HeaderLinkAddon:
         }
 
 
+@profiled("postprocess")
 def postprocess(html: str) -> str:
     """
     Process Markdown `<pre><code>` blocks.
@@ -1,19 +1,45 @@
+import fnmatch
+import functools
+import gzip
+import importlib
+import itertools
 import json
 import logging
 import os
+import threading
 import typing as t
-from copy import deepcopy
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlencode
 
 import hubspot
 from click import confirm
 from hubspot import HubSpot
-from hubspot.cms.blogs.blog_posts import BlogPost
+from hubspot.cms.blogs.blog_posts import BatchInputBlogPost, BatchInputJsonNode, BatchInputString, BlogPost
+from hubspot.discovery.discovery_base import DiscoveryBase
 from hubspot.files import File
+from hubspot.files.rest import RESTResponse
+from urllib3 import Retry
+
+from hubspot_tech_writing.util.metrics import Metrics
+from hubspot_tech_writing.util.metrics import metrics as default_metrics
+from hubspot_tech_writing.util.multipart import MultipartFile
+from hubspot_tech_writing.util.profiling import profiled
+from hubspot_tech_writing.util.ratelimit import RateLimiter
+from hubspot_tech_writing.util.store import BlogPostIndex
 
 logger = logging.getLogger(__name__)
 
 
+def confirm_delete(message: str = "Please confirm deletion (archival)") -> bool:
+    """
+    Ask the user to confirm a delete operation, unless `CONFIRM=yes` is defined.
+    """
+    if os.environ.get("CONFIRM") == "yes":
+        return True
+    return confirm(message)
+
+
 class HubSpotAdapter:
     """
     Wrapper around the HubSpot client, with additional
@@ -28,13 +54,109 @@ class HubSpotAdapter:
         "duplicateValidationScope": "EXACT_FOLDER",
     }
 
-    def __init__(self, access_token: str):
+    # The maximum number of items per page when listing resources.
+    PAGE_SIZE = 100
+
+    # The number of concurrent requests for bulk operations.
+    CONCURRENCY = 4
+
+    # The maximum number of inputs per batch request.
+    BATCH_SIZE = 100
+
+    # The maximum number of items to display when asking for confirmation.
+    SUMMARY_SIZE = 25
+
+    # The maximum sizes of files, and images, accepted for uploading, in bytes.
+    MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024
+    MAX_IMAGE_SIZE = 20 * 1024 * 1024
+
+    # Files larger than this number of bytes are uploaded by streaming them from disk.
+    STREAMING_THRESHOLD = 8 * 1024 * 1024
+
+    # JSON request bodies larger than this number of bytes are compressed, when compression is enabled.
+    COMPRESSION_THRESHOLD = 4 * 1024
+
+    def __init__(
+        self,
+        access_token: str,
+        host: t.Optional[str] = None,
+        rate_limiter: t.Optional[RateLimiter] = None,
+        metrics: t.Optional[Metrics] = None,
+        compression: bool = False,
+    ):
         """
         Wrap HubSpot client instance.
+
+        All API calls are routed through a rate limiter, which is shared by all
+        adapters using the same access token, unless specified otherwise.
+        Metrics are recorded into the process-wide registry, unless specified otherwise.
+
+        When `compression` is enabled, large JSON request bodies, like blog post
+        updates, are sent gzip-compressed. When the server rejects compressed
+        requests, they are sent uncompressed from then on. Compressed responses
+        are decompressed in all cases.
         """
         if not access_token:
             raise ValueError("Communicating with the HubSpot API needs an access token")
-        self.hs = HubSpot(access_token=access_token)
+        self.rate_limiter = rate_limiter or RateLimiter.for_access_token(access_token)
+        self.metrics = metrics or default_metrics
+        self.metrics.add_rate_limiter(self.rate_limiter)
+        self.compression = compression
+        self.apis: t.Dict[t.Tuple[str, str], t.Any] = {}
+        self.apis_lock = threading.Lock()
+        # Retrying on HTTP status codes is handled by the rate limiter, so urllib3 must not do it.
+        retry = Retry(total=3, respect_retry_after_header=False)
+        self.hs = HubSpot(access_token=access_token, host=host, retry=retry, api_factory=self.api_factory)
+
+        # Resolved folder identifiers, by folder path.
+        self.folder_ids: t.Dict[str, t.Optional[str]] = {}
+        # Files within folders, by folder identifier and file name.
+        self.folder_index: t.Dict[str, t.Dict[str, File]] = {}
+        # Lookups in progress, by folder path or identifier.
+        self.folder_id_futures: t.Dict[str, Future] = {}
+        self.folder_index_futures: t.Dict[str, Future] = {}
+        self.folder_lock = threading.RLock()
+
+    def api_factory(self, api_client_package, api_name: str, config: t.Dict[str, t.Any]):
+        """
+        Create HubSpot API instances once, and route their requests through the rate limiter.
+        Each individual HTTP request, including retries, is measured.
+
+        Reusing API instances also reuses their HTTP connection pools.
+        """
+        key = (api_client_package.__name__, api_name)
+        with self.apis_lock:
+            if key not in self.apis:
+                api = DiscoveryBase._default_api_factory(api_client_package, api_name, config)
+                # Responses are decompressed by urllib3 transparently.
+                api.api_client.set_default_header("Accept-Encoding", "gzip")
+                request = api.api_client.request
+                send_request = functools.partial(self.send_request, api.api_client)
+
+                def request_measured(method, url, *args, **kwargs):
+                    # The REST client removes the `Content-Type` header of multipart requests
+                    # from the dictionary passed in, so retries need a fresh copy of it.
+                    if kwargs.get("headers") is not None:
+                        kwargs["headers"] = dict(kwargs["headers"])
+                    body = kwargs.get("body")
+                    if self.compression and method in ["POST", "PUT", "PATCH"] and isinstance(body, (dict, list)):
+                        data = json.dumps(body).encode("utf-8")
+                        if len(data) >= self.COMPRESSION_THRESHOLD:
+                            try:
+                                return self.request_compressed(send_request, method, url, data, **kwargs)
+                            except Exception as ex:
+                                if getattr(ex, "status", None) != 415:
+                                    raise
+                                logger.warning("Server rejected compressed request, sending requests uncompressed")
+                                self.compression = False
+                    return self.metrics.measure(request, method, url, *args, **kwargs)
+
+                def request_limited(method, url, *args, **kwargs):
+                    return self.rate_limiter.call(method, request_measured, method, url, *args, **kwargs)
+
+                api.api_client.request = request_limited
+                self.apis[key] = api
+            return self.apis[key]
 
     def get_or_create_blogpost(self, article: "HubSpotBlogPost", autocreate: t.Optional[bool] = True) -> BlogPost:
         """
@@ -53,27 +175,191 @@ class HubSpotAdapter:
             if not article.content_group_id:
                 raise ValueError("Blog (content group) identifier is required for creating a blog post") from ex
             logger.info(f"Creating: {article}")
-            post = BlogPost(name=article.name, slug=article.name, content_group_id=article.content_group_id)
-            return self.hs.cms.blogs.blog_posts.basic_api.create(post)
+            return self.create_blogpost(article.name, article.content_group_id)
+
+    def create_blogpost(self, name: str, content_group_id: str) -> BlogPost:
+        """
+        Create a blog post within a blog (content group), using its name as slug.
+        """
+        post = BlogPost(name=name, slug=name, content_group_id=content_group_id)
+        return self.hs.cms.blogs.blog_posts.basic_api.create(post)
 
     def get_blogpost_by_name(self, name: str) -> BlogPost:
         """
         Find blog post by name.
         """
+        post = next(self.iter_blogposts(prefetch=False, name=name), None)
+        if post is None:
+            raise FileNotFoundError(f"Blog post not found: {name}")
+        return post
+
+    def get_blogposts_page(self, after: t.Optional[str] = None, limit: t.Optional[int] = None, **filters):
+        """
+        Fetch a page of blog posts, filtered by properties, like `name`, or `contentGroupId`.
+        """
         response_types_map = {
             200: "CollectionResponseWithTotalBlogPostForwardPaging",
         }
-        response = self.hs.cms.blogs.blog_posts.basic_api.api_client.call_api(
+        query_params = dict(filters)
+        if after is not None:
+            query_params["after"] = after
+        if limit is not None:
+            query_params["limit"] = limit
+        return self.hs.cms.blogs.blog_posts.basic_api.api_client.call_api(
             "/cms/v3/blogs/posts",
             "GET",
             auth_settings=["oauth2"],
             response_types_map=response_types_map,
-            query_params={"name": name},
+            query_params=query_params,
             _return_http_data_only=True,
         )
-        if not response.results:
-            raise FileNotFoundError(f"Blog post not found: {name}")
-        return response.results[0]
+
+    def resolve_blogposts(
+        self,
+        names: t.List[str],
+        content_group_id: t.Optional[str] = None,
+        index: t.Optional[BlogPostIndex] = None,
+    ) -> t.Dict[str, str]:
+        """
+        Resolve blog post names to identifiers, returning those which exist.
+
+        Identifiers from the local index are verified using batch requests, and stale
+        entries are invalidated. Remaining names are looked up by listing the blog
+        (content group) once, or by name when no content group is given.
+        """
+        identifiers: t.Dict[str, str] = {}
+        if index is not None:
+            indexed: t.Dict[str, str] = {}
+            for name in names:
+                record = index.get(name)
+                self.metrics.cache("blogpost-index", hit=record is not None)
+                if record is not None:
+                    indexed[record.id] = name
+            if indexed:
+                found = {str(post.id) for post in self.read_blogposts(list(indexed))}
+                for identifier, name in indexed.items():
+                    if identifier in found:
+                        identifiers[name] = identifier
+                    else:
+                        logger.warning(f"Blog post in local index is stale: id={identifier}, name={name}")
+                        index.forget(name)
+
+        unresolved = [name for name in names if name not in identifiers]
+        if unresolved and content_group_id:
+            wanted = set(unresolved)
+            for post in self.iter_blogposts(contentGroupId=content_group_id):
+                if post.name in wanted:
+                    identifiers[post.name] = str(post.id)
+        elif unresolved:
+
+            def lookup(name: str) -> t.Optional[BlogPost]:
+                try:
+                    return self.get_blogpost_by_name(name)
+                except FileNotFoundError:
+                    return None
+
+            with ThreadPoolExecutor(max_workers=self.CONCURRENCY) as executor:
+                for name, post in zip(unresolved, executor.map(lookup, unresolved)):
+                    if post is not None:
+                        identifiers[name] = str(post.id)
+        return identifiers
+
+    def read_blogposts(self, identifiers: t.List[str]) -> t.List[BlogPost]:
+        """
+        Fetch blog posts by identifier, using batch requests. Blog posts which do not exist are skipped.
+        """
+        return self.call_batch(self.hs.cms.blogs.blog_posts.batch_api.read, BatchInputString, identifiers)
+
+    def create_blogposts(self, posts: t.List[BlogPost]) -> t.List[BlogPost]:
+        """
+        Create blog posts, using batch requests.
+        """
+        return self.call_batch(self.hs.cms.blogs.blog_posts.batch_api.create, BatchInputBlogPost, posts)
+
+    def update_blogposts(self, changes: t.Dict[str, t.Dict[str, t.Any]]) -> t.List[BlogPost]:
+        """
+        Update blog posts, using batch requests.
+
+        `changes` maps blog post identifiers to modified attributes, like `post_body`,
+        using the same names as `HubSpotBlogPost.set()`. Only those are sent to the API.
+        """
+        api_client = self.hs.cms.blogs.blog_posts.batch_api.api_client
+        inputs = [
+            {**api_client.sanitize_for_serialization(BlogPost(**attributes)), "id": identifier}
+            for identifier, attributes in changes.items()
+        ]
+        return self.call_batch(self.hs.cms.blogs.blog_posts.batch_api.update, BatchInputJsonNode, inputs)
+
+    def call_batch(self, operation: t.Callable, input_type: t.Type, inputs: t.List[t.Any]) -> t.List[t.Any]:
+        """
+        Invoke a batch operation on chunks of `BATCH_SIZE` inputs concurrently, and collect the results.
+
+        Inputs which failed are reported as warnings, and are missing from the results.
+        """
+
+        def call(chunk: t.List[t.Any]) -> t.List[t.Any]:
+            response = operation(input_type(inputs=chunk))
+            for error in getattr(response, "errors", None) or []:
+                logger.warning(f"Batch operation failed: {error.message}, context={error.context}")
+            return response.results or []
+
+        chunks = [inputs[index : index + self.BATCH_SIZE] for index in range(0, len(inputs), self.BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=self.CONCURRENCY) as executor:
+            return list(itertools.chain.from_iterable(executor.map(call, chunks)))
+
+    def paginate(
+        self, get_page: t.Callable, page_size: t.Optional[int] = None, prefetch: bool = True, **kwargs
+    ) -> t.Generator[t.Any, None, None]:
+        """
+        Iterate all results of a paginated API operation, following its `after` cursors lazily.
+
+        When `prefetch` is enabled, the next page is requested in the background,
+        while the results of the current page are consumed. At most two pages
+        are held in memory.
+        """
+        limit = page_size or self.PAGE_SIZE
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        future: t.Optional[Future] = None
+        try:
+            response = get_page(limit=limit, after=None, **kwargs)
+            while True:
+                after = None
+                if response.paging is not None and response.paging.next is not None:
+                    after = response.paging.next.after
+                if after is not None and executor is not None:
+                    future = executor.submit(get_page, limit=limit, after=after, **kwargs)
+                yield from response.results
+                if after is None:
+                    return
+                response = future.result() if future is not None else get_page(limit=limit, after=after, **kwargs)
+                future = None
+        finally:
+            if future is not None:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def iter_blogposts(
+        self, page_size: t.Optional[int] = None, prefetch: bool = True, **filters
+    ) -> t.Generator[BlogPost, None, None]:
+        """
+        Iterate blog posts, filtered by properties, like `name`, or `contentGroupId`.
+        """
+        return self.paginate(self.get_blogposts_page, page_size=page_size, prefetch=prefetch, **filters)
+
+    def iter_files(
+        self, page_size: t.Optional[int] = None, prefetch: bool = True, **criteria
+    ) -> t.Generator[File, None, None]:
+        """
+        Iterate files, filtered by search criteria of `files_api.do_search`, like `path`, or `parent_folder_ids`.
+        """
+        return self.paginate(self.hs.files.files_api.do_search, page_size=page_size, prefetch=prefetch, **criteria)
+
+    def iter_folders(self, page_size: t.Optional[int] = None, prefetch: bool = True, **criteria):
+        """
+        Iterate folders, filtered by search criteria of `folders_api.do_search`, like `path`.
+        """
+        return self.paginate(self.hs.files.folders_api.do_search, page_size=page_size, prefetch=prefetch, **criteria)
 
     def get_or_create_file(self, file: "HubSpotFile") -> File:
         """
@@ -92,89 +378,375 @@ class HubSpotAdapter:
 
             logger.info(f"Creating: {file}")
 
-            if file.folder_id:
-                return self.hs.files.files_api.upload(
+            result: File
+            if self.use_streaming(file.source):
+                folder = ("folderId", str(file.folder_id)) if file.folder_id else ("folderPath", str(file.folder_path))
+                result = self.stream_file(
+                    "POST",
+                    "/files/v3/files",
+                    file.source,
+                    fields=[("fileName", str(file.name)), folder, ("options", json.dumps(self.FILE_OPTIONS))],
+                )
+            elif file.folder_id:
+                result = self.hs.files.files_api.upload(
                     file=file.source,
                     file_name=file.name,
                     folder_id=file.folder_id,
                     options=json.dumps(self.FILE_OPTIONS),
                 )
-            elif file.folder_path:  # noqa: RET505
-                return self.hs.files.files_api.upload(
+            else:
+                result = self.hs.files.files_api.upload(
                     file=file.source,
                     file_name=file.name,
                     folder_path=file.folder_path,
                     options=json.dumps(self.FILE_OPTIONS),
                 )
+            self.add_to_folder_index(file, result)
+            return result
 
     def get_file_by_name(self, file: "HubSpotFile") -> File:
         """
         Find file by name.
+
+        Files are looked up in an index of the target folder, which is acquired
+        once per folder, and reused for all subsequent lookups.
         """
         if not file.name:
             raise ValueError("File name missing")
+        folder_id: t.Optional[str]
         if file.folder_id:
-            file_stem = Path(file.name).stem
-            logger.info(f"Searching for '{file_stem}' in folder id '{file.folder_id}'")
-            response = self.hs.files.files_api.do_search(name=file_stem, parent_folder_ids=[file.folder_id])
+            folder_id = file.folder_id
         elif file.folder_path:
-            logger.info(f"Searching for '{file.name}' in folder path '{file.folder_path}'")
-            path = Path(file.folder_path) / file.name
-            response = self.hs.files.files_api.do_search(path=str(path))
+            folder_id = self.get_folder_id(file.folder_path)
         else:
             raise ValueError("Folder is required when searching for files, please specify `folder_id` or `folder_path`")
 
-        if not response.results:
+        result = None
+        if folder_id is not None:
+            result = self.get_folder_index(folder_id).get(file.name)
+        if result is None:
             raise FileNotFoundError(f"File not found in folder. id={file.folder_id}, path={file.folder_path}")
-        result: File = response.results[0]
         logger.info(f"Found file: id={result.id}, path={result.path}, url={result.url}")
         return result
 
+    def has_file(self, identifier: str, folder_id: t.Optional[str] = None, folder_path: t.Optional[str] = None) -> bool:
+        """
+        Check whether a file still exists within its folder, using the folder index.
+        """
+        if not folder_id and folder_path:
+            folder_id = self.get_folder_id(folder_path)
+        if folder_id is None:
+            return False
+        return any(str(result.id) == str(identifier) for result in self.get_folder_index(folder_id).values())
+
+    def once(
+        self, results: t.Dict[str, t.Any], futures: t.Dict[str, Future], key: str, lookup: t.Callable[[str], t.Any]
+    ) -> t.Any:
+        """
+        Run a lookup only once per key, unless its result is known already. Concurrent lookups of the
+        same key wait for the first one, lookups of other keys run concurrently. Failed lookups are
+        retried by the next caller.
+
+        The folder lock is only held while checking for results, and lookups in progress.
+        """
+        with self.folder_lock:
+            if key in results:
+                return results[key]
+            future = futures.get(key)
+            owner = future is None
+            if future is None:
+                future = futures[key] = Future()
+        if owner:
+            try:
+                future.set_result(lookup(key))
+            except Exception as ex:
+                future.set_exception(ex)
+            finally:
+                with self.folder_lock:
+                    futures.pop(key, None)
+        return future.result()
+
+    def get_folder_id(self, folder_path: str) -> t.Optional[str]:
+        """
+        Resolve folder path to folder identifier, once. Returns `None` when the folder does not exist.
+        """
+        folder_path = self.normalize_folder_path(folder_path)
+        return self.once(self.folder_ids, self.folder_id_futures, folder_path, self.resolve_folder_id)
+
+    @staticmethod
+    def normalize_folder_path(folder_path: str) -> str:
+        """
+        Normalize a folder path to a single leading slash, and no trailing slash, like the API reports it.
+        """
+        return "/" + str(folder_path).strip("/")
+
+    def resolve_folder_id(self, folder_path: str) -> t.Optional[str]:
+        logger.info(f"Resolving folder path '{folder_path}'")
+        folder_id = None
+        for folder in self.iter_folders(prefetch=False, path=folder_path):
+            if folder.path == folder_path:
+                folder_id = folder.id
+                break
+        with self.folder_lock:
+            self.folder_ids[folder_path] = folder_id
+        return folder_id
+
+    def get_folder_index(self, folder_id: str) -> t.Dict[str, File]:
+        """
+        List all files within a folder once, and return them indexed by file name.
+        """
+        with self.folder_lock:
+            hit = folder_id in self.folder_index or folder_id in self.folder_index_futures
+        self.metrics.cache("folder-index", hit=hit)
+        return self.once(self.folder_index, self.folder_index_futures, folder_id, self.list_folder)
+
+    def list_folder(self, folder_id: str) -> t.Dict[str, File]:
+        logger.info(f"Listing files in folder id '{folder_id}'")
+        index = {self.get_file_name(result): result for result in self.iter_files(parent_folder_ids=[folder_id])}
+        with self.folder_lock:
+            # Keep files which have been uploaded while listing the folder.
+            index.update(self.folder_index.get(folder_id, {}))
+            self.folder_index[folder_id] = index
+        return index
+
+    def add_to_folder_index(self, file: "HubSpotFile", result: File):
+        """
+        Register a newly uploaded file with the folder index.
+        """
+        folder_id = file.folder_id or result.parent_folder_id
+        if folder_id is None:
+            return
+        with self.folder_lock:
+            if file.folder_path:
+                self.folder_ids[self.normalize_folder_path(file.folder_path)] = folder_id
+            self.folder_index.setdefault(folder_id, {})[str(file.name)] = result
+
+    @staticmethod
+    def get_file_name(file: File) -> str:
+        """
+        Compute the full file name, because HubSpot stores name and extension separately.
+        """
+        if file.path:
+            return Path(file.path).name
+        if file.extension:
+            return f"{file.name}.{file.extension}"
+        return str(file.name)
+
     def save_file(self, file_id: str, source: str):
         """
         Save / overwrite existing file.
         """
+        if self.use_streaming(source):
+            return self.stream_file(
+                "PUT", f"/files/v3/files/{file_id}", source, fields=[("options", json.dumps(self.FILE_OPTIONS))]
+            )
         return self.hs.files.files_api.replace(file_id=file_id, file=source, options=json.dumps(self.FILE_OPTIONS))
 
-    def delete_file_by_id(self, identifier: str) -> t.Optional[File]:
+    def use_streaming(self, source: t.Union[str, Path]) -> bool:
+        """
+        Whether to stream a file from disk, instead of reading it into memory before uploading it.
+        """
+        try:
+            return os.stat(source).st_size > self.STREAMING_THRESHOLD
+        except (OSError, TypeError, ValueError):
+            return False
+
+    def stream_file(
+        self, method: str, path: str, source: t.Union[str, Path], fields: t.List[t.Tuple[str, str]]
+    ) -> File:
+        """
+        Upload a file using a `multipart/form-data` request, reading it from disk in chunks.
+
+        The generated HubSpot client reads the whole file into memory, and encodes the
+        request body in memory once more, so the memory usage grows with the file size.
+        Streamed requests are rate-limited, retried, and measured like all other requests.
+        """
+        api_client = self.hs.files.files_api.api_client
+        url = api_client.configuration.host + path
+        body = MultipartFile(fields=fields, name="file", path=source)
+
+        request = functools.partial(self.send_request, api_client)
+
+        def request_measured(method: str, url: str, body: MultipartFile) -> RESTResponse:
+            headers = dict(api_client.default_headers)
+            headers.update(
+                {
+                    "Accept": "application/json",
+                    "Content-Type": body.content_type,
+                    "Content-Length": str(len(body)),
+                }
+            )
+            api_client.update_params_for_auth(headers, [], ["oauth2"])
+            return self.metrics.measure(request, method, url, body=body, headers=headers)
+
+        logger.info(f"Streaming upload: {source} ({len(body)} bytes)")
+        response = self.rate_limiter.call(method, request_measured, method, url, body)
+        return api_client.deserialize(response, "File")
+
+    @staticmethod
+    def send_request(
+        api_client: t.Any, method: str, url: str, body: t.Any, headers: t.Dict[str, str], **kwargs
+    ) -> RESTResponse:
+        """
+        Send a request body as it is, bypassing the request encoding of the REST client,
+        and raise the same exceptions it does, from the package of the API client.
+        """
+        exceptions = importlib.import_module(f"{api_client.__module__.rpartition('.')[0]}.exceptions")
+        response = RESTResponse(api_client.rest_client.pool_manager.request(method, url, body=body, headers=headers))
+        if 200 <= response.status <= 299:
+            return response
+        for status, name in [(401, "UnauthorizedException"), (403, "ForbiddenException"), (404, "NotFoundException")]:
+            if response.status == status:
+                raise getattr(exceptions, name)(http_resp=response)
+        if 500 <= response.status <= 599:
+            raise exceptions.ServiceException(http_resp=response)
+        raise exceptions.ApiException(http_resp=response)
+
+    def request_compressed(
+        self,
+        send_request: t.Callable,
+        method: str,
+        url: str,
+        data: bytes,
+        query_params: t.Optional[t.List[t.Tuple[str, t.Any]]] = None,
+        headers: t.Optional[t.Dict[str, str]] = None,
+        **kwargs,
+    ) -> RESTResponse:
+        """
+        Send a JSON request body gzip-compressed, and record the number of bytes saved.
+        """
+        body = gzip.compress(data, compresslevel=6)
+        headers = dict(headers or {})
+        headers.setdefault("Content-Type", "application/json")
+        headers["Content-Encoding"] = "gzip"
+        if query_params:
+            url += "?" + urlencode(query_params)
+        response = self.metrics.measure(send_request, method, url, body=body, headers=headers)
+        self.metrics.compressed(method, url, len(data) - len(body))
+        return response
+
+    def delete_file_by_id(self, identifier: str) -> t.List[File]:
         """
         Delete file by file identifier.
         """
-        response = self.hs.files.files_api.do_search(ids=[identifier])
-        if not response.results:
+        files = list(self.iter_files(ids=[identifier]))
+        if not files:
             logger.info(f"File not found: id={identifier}")
-            return None
-        result: File = response.results[0]
-        return self.do_delete_file_by_id(result.id)
+            return []
+        return self.delete_files(files)
 
-    def delete_files_by_path(self, path: str) -> None:
+    def delete_files_by_path(self, path: str) -> t.List[File]:
         """
         Delete files by path.
         """
-        response = self.hs.files.files_api.do_search(path=path)
-        if not response.results:
+        files = list(self.iter_files(path=path))
+        if not files:
             logger.info(f"Files not found: path={path}")
-            return
-        result: File
-        for result in response.results:
-            try:
-                self.do_delete_file_by_id(result.id)
-            except hubspot.files.exceptions.NotFoundException:
-                pass
+            return []
+        return self.delete_files(files)
 
-    def do_delete_file_by_id(self, identifier: str) -> File:
+    def find_files(self, path_prefix: t.Optional[str] = None, name_pattern: t.Optional[str] = None) -> t.List[File]:
         """
-        Effectively delete file by file identifier, confirming the delete action.
+        Find files within a folder hierarchy, and/or by file name pattern, using shell-style wildcards.
         """
-        file = self.hs.files.files_api.get_by_id(identifier)
-        logger.info(f"About to delete file: id='{file.id}'\n{file}")
-        if os.environ.get("CONFIRM") == "yes":
-            outcome = True
+        if not path_prefix and not name_pattern:
+            raise ValueError("Finding files needs a path prefix or a name pattern")
+        candidates: t.Iterable[File]
+        if path_prefix:
+            prefix = path_prefix.rstrip("/")
+            folders = [
+                folder
+                for folder in self.iter_folders()
+                if folder.path == prefix or str(folder.path).startswith(prefix + "/")
+            ]
+            logger.info(f"Found {len(folders)} folders matching path prefix '{path_prefix}'")
+            candidates = itertools.chain(
+                *(self.iter_files(parent_folder_ids=[folder.id]) for folder in folders),
+                self.iter_files(path=prefix),
+            )
         else:
-            outcome = confirm("Please confirm deletion (archival)")
-        if outcome is True:
-            return self.hs.files.files_api.archive(file.id)
-        return None
+            candidates = self.iter_files()
+        files: t.Dict[str, File] = {}
+        for file in candidates:
+            if not name_pattern or fnmatch.fnmatchcase(self.get_file_name(file), name_pattern):
+                files[file.id] = file
+        return list(files.values())
+
+    def find_blogposts(
+        self, name_pattern: t.Optional[str] = None, content_group_id: t.Optional[str] = None
+    ) -> t.List[BlogPost]:
+        """
+        Find blog posts by content group, and/or by name pattern, using shell-style wildcards.
+        """
+        if not name_pattern and not content_group_id:
+            raise ValueError("Finding blog posts needs a name pattern or a content group identifier")
+        filters: t.Dict[str, t.Any] = {}
+        if content_group_id:
+            filters["contentGroupId"] = content_group_id
+        return [
+            post
+            for post in self.iter_blogposts(**filters)
+            if not name_pattern or fnmatch.fnmatchcase(str(post.name), name_pattern)
+        ]
+
+    def delete_files(self, files: t.List[File]) -> t.List[File]:
+        """
+        Delete / archive multiple files concurrently, after confirming the delete action once.
+        """
+        summary = [f"id={file.id}, path={file.path}" for file in files]
+        if not self.confirm_bulk_delete("files", summary):
+            return []
+        deleted = self.archive_many(
+            self.hs.files.files_api.archive, files, not_found=hubspot.files.exceptions.NotFoundException
+        )
+        with self.folder_lock:
+            for file in deleted:
+                self.folder_index.get(file.parent_folder_id, {}).pop(self.get_file_name(file), None)
+        return deleted
+
+    def delete_blogposts(self, posts: t.List[BlogPost]) -> t.List[BlogPost]:
+        """
+        Delete / archive multiple blog posts concurrently, after confirming the delete action once.
+        """
+        summary = [f"id={post.id}, name={post.name}, url={post.url}" for post in posts]
+        if not self.confirm_bulk_delete("blog posts", summary):
+            return []
+        return self.archive_many(
+            self.hs.cms.blogs.blog_posts.basic_api.archive,
+            posts,
+            not_found=hubspot.cms.blogs.blog_posts.exceptions.NotFoundException,
+        )
+
+    def confirm_bulk_delete(self, label: str, summary: t.List[str]) -> bool:
+        """
+        Present a summary of items about to be deleted, and confirm the delete action once.
+        """
+        if not summary:
+            logger.info(f"No {label} found")
+            return False
+        lines = summary[: self.SUMMARY_SIZE]
+        if len(summary) > self.SUMMARY_SIZE:
+            lines.append(f"... and {len(summary) - self.SUMMARY_SIZE} more")
+        logger.info(f"About to delete {len(summary)} {label}:\n" + "\n".join(lines))
+        return confirm_delete(f"Please confirm deletion (archival) of {len(summary)} {label}")
+
+    def archive_many(self, archive: t.Callable, items: t.List[t.Any], not_found: t.Type[Exception]) -> t.List[t.Any]:
+        """
+        Archive items concurrently. Items which are already gone are skipped.
+        """
+
+        def archive_one(item):
+            try:
+                archive(item.id)
+                return item
+            except not_found:
+                logger.warning(f"Item not found, skipping: id={item.id}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.CONCURRENCY) as executor:
+            deleted = [item for item in executor.map(archive_one, items) if item is not None]
+        logger.info(f"Deleted {len(deleted)} of {len(items)} items")
+        return deleted
 
 
 class HubSpotBlogPost:
@@ -189,12 +761,24 @@ class HubSpotBlogPost:
         name: t.Optional[str] = None,
         content_group_id: t.Optional[str] = None,
         autocreate: t.Optional[bool] = True,
+        index: t.Optional[BlogPostIndex] = None,
+        fetch: bool = True,
+        post: t.Optional[BlogPost] = None,
     ):
+        """
+        When the blog post has been looked up or created already, pass it as `post`.
+        """
         self.hsa = hubspot_adapter
         self.hs = hubspot_adapter.hs
-        self.post: t.Optional[BlogPost] = None
+        self.post: t.Optional[BlogPost] = post
         self.content_group_id = content_group_id
         self.autocreate = autocreate
+        self.index = index
+        self.fetch = fetch
+        # Whether the blog post identifier has been resolved from the local index only.
+        self.indexed = False
+        # Modified attributes, which will be sent on `save()`.
+        self.changes: t.Dict[str, t.Any] = {}
 
         if identifier and name:
             raise ValueError("Either 'identifier' or 'name' must be specified, not both")
@@ -207,39 +791,100 @@ class HubSpotBlogPost:
     def __str__(self):
         return f"{self.__class__.__name__} identifier={self.identifier}, name={self.name}"
 
+    @profiled("blogpost.load")
     def load(self):
         """
         Load blog post from HubSpot API, either by identifier, or by name.
         """
         logger.info(f"Loading blog post: {self}")
-        if self.identifier:
+        if self.post is not None and self.post.id:
+            self.identifier = self.post.id
+            self.remember(self.post)
+        elif self.identifier and not self.fetch:
+            self.post = BlogPost(id=self.identifier)
+        elif self.identifier:
             self.post = self.hs.cms.blogs.blog_posts.basic_api.get_by_id(self.identifier)
             self.name = self.post.name
         elif self.name:
-            self.post = self.hsa.get_or_create_blogpost(self, autocreate=self.autocreate)
-            self.identifier = self.post.id
-
+            record = None
+            if self.index is not None:
+                record = self.index.get(self.name)
+                self.hsa.metrics.cache("blogpost-index", hit=record is not None)
+            if record is not None:
+                logger.info(f"Found blog post in local index: id={record.id}, updated={record.updated}")
+                self.post = BlogPost(id=record.id, name=self.name)
+                self.identifier = record.id
+                self.indexed = True
+            else:
+                self.post = self.hsa.get_or_create_blogpost(self, autocreate=self.autocreate)
+                self.identifier = self.post.id
+                self.remember(self.post)
+
+    def set(self, **attributes):  # noqa: A003
+        """
+        Modify blog post attributes, like `post_body`, tracking them for the next `save()`.
+        """
+        for name, value in attributes.items():
+            if name not in BlogPost.openapi_types:
+                raise AttributeError(f"Unknown blog post attribute: {name}")
+            self.changes[name] = value
+            if self.post is not None:
+                setattr(self.post, name, value)
+        return self
+
+    @profiled("blogpost.save")
     def save(self):
         """
-        Save / overwrite existing blog post at HubSpot API.
+        Save modified attributes of existing blog post at HubSpot API.
+
+        Only attributes modified using `set()` are sent to the API.
+
+        When the blog post has been resolved from the local index, and the API
+        reports it is gone, or in conflict, invalidate the index entry, load
+        the blog post from the API, and try again.
         """
         logger.info(f"Saving blog post: {self}")
-        post: BlogPost = deepcopy(self.post)
-        post.created = None
-        post.updated = None
-        return self.hs.cms.blogs.blog_posts.basic_api.update(self.identifier, post)
+        if not self.changes:
+            logger.info(f"Blog post has no changes: {self}")
+            return self.post
+        try:
+            result = self.hs.cms.blogs.blog_posts.basic_api.update(self.identifier, BlogPost(**self.changes))
+        except hubspot.cms.blogs.blog_posts.exceptions.ApiException as ex:
+            if not self.indexed or ex.status not in [404, 409]:
+                raise
+            logger.warning(f"Blog post in local index is stale, reloading: {self}")
+            self.invalidate()
+            self.load()
+            return self.save()
+        self.changes = {}
+        if result is not None:
+            self.post = result
+        self.remember(result)
+        return result
+
+    def remember(self, post: t.Optional[BlogPost]):
+        """
+        Record blog post in the local index.
+        """
+        if self.index is not None and self.name and post is not None and post.id:
+            self.index.put(self.name, post)
+
+    def invalidate(self):
+        """
+        Remove blog post from the local index, and forget its identifier.
+        """
+        if self.index is not None and self.name:
+            self.index.forget(self.name)
+        self.identifier = None
+        self.post = None
+        self.indexed = False
 
     def delete(self):
         """
         Delete / archive blog post.
         """
         logger.info(f"Deleting blog post: {self.post}")
-
-        if os.environ.get("CONFIRM") == "yes":
-            outcome = True
-        else:
-            outcome = confirm("Please confirm deletion (archival)")
-        if outcome is True:
+        if confirm_delete():
             return self.hs.cms.blogs.blog_posts.basic_api.archive(self.identifier)
         return None
 
@@ -287,6 +932,7 @@ class HubSpotFile:
             f"name={self.name}, folder={self.folder_id or self.folder_path}"
         )
 
+    @profiled("file.load")
     def load(self):
         """
         Load file from HubSpot API, either by identifier, or by name.
@@ -299,6 +945,7 @@ class HubSpotFile:
             self.file = self.hsa.get_or_create_file(self)
             self.identifier = self.file.id
 
+    @profiled("file.save")
     def save(self):
         """
         Save / overwrite / replace existing file at HubSpot API.
@@ -0,0 +1,517 @@
+import asyncio
+import json
+import logging
+import time
+import types
+import typing as t
+from pathlib import Path
+
+import httpx
+from hubspot import files
+from hubspot.cms.blogs import blog_posts
+from hubspot.cms.blogs.blog_posts import BlogPost
+from hubspot.files import File
+
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.util.metrics import Metrics
+from hubspot_tech_writing.util.metrics import metrics as default_metrics
+from hubspot_tech_writing.util.ratelimit import RateLimiter
+from hubspot_tech_writing.util.store import BlogPostIndex
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncApiException(Exception):
+    """
+    The HubSpot API responded with an error status.
+
+    Like the exceptions of the generated HubSpot client, it has `status`, `headers`,
+    and `body` attributes, so the rate limiter can decide about retrying the request.
+    """
+
+    def __init__(self, response: httpx.Response):
+        self.status = response.status_code
+        self.reason = response.reason_phrase
+        self.headers = response.headers
+        self.body = response.content
+        super().__init__(f"({self.status}) {self.reason}: {response.text}")
+
+
+class AsyncHubSpotAdapter:
+    """
+    Asynchronous counterpart to `HubSpotAdapter`, for blog posts and files, using an HTTP
+    client with connection pooling, and HTTP/2 multiplexing, when the server supports it.
+
+    Requests are routed through the same rate limiter, and recorded into the same metrics,
+    as the synchronous adapter. Responses are decoded into the models of the HubSpot
+    client, like `BlogPost`, and `File`. Use it as an asynchronous context manager,
+    in order to close its connections.
+    """
+
+    DEFAULT_HOST = "https://api.hubapi.com"
+
+    FILE_OPTIONS = HubSpotAdapter.FILE_OPTIONS
+    PAGE_SIZE = HubSpotAdapter.PAGE_SIZE
+
+    # The maximum number of concurrent connections.
+    MAX_CONNECTIONS = 100
+
+    def __init__(
+        self,
+        access_token: str,
+        host: t.Optional[str] = None,
+        rate_limiter: t.Optional[RateLimiter] = None,
+        metrics: t.Optional[Metrics] = None,
+        http2: bool = True,
+        timeout: float = 30.0,
+    ):
+        if not access_token:
+            raise ValueError("Communicating with the HubSpot API needs an access token")
+        self.rate_limiter = rate_limiter or RateLimiter.for_access_token(access_token)
+        self.metrics = metrics or default_metrics
+        self.metrics.add_rate_limiter(self.rate_limiter)
+        self.client = httpx.AsyncClient(
+            base_url=host or self.DEFAULT_HOST,
+            headers={"Authorization": f"Bearer {access_token}", "Accept": "application/json"},
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=self.MAX_CONNECTIONS),
+        )
+        # Only used for converting between JSON and the models of the HubSpot client.
+        self.blog_posts_client = blog_posts.ApiClient()
+        self.files_client = files.ApiClient()
+
+        # Resolved folder identifiers, by folder path, and files within folders, by folder identifier and file name.
+        self.folder_ids: t.Dict[str, t.Optional[str]] = {}
+        self.folder_index: t.Dict[str, t.Dict[str, File]] = {}
+        # Lookups in flight, by folder path and folder identifier. Only duplicate lookups wait for each other.
+        self.folder_id_tasks: t.Dict[str, asyncio.Task] = {}
+        self.folder_index_tasks: t.Dict[str, asyncio.Task] = {}
+
+    async def __aenter__(self) -> "AsyncHubSpotAdapter":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Invoke an HTTP request, rate-limited, with retries, and measured.
+        """
+        return await self.rate_limiter.call_async(method, self.request_measured, method, path, **kwargs)
+
+    async def request_measured(self, method: str, path: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        status = None
+        response = None
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            status = response.status_code
+            if not response.is_success:
+                raise AsyncApiException(response)
+            return response
+        finally:
+            self.metrics.record(
+                method,
+                path,
+                duration=time.perf_counter() - start,
+                status=status,
+                bytes_sent=int(response.request.headers.get("Content-Length", 0)) if response is not None else 0,
+                bytes_received=len(response.content) if response is not None else 0,
+            )
+
+    async def paginate(
+        self,
+        path: str,
+        response_type: str,
+        deserialize: t.Callable,
+        params: t.Dict[str, t.Any],
+        page_size: t.Optional[int] = None,
+    ) -> t.AsyncGenerator[t.Any, None]:
+        """
+        Iterate all results of a paginated API operation, following its `after` cursors lazily.
+        """
+        params = dict(params, limit=page_size or self.PAGE_SIZE)
+        while True:
+            response = deserialize(await self.request("GET", path, params=params), response_type)
+            for result in response.results:
+                yield result
+            if response.paging is None or response.paging.next is None:
+                return
+            params["after"] = response.paging.next.after
+
+    @staticmethod
+    def deserialize_with(api_client: t.Any) -> t.Callable[[httpx.Response, str], t.Any]:
+        def deserialize(response: httpx.Response, response_type: str) -> t.Any:
+            return api_client.deserialize(types.SimpleNamespace(data=response.content), response_type)
+
+        return deserialize
+
+    def deserialize_blogpost(self, response: httpx.Response, response_type: str = "BlogPost") -> t.Any:
+        return self.deserialize_with(self.blog_posts_client)(response, response_type)
+
+    def deserialize_file(self, response: httpx.Response, response_type: str = "File") -> t.Any:
+        return self.deserialize_with(self.files_client)(response, response_type)
+
+    def iter_blogposts(self, page_size: t.Optional[int] = None, **filters) -> t.AsyncGenerator[BlogPost, None]:
+        """
+        Iterate blog posts, filtered by properties, like `name`, or `contentGroupId`.
+        """
+        return self.paginate(
+            "/cms/v3/blogs/posts",
+            "CollectionResponseWithTotalBlogPostForwardPaging",
+            self.deserialize_blogpost,
+            filters,
+            page_size=page_size,
+        )
+
+    async def get_blogpost_by_name(self, name: str) -> BlogPost:
+        """
+        Find blog post by name.
+        """
+        async for post in self.iter_blogposts(name=name):
+            return post
+        raise FileNotFoundError(f"Blog post not found: {name}")
+
+    async def get_blogpost(self, identifier: str) -> BlogPost:
+        return self.deserialize_blogpost(await self.request("GET", f"/cms/v3/blogs/posts/{identifier}"))
+
+    async def create_blogpost(self, name: str, content_group_id: str) -> BlogPost:
+        """
+        Create a blog post within a blog (content group), using its name as slug.
+        """
+        post = BlogPost(name=name, slug=name, content_group_id=content_group_id)
+        body = self.blog_posts_client.sanitize_for_serialization(post)
+        return self.deserialize_blogpost(await self.request("POST", "/cms/v3/blogs/posts", json=body))
+
+    async def get_or_create_blogpost(self, article: "AsyncHubSpotBlogPost", autocreate: bool = True) -> BlogPost:
+        """
+        When a blog post exists, return it. If it does not exist, create it.
+        """
+        if not article.name:
+            raise ValueError("Blog post needs a 'name'")
+        try:
+            return await self.get_blogpost_by_name(article.name)
+        except FileNotFoundError:
+            logger.warning(f"Blog post does not exist: {article.name}")
+            if not autocreate:
+                raise
+            if not article.content_group_id:
+                raise ValueError("Blog (content group) identifier is required for creating a blog post") from None
+            logger.info(f"Creating: {article}")
+            return await self.create_blogpost(article.name, article.content_group_id)
+
+    async def update_blogpost(self, identifier: str, changes: t.Dict[str, t.Any]) -> BlogPost:
+        """
+        Update blog post, only sending the modified attributes, using the names of `BlogPost`, like `post_body`.
+        """
+        body = self.blog_posts_client.sanitize_for_serialization(BlogPost(**changes))
+        return self.deserialize_blogpost(await self.request("PATCH", f"/cms/v3/blogs/posts/{identifier}", json=body))
+
+    async def archive_blogpost(self, identifier: str):
+        await self.request("DELETE", f"/cms/v3/blogs/posts/{identifier}")
+
+    def iter_files(self, page_size: t.Optional[int] = None, **criteria) -> t.AsyncGenerator[File, None]:
+        """
+        Iterate files, filtered by search criteria, like `path`, or `parentFolderIds`.
+        """
+        return self.paginate(
+            "/files/v3/files/search", "CollectionResponseFile", self.deserialize_file, criteria, page_size=page_size
+        )
+
+    def iter_folders(self, page_size: t.Optional[int] = None, **criteria) -> t.AsyncGenerator[t.Any, None]:
+        """
+        Iterate folders, filtered by search criteria, like `path`.
+        """
+        return self.paginate(
+            "/files/v3/folders/search",
+            "CollectionResponseFolder",
+            self.deserialize_file,
+            criteria,
+            page_size=page_size,
+        )
+
+    @staticmethod
+    async def once(tasks: t.Dict[str, asyncio.Task], key: str, lookup: t.Callable[[str], t.Awaitable]) -> t.Any:
+        """
+        Run a lookup only once per key at a time. Concurrent lookups of the same key wait for the
+        first one, lookups of other keys run concurrently. Failed lookups are retried by the next caller.
+        """
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = asyncio.ensure_future(lookup(key))
+            task.add_done_callback(lambda _: tasks.pop(key, None))
+        # Don't cancel the lookup other callers are waiting for, when this caller is cancelled.
+        return await asyncio.shield(task)
+
+    async def get_folder_id(self, folder_path: str) -> t.Optional[str]:
+        """
+        Resolve folder path to folder identifier, once. Returns `None` when the folder does not exist.
+        """
+        folder_path = HubSpotAdapter.normalize_folder_path(folder_path)
+        if folder_path in self.folder_ids:
+            return self.folder_ids[folder_path]
+        return await self.once(self.folder_id_tasks, folder_path, self.resolve_folder_id)
+
+    async def resolve_folder_id(self, folder_path: str) -> t.Optional[str]:
+        logger.info(f"Resolving folder path '{folder_path}'")
+        folder_id = None
+        async for folder in self.iter_folders(path=folder_path):
+            if folder.path == folder_path:
+                folder_id = folder.id
+                break
+        self.folder_ids[folder_path] = folder_id
+        return folder_id
+
+    async def get_folder_index(self, folder_id: str) -> t.Dict[str, File]:
+        """
+        List all files within a folder once, and return them indexed by file name.
+        """
+        hit = folder_id in self.folder_index
+        self.metrics.cache("folder-index", hit=hit or folder_id in self.folder_index_tasks)
+        if hit:
+            return self.folder_index[folder_id]
+        return await self.once(self.folder_index_tasks, folder_id, self.list_folder)
+
+    async def list_folder(self, folder_id: str) -> t.Dict[str, File]:
+        logger.info(f"Listing files in folder id '{folder_id}'")
+        index = {
+            HubSpotAdapter.get_file_name(file): file async for file in self.iter_files(parentFolderIds=[folder_id])
+        }
+        # Keep files which have been uploaded while listing the folder.
+        index.update(self.folder_index.get(folder_id, {}))
+        self.folder_index[folder_id] = index
+        return index
+
+    async def get_file_by_name(self, file: "AsyncHubSpotFile") -> File:
+        """
+        Find file by name, within the folder index of its target folder.
+        """
+        folder_id = file.folder_id or await self.get_folder_id(str(file.folder_path))
+        result = None
+        if folder_id is not None:
+            result = (await self.get_folder_index(folder_id)).get(str(file.name))
+        if result is None:
+            raise FileNotFoundError(f"File not found in folder. id={file.folder_id}, path={file.folder_path}")
+        logger.info(f"Found file: id={result.id}, path={result.path}, url={result.url}")
+        return result
+
+    async def get_or_create_file(self, file: "AsyncHubSpotFile") -> File:
+        """
+        When a file exists, return its instance metadata. If it does not exist, upload it.
+        """
+        try:
+            return await self.get_file_by_name(file)
+        except FileNotFoundError:
+            logger.warning(f"File does not exist: {file.name}")
+        logger.info(f"Creating: {file}")
+        data = {"fileName": str(file.name), "options": json.dumps(self.FILE_OPTIONS)}
+        if file.folder_id:
+            data["folderId"] = file.folder_id
+        else:
+            data["folderPath"] = str(file.folder_path)
+        result = await self.send_file("POST", "/files/v3/files", file.source, data)
+        folder_id = file.folder_id or result.parent_folder_id
+        if folder_id is not None:
+            if file.folder_path:
+                self.folder_ids[HubSpotAdapter.normalize_folder_path(file.folder_path)] = folder_id
+            self.folder_index.setdefault(folder_id, {})[str(file.name)] = result
+        return result
+
+    async def save_file(self, file_id: str, source: t.Union[str, Path]) -> File:
+        """
+        Save / overwrite existing file.
+        """
+        return await self.send_file(
+            "PUT", f"/files/v3/files/{file_id}", source, {"options": json.dumps(self.FILE_OPTIONS)}
+        )
+
+    async def send_file(self, method: str, path: str, source: t.Union[str, Path], data: t.Dict[str, str]) -> File:
+        """
+        Upload a file using a `multipart/form-data` request. The file is read in chunks.
+        """
+
+        async def request(method: str, path: str) -> httpx.Response:
+            with open(source, "rb") as fp:
+                return await self.request_measured(method, path, data=data, files={"file": (Path(source).name, fp)})
+
+        return self.deserialize_file(await self.rate_limiter.call_async(method, request, method, path))
+
+    async def archive_file(self, identifier: str):
+        await self.request("DELETE", f"/files/v3/files/{identifier}")
+
+
+class AsyncHubSpotBlogPost:
+    """
+    Asynchronous counterpart to `HubSpotBlogPost`. Use `await AsyncHubSpotBlogPost(...).load()`.
+    """
+
+    def __init__(
+        self,
+        hubspot_adapter: AsyncHubSpotAdapter,
+        identifier: t.Optional[str] = None,
+        name: t.Optional[str] = None,
+        content_group_id: t.Optional[str] = None,
+        autocreate: bool = True,
+        index: t.Optional[BlogPostIndex] = None,
+    ):
+        if identifier and name:
+            raise ValueError("Either 'identifier' or 'name' must be specified, not both")
+        if not identifier and not name:
+            raise ValueError("One of 'identifier' or 'name' must be specified")
+        self.hsa = hubspot_adapter
+        self.identifier = identifier
+        self.name = name
+        self.content_group_id = content_group_id
+        self.autocreate = autocreate
+        self.index = index
+        self.post: t.Optional[BlogPost] = None
+        # Whether the blog post identifier has been resolved from the local index only.
+        self.indexed = False
+        # Modified attributes, which will be sent on `save()`.
+        self.changes: t.Dict[str, t.Any] = {}
+
+    def __str__(self):
+        return f"{self.__class__.__name__} identifier={self.identifier}, name={self.name}"
+
+    async def load(self) -> "AsyncHubSpotBlogPost":
+        """
+        Load blog post from HubSpot API, either by identifier, or by name.
+        """
+        logger.info(f"Loading blog post: {self}")
+        if self.identifier:
+            self.post = await self.hsa.get_blogpost(self.identifier)
+            self.name = self.post.name
+        else:
+            record = self.index.get(str(self.name)) if self.index is not None else None
+            if record is not None:
+                logger.info(f"Found blog post in local index: id={record.id}, updated={record.updated}")
+                self.post = BlogPost(id=record.id, name=self.name)
+                self.indexed = True
+            else:
+                self.post = await self.hsa.get_or_create_blogpost(self, autocreate=self.autocreate)
+                self.remember(self.post)
+            self.identifier = self.post.id
+        return self
+
+    def set(self, **attributes) -> "AsyncHubSpotBlogPost":  # noqa: A003
+        """
+        Modify blog post attributes, like `post_body`, tracking them for the next `save()`.
+        """
+        for name, value in attributes.items():
+            if name not in BlogPost.openapi_types:
+                raise AttributeError(f"Unknown blog post attribute: {name}")
+            self.changes[name] = value
+        return self
+
+    async def save(self) -> t.Optional[BlogPost]:
+        """
+        Save modified attributes of existing blog post at HubSpot API.
+
+        When the blog post has been resolved from the local index, and the API
+        reports it is gone, or in conflict, invalidate the index entry, load
+        the blog post from the API, and try again.
+        """
+        logger.info(f"Saving blog post: {self}")
+        if not self.changes:
+            logger.info(f"Blog post has no changes: {self}")
+            return self.post
+        try:
+            self.post = await self.hsa.update_blogpost(str(self.identifier), self.changes)
+        except AsyncApiException as ex:
+            if not self.indexed or ex.status not in [404, 409]:
+                raise
+            logger.warning(f"Blog post in local index is stale, reloading: {self}")
+            self.invalidate()
+            await self.load()
+            return await self.save()
+        self.changes = {}
+        self.remember(self.post)
+        return self.post
+
+    def remember(self, post: t.Optional[BlogPost]):
+        """
+        Record blog post in the local index.
+        """
+        if self.index is not None and self.name and post is not None and post.id:
+            self.index.put(self.name, post)
+
+    def invalidate(self):
+        """
+        Remove blog post from the local index, and forget its identifier.
+        """
+        if self.index is not None and self.name:
+            self.index.forget(self.name)
+        self.identifier = None
+        self.post = None
+        self.indexed = False
+
+    async def delete(self):
+        """
+        Delete / archive blog post.
+        """
+        logger.info(f"Deleting blog post: {self}")
+        await self.hsa.archive_blogpost(str(self.identifier))
+
+
+class AsyncHubSpotFile:
+    """
+    Asynchronous counterpart to `HubSpotFile`. Use `await AsyncHubSpotFile(...).load()`.
+    """
+
+    def __init__(
+        self,
+        hubspot_adapter: AsyncHubSpotAdapter,
+        source: t.Union[str, Path],
+        name: t.Optional[str] = None,
+        folder_id: t.Optional[str] = None,
+        folder_path: t.Optional[str] = None,
+    ):
+        if folder_id and folder_path:
+            raise ValueError("One of 'folder_id' or 'folder_path' must be specified, not both")
+        if not folder_id and not folder_path:
+            raise ValueError(
+                "Folder is required for uploading files, please specify either `folder_id` or `folder_path`"
+            )
+        self.hsa = hubspot_adapter
+        self.source = source
+        self.name = name or Path(source).name
+        self.folder_id = folder_id
+        self.folder_path = folder_path
+        self.identifier: t.Optional[str] = None
+        self.file: t.Optional[File] = None
+
+    def __str__(self):
+        return (
+            f"{self.__class__.__name__} identifier={self.identifier}, "
+            f"name={self.name}, folder={self.folder_id or self.folder_path}"
+        )
+
+    async def load(self) -> "AsyncHubSpotFile":
+        """
+        Find file by name, or upload it.
+        """
+        logger.info(f"Loading file: {self}")
+        self.file = await self.hsa.get_or_create_file(self)
+        self.identifier = self.file.id
+        return self
+
+    async def save(self) -> File:
+        """
+        Save / overwrite / replace existing file at HubSpot API.
+        """
+        if not self.identifier:
+            raise ValueError(f"Unable to save file without identifier: {self}")
+        logger.info(f"Saving file: {self}")
+        self.file = await self.hsa.save_file(self.identifier, self.source)
+        return self.file
+
+    async def delete(self):
+        """
+        Delete / archive file.
+        """
+        logger.info(f"Deleting file: {self}")
+        await self.hsa.archive_file(str(self.identifier))
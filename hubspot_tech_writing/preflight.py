@@ -0,0 +1,150 @@
+import logging
+import os
+import typing as t
+from pathlib import Path
+
+from hubspot.cms.blogs.blog_posts import BlogPost
+
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.util.html import HTMLImageTranslator
+from hubspot_tech_writing.util.store import BlogPostIndex, PublishJournal
+
+logger = logging.getLogger(__name__)
+
+
+class PreflightError(ValueError):
+    """
+    An upload would fail. It reports all problems found, not only the first one.
+    """
+
+    def __init__(self, problems: t.List[str]):
+        self.problems = problems
+        super().__init__("\n".join(problems))
+
+
+class Preflight:
+    """
+    Validate an upload before writing anything to the HubSpot API, in order to fail
+    early, instead of failing after uploading images already.
+
+    Local checks, like verifying image files exist, are conducted first. Only when
+    they succeed, blog posts are resolved using the API, so runs which were going to
+    fail anyway don't use API quota.
+    """
+
+    def __init__(
+        self,
+        hubspot_adapter: HubSpotAdapter,
+        content_group_id: t.Optional[str] = None,
+        folder_id: t.Optional[str] = None,
+        folder_path: t.Optional[str] = None,
+        blogpost_index: t.Optional[BlogPostIndex] = None,
+        journal: t.Optional[PublishJournal] = None,
+    ):
+        self.hsa = hubspot_adapter
+        self.content_group_id = content_group_id
+        self.folder_id = folder_id
+        self.folder_path = folder_path
+        self.blogpost_index = blogpost_index
+        self.journal = journal
+        self.problems: t.List[str] = []
+
+    @property
+    def has_folder(self) -> bool:
+        return bool(self.folder_id or self.folder_path)
+
+    def check_folder(self, required: bool = False) -> "Preflight":
+        """
+        Verify the target folder for files is specified consistently.
+        """
+        if self.folder_id and self.folder_path:
+            self.problems.append("One of 'folder_id' or 'folder_path' must be specified, not both")
+        elif required and not self.has_folder:
+            self.problems.append(
+                "Folder is required for uploading files, please specify either `folder_id` or `folder_path`"
+            )
+        return self
+
+    def check_file(self, source: t.Union[str, Path], limit: t.Optional[int] = None) -> "Preflight":
+        """
+        Verify a file exists, is readable, and is not larger than the upload limit.
+        """
+        limit = limit or self.hsa.MAX_FILE_SIZE
+        try:
+            size = os.stat(source).st_size
+        except OSError:
+            self.problems.append(f"File not found: {source}")
+            return self
+        if not os.access(source, os.R_OK):
+            self.problems.append(f"File is not readable: {source}")
+        elif not Path(source).is_file():
+            self.problems.append(f"Not a file: {source}")
+        elif size > limit:
+            self.problems.append(f"File is too large: {source} ({size} bytes, limit is {limit} bytes)")
+        return self
+
+    def check_images(self, source: t.Union[str, Path], html: str) -> t.List[str]:
+        """
+        Verify all local images referenced by an HTML document can be uploaded, and return their paths.
+        """
+        hit = HTMLImageTranslator(html=html, source_path=source)
+        hit.discover()
+        paths = []
+        for image in hit.images_local:
+            self.check_file(image.src, limit=self.hsa.MAX_IMAGE_SIZE)
+            paths.append(image.src)
+        return paths
+
+    def require_blogpost(self, name: str) -> t.Optional[BlogPost]:
+        """
+        Look up a single blog post, and verify it exists, or can be created.
+        Return it when it has been found.
+
+        Blog posts known from the journal or the local index are not looked up.
+        """
+        if self.journal is not None and self.journal.get_post(name) is not None:
+            return None
+        if self.blogpost_index is not None:
+            # Hits are recorded when loading the blog post from the index.
+            if self.blogpost_index.get(name) is not None:
+                return None
+            self.hsa.metrics.cache("blogpost-index", hit=False)
+        try:
+            return self.hsa.get_blogpost_by_name(name)
+        except FileNotFoundError:
+            if self.content_group_id:
+                return None
+            self.problems.append(
+                f"Blog post does not exist: {name}. "
+                f"Blog (content group) identifier is required for creating a blog post"
+            )
+        return None
+
+    def resolve_blogposts(self, names: t.List[str]) -> t.Dict[str, str]:
+        """
+        Resolve blog post names to identifiers using batch requests, and verify
+        the missing ones can be created.
+        """
+        identifiers: t.Dict[str, str] = {}
+        if self.journal is not None:
+            identifiers = {name: self.journal.posts[name] for name in names if name in self.journal.posts}
+        unresolved = [name for name in names if name not in identifiers]
+        identifiers.update(
+            self.hsa.resolve_blogposts(unresolved, content_group_id=self.content_group_id, index=self.blogpost_index)
+        )
+        missing = [name for name in names if name not in identifiers]
+        if missing and not self.content_group_id:
+            self.problems.append(
+                f"Blog (content group) identifier is required for creating blog posts: {', '.join(missing)}"
+            )
+        return identifiers
+
+    def verify(self) -> "Preflight":
+        """
+        Raise an error reporting all problems found so far.
+        """
+        if self.problems:
+            for problem in self.problems:
+                logger.error(f"Preflight check failed: {problem}")
+            raise PreflightError(self.problems)
+        return self
@@ -0,0 +1,405 @@
+import collections
+import hmac
+import io
+import json
+import logging
+import os
+import secrets
+import socketserver
+import stat
+import threading
+import time
+import typing as t
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from hubspot_tech_writing.core import Portal, convert, linkcheck, to_html, upload
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.util.common import cache_directory
+from hubspot_tech_writing.util.image import ImageOptimizer
+from hubspot_tech_writing.util.profiling import profiler
+from hubspot_tech_writing.util.store import BlogPostIndex, UploadManifest
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    """
+    A job request is invalid, reported to the client with HTTP 400.
+    """
+
+
+class JobRunner:
+    """
+    Run convert, linkcheck, and upload jobs within a long-running process.
+
+    The converter, the HubSpot API clients with their connection pools and
+    folder indexes, the upload manifests, the blog post indexes, and the image
+    optimizer's worker processes stay resident between jobs, so each job only
+    pays for its actual work. There is one set per access token. Jobs are run
+    concurrently, up to `workers` at a time.
+
+    Jobs are described by JSON objects. Relative paths are resolved against
+    the working directory of the process.
+    """
+
+    JOBS = ["convert", "linkcheck", "upload"]
+
+    def __init__(
+        self,
+        access_token: t.Optional[str] = None,
+        host: t.Optional[str] = None,
+        compress: bool = False,
+        manifest: bool = True,
+        optimizer: t.Optional[ImageOptimizer] = None,
+        workers: t.Optional[int] = None,
+    ):
+        self.access_token = access_token
+        self.host = host
+        self.compress = compress
+        self.manifest = manifest
+        self.optimizer = optimizer
+        self.workers = workers or HubSpotAdapter.CONCURRENCY
+        self.semaphore = threading.BoundedSemaphore(self.workers)
+        self.portals: t.Dict[str, Portal] = {}
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        # Number of completed and failed jobs, by job type.
+        self.completed: t.Counter[str] = collections.Counter()
+        self.failed: t.Counter[str] = collections.Counter()
+
+    def __str__(self):
+        return f"{self.__class__.__name__} workers={self.workers}, portals={len(self.portals)}"
+
+    def warm(self) -> "JobRunner":
+        """
+        Load the Markdown extensions, and set up the portal of the default access token.
+        """
+        convert(io.StringIO(""))
+        if self.access_token:
+            self.portal(self.access_token)
+        return self
+
+    def close(self):
+        if self.optimizer is not None:
+            self.optimizer.close()
+
+    def portal(self, access_token: str) -> Portal:
+        """
+        Set up the HubSpot API client, upload manifest, and blog post index of a portal, once.
+        """
+        with self.lock:
+            if access_token not in self.portals:
+                portal = Portal(
+                    access_token=access_token,
+                    hubspot_adapter=HubSpotAdapter(
+                        access_token=access_token, host=self.host, compression=self.compress
+                    ),
+                )
+                if self.manifest:
+                    portal.manifest = UploadManifest.for_access_token(access_token)
+                    portal.blogpost_index = BlogPostIndex.for_access_token(access_token)
+                logger.info(f"Set up portal: {portal.label}")
+                self.portals[access_token] = portal
+            return self.portals[access_token]
+
+    def run(self, job: str, request: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        """
+        Run a single job, and return its result.
+        """
+        if job not in self.JOBS:
+            raise JobError(f"Unknown job: {job}. Use one of: {', '.join(self.JOBS)}")
+        if not isinstance(request, dict):
+            raise JobError("Job request must be a JSON object")
+        start = time.perf_counter()
+        with self.semaphore, profiler.stage(f"serve.{job}"):
+            try:
+                result = getattr(self, job)(request)
+            except Exception:
+                with self.lock:
+                    self.failed[job] += 1
+                raise
+        duration = time.perf_counter() - start
+        with self.lock:
+            self.completed[job] += 1
+        logger.info(f"Job {job} completed in {duration:.3f}s")
+        return {"status": "ok", "duration": round(duration, 6), "result": result}
+
+    def status(self) -> t.Dict[str, t.Any]:
+        with self.lock:
+            return {
+                "status": "ok",
+                "uptime": round(time.monotonic() - self.started, 3),
+                "workers": self.workers,
+                "portals": len(self.portals),
+                "completed": dict(self.completed),
+                "failed": dict(self.failed),
+            }
+
+    @staticmethod
+    def source(request: t.Dict[str, t.Any]) -> str:
+        source = request.get("source")
+        if not source or not isinstance(source, str):
+            raise JobError("Job needs a `source` path or URL")
+        if not source.startswith("http://") and not source.startswith("https://") and not Path(source).exists():
+            raise JobError(f"Source does not exist: {source}")
+        return source
+
+    def convert(self, request: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        """
+        Convert a document, given by `source` path or URL, or Markdown `text`, to HTML.
+        """
+        if isinstance(request.get("text"), str):
+            return {"html": convert(io.StringIO(request["text"]))}
+        source = self.source(request)
+        if source.startswith("http://") or source.startswith("https://"):
+            return {"html": convert(source)}
+        return {"html": to_html(source)}
+
+    def linkcheck(self, request: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        """
+        Check a Markdown document, given by `source` path or URL, for broken links.
+        """
+        return {"ok": linkcheck(self.source(request))}
+
+    def upload(self, request: t.Dict[str, t.Any]) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        Upload a document as blog post, or another file, given by `source` path.
+        """
+        source = self.source(request)
+        access_token = request.get("access_token") or self.access_token
+        if not access_token:
+            raise JobError("Job needs an `access_token`, because the server has no default access token")
+        portal = self.portal(access_token)
+        result = upload(
+            access_token=access_token,
+            source=source,
+            name=request.get("name") or "",
+            content_group_id=request.get("content_group_id"),
+            folder_id=request.get("folder_id"),
+            folder_path=request.get("folder_path"),
+            manifest=portal.manifest,
+            hubspot_adapter=portal.hubspot_adapter,
+            blogpost_index=portal.blogpost_index,
+            optimizer=self.optimizer,
+        )
+        if result is None:
+            return None
+        return {
+            "id": str(getattr(result, "id", None)),
+            "name": getattr(result, "name", None),
+            "url": getattr(result, "url", None),
+        }
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    """
+    Accept jobs as JSON documents, using `POST /<job>`, and report the server status using `GET /status`.
+
+    Requests from web browsers are rejected: Those with an `Origin` header, those
+    addressed to a host name other than the server's, in order to defeat DNS
+    rebinding, and jobs not declared as `application/json`, which browsers can
+    not send across origins without a preflight request. On TCP ports, requests
+    must authenticate using the server's secret token, `Authorization: Bearer <token>`.
+    """
+
+    server: t.Union["JobServer", "UnixJobServer"]
+    protocol_version = "HTTP/1.1"
+
+    # The maximum size of a job document, in bytes.
+    MAX_BODY_SIZE = 1024 * 1024
+
+    def authorize(self) -> bool:
+        """
+        Check whether a request may be processed, and respond with an error otherwise.
+        """
+        if self.headers.get("Origin") is not None:
+            self.respond(403, {"status": "error", "message": "Cross-origin requests are not allowed"})
+            return False
+        if not self.server.accepts_host(self.headers.get("Host") or ""):
+            self.respond(403, {"status": "error", "message": f"Host not allowed: {self.headers.get('Host')}"})
+            return False
+        token = self.server.token
+        if token is not None:
+            scheme, _, credentials = (self.headers.get("Authorization") or "").partition(" ")
+            if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.strip(), token):
+                self.respond(401, {"status": "error", "message": "Missing or invalid bearer token"})
+                return False
+        return True
+
+    def do_GET(self):
+        if not self.authorize():
+            return
+        path = urlsplit(self.path).path
+        if path == "/status":
+            self.respond(200, self.server.runner.status())
+        else:
+            self.respond(404, {"status": "error", "message": f"No route: GET {path}"})
+
+    def do_POST(self):
+        job = urlsplit(self.path).path.strip("/")
+        # The request body is only read after checking the request, so the connection can not be reused otherwise.
+        close_connection, self.close_connection = self.close_connection, True
+        if not self.authorize():
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            self.respond(400, {"status": "error", "message": "Invalid Content-Length"})
+            return
+        if length > self.MAX_BODY_SIZE:
+            message = f"Job documents are limited to {self.MAX_BODY_SIZE} bytes"
+            self.respond(413, {"status": "error", "message": message})
+            return
+        body = self.rfile.read(length)
+        self.close_connection = close_connection
+        if job not in self.server.runner.JOBS:
+            self.respond(404, {"status": "error", "message": f"No route: POST /{job}"})
+            return
+        if self.headers.get_content_type() != "application/json":
+            self.respond(415, {"status": "error", "message": "Jobs must use `Content-Type: application/json`"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError as ex:
+            self.respond(400, {"status": "error", "message": f"Invalid JSON: {ex}"})
+            return
+        try:
+            response = self.server.runner.run(job, request)
+        except (JobError, ValueError) as ex:
+            self.respond(400, {"status": "error", "message": str(ex)})
+            return
+        except Exception as ex:
+            logger.exception(f"Job {job} failed")
+            self.respond(500, {"status": "error", "message": f"{ex.__class__.__name__}: {ex}"})
+            return
+        self.respond(200, response)
+
+    def respond(self, status: int, data: t.Dict[str, t.Any]):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        logger.debug(format % args)
+
+
+class JobServer(ThreadingHTTPServer):
+    """
+    Serve jobs over HTTP. It is bound to the loopback interface by default.
+
+    Clients authenticate using a secret token, which is generated for each
+    server, unless it is given.
+    """
+
+    daemon_threads = True
+
+    # Host names of the loopback interface, which are accepted in addition to the server's address.
+    LOOPBACK_HOSTS = ["localhost", "127.0.0.1", "::1"]
+
+    def __init__(self, runner: JobRunner, host: str = "127.0.0.1", port: int = 8765, token: t.Optional[str] = None):
+        super().__init__((host, port), JobHandler)
+        self.host = host
+        self.runner = runner
+        self.token: t.Optional[str] = token or secrets.token_urlsafe(32)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.server_address[1]}"
+
+    def accepts_host(self, host: str) -> bool:
+        hostname = urlsplit(f"//{host}").hostname
+        return hostname is not None and (hostname in self.LOOPBACK_HOSTS or hostname == self.host.lower())
+
+    def write_token(self, path: t.Union[str, Path]) -> Path:
+        """
+        Store the secret token into a file, only accessible to the current user.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "w") as fp:
+            fp.write(f"{self.token}\n")
+        return path
+
+
+class UnixJobServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Serve jobs over HTTP on a Unix domain socket, only accessible to the current user.
+    """
+
+    daemon_threads = True
+
+    # The socket file is protected by file permissions, so no token is needed.
+    token: t.Optional[str] = None
+
+    def __init__(self, runner: JobRunner, path: t.Union[str, Path]):
+        self.path = Path(path)
+        self.bound = False
+        # Replace the socket of a previous server, which has not been shut down cleanly.
+        if self.path.exists() and stat.S_ISSOCK(self.path.stat().st_mode):
+            self.path.unlink()
+        umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.path), JobHandler)
+        finally:
+            os.umask(umask)
+        self.runner = runner
+
+    @property
+    def url(self) -> str:
+        return f"unix://{self.path}"
+
+    def accepts_host(self, host: str) -> bool:
+        # Web browsers can not connect to Unix domain sockets, so host names do not matter.
+        return True
+
+    def server_bind(self):
+        super().server_bind()
+        self.bound = True
+
+    def server_close(self):
+        super().server_close()
+        # Don't remove files, when binding the socket failed.
+        if self.bound:
+            self.path.unlink(missing_ok=True)
+
+
+def serve(
+    runner: JobRunner,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: t.Optional[t.Union[str, Path]] = None,
+    token_path: t.Optional[t.Union[str, Path]] = None,
+):
+    """
+    Serve jobs until interrupted.
+
+    When serving on a TCP port, the secret token clients need is written to
+    `token_path`, by default `serve.token` within the cache directory.
+    """
+    server: t.Union[JobServer, UnixJobServer]
+    if socket_path:
+        server = UnixJobServer(runner, path=socket_path)
+    else:
+        server = JobServer(runner, host=host, port=port)
+        path = server.write_token(token_path or cache_directory() / "serve.token")
+        logger.info(f"Clients authenticate using the token stored at: {path}")
+    runner.warm()
+    logger.info(f"Serving jobs at {server.url} ({runner})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        runner.close()
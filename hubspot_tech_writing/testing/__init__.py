@@ -0,0 +1,3 @@
+from hubspot_tech_writing.testing.server import FakeHubSpotServer, Faults
+
+__all__ = ["Faults", "FakeHubSpotServer"]
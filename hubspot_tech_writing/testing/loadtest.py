@@ -0,0 +1,211 @@
+"""
+Measure end-to-end upload throughput against the local HubSpot API stand-in server.
+
+Synopsis::
+
+    python -m hubspot_tech_writing.testing.loadtest --documents=50 --images=5 --concurrency=8 --latency=0.05
+"""
+
+import dataclasses
+import logging
+import random
+import struct
+import tempfile
+import time
+import typing as t
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import click
+
+from hubspot_tech_writing.core import upload
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.testing.server import FakeHubSpotServer, Faults
+from hubspot_tech_writing.util.common import setup_logging
+from hubspot_tech_writing.util.metrics import Metrics
+from hubspot_tech_writing.util.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# The stand-in server accepts any bearer token.
+ACCESS_TOKEN = "pat-na1-loadtest"  # noqa: S105
+
+
+def make_png(width: int, height: int, seed: int = 0) -> bytes:
+    """
+    Generate a valid PNG image with random pixels, which does not compress well, like photographs.
+    """
+    rnd = random.Random(seed)  # noqa: S311
+    rows = b"".join(b"\x00" + bytes(rnd.getrandbits(8) for _ in range(width * 3)) for _ in range(height))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def generate_documents(directory: Path, documents: int, images: int, image_size: int) -> t.List[Path]:
+    """
+    Generate Markdown documents, each referencing its own set of PNG images of roughly `image_size` bytes.
+    """
+    side = max(1, int((image_size / 3) ** 0.5))
+    paths = []
+    for number in range(documents):
+        lines = [f"# Document {number}", "", "Franz jagt im komplett verwahrlosten Taxi quer durch Bayern.", ""]
+        for index in range(images):
+            image = directory / f"doc-{number}-image-{index}.png"
+            image.write_bytes(make_png(side, side, seed=number * images + index))
+            lines.append(f"![Image {index}]({image.name})")
+        path = directory / f"doc-{number}.md"
+        path.write_text("\n".join(lines) + "\n")
+        paths.append(path)
+    return paths
+
+
+@dataclasses.dataclass
+class LoadTestResult:
+    documents: int
+    images: int
+    failed: int
+    duration: float
+    requests: int
+    status: t.Dict[int, int]
+    metrics: Metrics
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.duration if self.duration else 0.0
+
+    @property
+    def images_per_second(self) -> float:
+        return self.images / self.duration if self.duration else 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    def summary(self) -> str:
+        status = ", ".join(f"{code}={count}" for code, count in sorted(self.status.items()))
+        return "\n".join(
+            [
+                self.metrics.summary(),
+                "",
+                f"Uploaded {self.documents} documents with {self.images} images in {self.duration:.2f}s, "
+                f"{self.failed} failed",
+                f"Throughput: {self.documents_per_second:.1f} documents/s, {self.images_per_second:.1f} images/s, "
+                f"{self.requests_per_second:.1f} requests/s",
+                f"Server responses: {status}",
+            ]
+        )
+
+
+def run_loadtest(
+    documents: int = 20,
+    images: int = 5,
+    image_size: int = 16 * 1024,
+    concurrency: int = 4,
+    rate: float = 1000.0,
+    faults: t.Optional[Faults] = None,
+) -> LoadTestResult:
+    """
+    Upload generated documents, including their images, to a fresh stand-in server, concurrently.
+
+    The client-side rate limit is lifted by default, so the throughput is bound by
+    concurrency, and by the latency of the server.
+    """
+    metrics = Metrics(enabled=True)
+    with tempfile.TemporaryDirectory() as tmpdir, FakeHubSpotServer(faults=faults) as server:
+        paths = generate_documents(Path(tmpdir), documents=documents, images=images, image_size=image_size)
+        hsa = HubSpotAdapter(
+            access_token=ACCESS_TOKEN,
+            host=server.url,
+            rate_limiter=RateLimiter(rate=rate, burst=rate),
+            metrics=metrics,
+        )
+
+        def upload_document(path: Path) -> bool:
+            try:
+                upload(
+                    access_token=ACCESS_TOKEN,
+                    source=path,
+                    name=path.stem,
+                    content_group_id="1",
+                    folder_path=f"/loadtest/{path.stem}",
+                    hubspot_adapter=hsa,
+                )
+                return True
+            except Exception as ex:
+                logger.error(f"Uploading document failed: {path.name}: {ex}")
+                return False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(upload_document, paths))
+        duration = time.perf_counter() - start
+
+        return LoadTestResult(
+            documents=documents,
+            images=documents * images,
+            failed=outcomes.count(False),
+            duration=duration,
+            requests=server.total_requests,
+            status=dict(server.status),
+            metrics=metrics,
+        )
+
+
+@click.command()
+@click.option("--documents", type=int, default=20, show_default=True, help="Number of documents")
+@click.option("--images", type=int, default=5, show_default=True, help="Number of images per document")
+@click.option("--image-size", type=int, default=16 * 1024, show_default=True, help="Approximate image size in bytes")
+@click.option("--concurrency", type=int, default=4, show_default=True, help="Number of concurrent uploads")
+@click.option("--rate", type=float, default=1000.0, show_default=True, help="Client-side rate limit, per second")
+@click.option("--latency", type=float, default=0.0, show_default=True, help="Server latency in seconds")
+@click.option("--jitter", type=float, default=0.0, show_default=True, help="Random server latency in seconds")
+@click.option("--error-rate", type=float, default=0.0, show_default=True, help="Probability of HTTP 503")
+@click.option("--throttle-rate", type=float, default=0.0, show_default=True, help="Probability of HTTP 429")
+@click.option("--rate-limit", type=int, default=None, help="Server-side requests per 10 seconds")
+@click.option("--seed", type=int, default=None, help="Seed for reproducible fault injection")
+@click.option("--verbose", is_flag=True, help="Turn on logging")
+def main(
+    documents: int,
+    images: int,
+    image_size: int,
+    concurrency: int,
+    rate: float,
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    throttle_rate: float,
+    rate_limit: t.Optional[int],
+    seed: t.Optional[int],
+    verbose: bool,
+):
+    """
+    Run a load test against the local HubSpot API stand-in server, and report throughput.
+    """
+    setup_logging(level=logging.INFO if verbose else logging.WARNING)
+    faults = Faults(
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        retry_after=0,
+        rate_limit=rate_limit,
+        seed=seed,
+    )
+    result = run_loadtest(
+        documents=documents,
+        images=images,
+        image_size=image_size,
+        concurrency=concurrency,
+        rate=rate,
+        faults=faults,
+    )
+    click.echo(result.summary())
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main()
@@ -0,0 +1,123 @@
+"""
+Measure the peak client memory usage of uploading a large file to the local HubSpot API stand-in server.
+
+The server runs in a separate process, so only allocations of the client are measured.
+
+Synopsis::
+
+    python -m hubspot_tech_writing.testing.memory --size=64
+"""
+
+import dataclasses
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+import typing as t
+from pathlib import Path
+
+import click
+
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter, HubSpotFile
+from hubspot_tech_writing.testing.loadtest import ACCESS_TOKEN
+from hubspot_tech_writing.testing.server import FakeHubSpotServer
+from hubspot_tech_writing.util.common import setup_logging
+from hubspot_tech_writing.util.metrics import Metrics, format_bytes
+from hubspot_tech_writing.util.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+MEGABYTE = 1024 * 1024
+
+
+def serve(queue: "multiprocessing.Queue[str]", stop: "multiprocessing.synchronize.Event"):  # pragma: nocover
+    """
+    Run the stand-in server until asked to stop, announcing its URL on the queue.
+    """
+    with FakeHubSpotServer() as server:
+        queue.put(server.url)
+        stop.wait()
+
+
+@dataclasses.dataclass
+class MemoryResult:
+    size: int
+    streaming: bool
+    peak: int
+    duration: float
+
+    @property
+    def ratio(self) -> float:
+        return self.peak / self.size if self.size else 0.0
+
+    def summary(self) -> str:
+        mode = "streaming" if self.streaming else "buffered"
+        return (
+            f"Uploaded {format_bytes(self.size)} ({mode}) in {self.duration:.2f}s, "
+            f"peak client memory: {format_bytes(self.peak)} ({self.ratio:.2f}x file size)"
+        )
+
+
+def measure_upload(url: str, path: Path, streaming: bool) -> MemoryResult:
+    """
+    Upload a file, and measure the peak memory allocated while doing it.
+    """
+    hsa = HubSpotAdapter(
+        access_token=ACCESS_TOKEN,
+        host=url,
+        rate_limiter=RateLimiter(rate=1000.0, burst=1000.0),
+        metrics=Metrics(enabled=True),
+    )
+    hsa.STREAMING_THRESHOLD = 0 if streaming else path.stat().st_size
+
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        # Creating the file uploads it.
+        HubSpotFile(hubspot_adapter=hsa, source=str(path), name=path.name, folder_path=f"/memory/{streaming}")
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return MemoryResult(size=path.stat().st_size, streaming=streaming, peak=peak, duration=duration)
+
+
+def run_benchmark(size: int = 32 * MEGABYTE, modes: t.Sequence[bool] = (True, False)) -> t.List[MemoryResult]:
+    """
+    Upload a file of `size` bytes using the streaming and the buffered upload paths.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    stop = context.Event()
+    process = context.Process(target=serve, args=(queue, stop), daemon=True)
+    process.start()
+    try:
+        url = queue.get(timeout=30)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "large.bin"
+            with open(path, "wb") as fp:
+                for _ in range(size // MEGABYTE):
+                    fp.write(os.urandom(MEGABYTE))
+                fp.write(os.urandom(size % MEGABYTE))
+            return [measure_upload(url, path, streaming=streaming) for streaming in modes]
+    finally:
+        stop.set()
+        process.join(timeout=10)
+
+
+@click.command()
+@click.option("--size", type=int, default=32, show_default=True, help="File size in megabytes")
+@click.option("--verbose", is_flag=True, help="Turn on logging")
+def main(size: int, verbose: bool):
+    """
+    Compare the peak client memory usage of streaming and buffered file uploads.
+    """
+    setup_logging(level=logging.INFO if verbose else logging.WARNING)
+    for result in run_benchmark(size=size * MEGABYTE):
+        click.echo(result.summary())
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main()
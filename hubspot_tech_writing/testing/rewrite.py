@@ -0,0 +1,110 @@
+"""
+Measure rewriting the image references of a document with many images, in order to
+compare the single-pass splice with replacing each reference across the whole document.
+
+Synopsis::
+
+    python -m hubspot_tech_writing.testing.rewrite --images=1000
+"""
+
+import dataclasses
+import logging
+import time
+import typing as t
+
+import click
+
+from hubspot_tech_writing.util.common import setup_logging
+from hubspot_tech_writing.util.html import HTMLImage, HTMLImageTranslator
+from hubspot_tech_writing.util.metrics import format_bytes
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class RewriteResult:
+    images: int
+    size: int
+    scan: float
+    produce: float
+    baseline: float
+
+    @property
+    def speedup(self) -> float:
+        return self.baseline / self.produce if self.produce else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Rewrote {self.images} image references in {format_bytes(self.size)} of HTML: "
+            f"scan {self.scan * 1000:.2f}ms, produce {self.produce * 1000:.2f}ms, "
+            f"replacing each reference {self.baseline * 1000:.2f}ms ({self.speedup:.1f}x)"
+        )
+
+
+def make_document(images: int) -> str:
+    """
+    Make an HTML document with many images, and text mentioning their file names.
+    """
+    filler = "Lorem ipsum. " * 20
+    parts = []
+    for index in range(images):
+        parts.append(
+            f'<h2 id="section-{index}">Section {index}</h2>\n'
+            f"<p>The figure below is stored in <code>images/image-{index}.png</code>. {filler}</p>\n"
+            f'<p><img alt="Figure {index}" src="images/image-{index}.png"></p>\n'
+        )
+    return "".join(parts)
+
+
+def remote_images(images_in: t.List[HTMLImage]) -> t.List[HTMLImage]:
+    return [HTMLImage(alt=image.alt, src=f"https://hubfs.example.org/hubfs/{image.src}") for image in images_in]
+
+
+def replace_each(html: str, images_in: t.List[HTMLImage], images_remote: t.List[HTMLImage]) -> str:
+    """
+    The previous way of rewriting image references, replacing each one across the whole document.
+    """
+    for image_in, image_remote in zip(images_in, images_remote):
+        html = html.replace(image_in.src, image_remote.src)
+    return html
+
+
+def measure(func: t.Callable[[], t.Any], repeat: int) -> float:
+    """
+    Return the best wall clock time of calling a function multiple times.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def run_benchmark(images: int = 500, repeat: int = 5) -> RewriteResult:
+    """
+    Scan a document with `images` images, and rewrite their references, using both ways.
+    """
+    html = make_document(images)
+    hit = HTMLImageTranslator(html=html, source_path=".")
+    scan = measure(hit.scan, repeat)
+    hit.images_remote = remote_images(hit.images_in)
+    produce = measure(hit.produce, repeat)
+    baseline = measure(lambda: replace_each(html, hit.images_in, hit.images_remote), repeat)
+    return RewriteResult(images=len(hit.images_in), size=len(html), scan=scan, produce=produce, baseline=baseline)
+
+
+@click.command()
+@click.option("--images", type=int, default=500, show_default=True, help="Number of images in the document")
+@click.option("--repeat", type=int, default=5, show_default=True, help="Number of repetitions, using the best one")
+@click.option("--verbose", is_flag=True, help="Turn on logging")
+def main(images: int, repeat: int, verbose: bool):
+    """
+    Compare the single-pass splice of image references with replacing each of them.
+    """
+    setup_logging(level=logging.INFO if verbose else logging.WARNING)
+    click.echo(run_benchmark(images=images, repeat=repeat).summary())
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main()
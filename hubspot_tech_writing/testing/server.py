@@ -0,0 +1,524 @@
+import collections
+import dataclasses
+import email.parser
+import email.policy
+import gzip
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+import typing as t
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import PurePosixPath
+from urllib.parse import parse_qs, unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class Faults:
+    """
+    Degrade the responses of the stand-in server, in order to simulate a busy or flaky HubSpot API.
+    """
+
+    # Fixed delay added to each response, in seconds.
+    latency: float = 0.0
+    # Random delay added on top of `latency`, uniformly distributed, in seconds.
+    jitter: float = 0.0
+    # Probability of responding with HTTP 503.
+    error_rate: float = 0.0
+    # Probability of responding with HTTP 429.
+    throttle_rate: float = 0.0
+    # Value of the `Retry-After` header on injected HTTP 429 responses, in seconds.
+    retry_after: t.Optional[float] = None
+    # Maximum number of requests per rate limit interval, like HubSpot's own limits.
+    rate_limit: t.Optional[int] = None
+    # Length of the rate limit interval, in seconds.
+    rate_limit_interval: float = 10.0
+    # Seed for the random number generator, in order to make fault injection reproducible.
+    seed: t.Optional[int] = None
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str, category: str = "VALIDATION_ERROR"):
+        super().__init__(message)
+        self.status = status
+        self.category = category
+
+
+class FakeHubSpotServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the HubSpot API, implementing the blog post and file
+    endpoints used by this package, backed by in-memory storage.
+
+    It is suitable for integration and load tests, where using the real API
+    is not possible, or not desirable. Use it as a context manager, and
+    point `HubSpotAdapter(host=server.url)` to it.
+
+    https://developers.hubspot.com/docs/api/cms/blog-post
+    https://developers.hubspot.com/docs/api/files/files
+    """
+
+    daemon_threads = True
+
+    # Supported search parameters, and the fields they filter on.
+    POST_FILTERS = {"name": "name", "slug": "slug", "contentGroupId": "contentGroupId"}
+    FILE_FILTERS = {"ids": "id", "name": "name", "path": "path", "parentFolderIds": "parentFolderId"}
+    FOLDER_FILTERS = {"ids": "id", "name": "name", "path": "path", "parentFolderIds": "parentFolderId"}
+
+    def __init__(self, faults: t.Optional[Faults] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), FakeHubSpotHandler)
+        self.host = host
+        self.faults = faults or Faults()
+        self.random = random.Random(self.faults.seed)  # noqa: S311
+        self.lock = threading.Lock()
+        self.thread: t.Optional[threading.Thread] = None
+        self.ids = itertools.count(100000)
+
+        self.posts: t.Dict[str, t.Dict[str, t.Any]] = {}
+        self.files: t.Dict[str, t.Dict[str, t.Any]] = {}
+        self.folders: t.Dict[str, t.Dict[str, t.Any]] = {}
+        self.contents: t.Dict[str, bytes] = {}
+
+        # Accept gzip-compressed request bodies. When disabled, they are rejected with HTTP 415.
+        self.compression = True
+
+        # Number of handled requests, by operation, by response status, and by request body encoding.
+        self.requests: t.Counter[str] = collections.Counter()
+        self.status: t.Counter[int] = collections.Counter()
+        self.encodings: t.Counter[str] = collections.Counter()
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.server_address[1]}"
+
+    def start(self) -> "FakeHubSpotServer":
+        self.thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+        logger.info(f"Started HubSpot API stand-in server at {self.url}")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self) -> "FakeHubSpotServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    def next_id(self) -> str:
+        with self.lock:
+            return str(next(self.ids))
+
+    def inject_fault(self) -> t.Tuple[t.Optional[int], t.Dict[str, str]]:
+        """
+        Decide whether a request should fail, and return the status code, and response headers.
+        """
+        faults = self.faults
+        headers: t.Dict[str, str] = {}
+        with self.lock:
+            if faults.rate_limit is not None:
+                now = time.monotonic()
+                if now - self.window_start >= faults.rate_limit_interval:
+                    self.window_start = now
+                    self.window_requests = 0
+                self.window_requests += 1
+                headers["X-HubSpot-RateLimit-Max"] = str(faults.rate_limit)
+                headers["X-HubSpot-RateLimit-Remaining"] = str(max(0, faults.rate_limit - self.window_requests))
+                headers["X-HubSpot-RateLimit-Interval-Milliseconds"] = str(int(faults.rate_limit_interval * 1000))
+                if self.window_requests > faults.rate_limit:
+                    return 429, headers
+            if faults.throttle_rate and self.random.random() < faults.throttle_rate:
+                if faults.retry_after is not None:
+                    headers["Retry-After"] = str(faults.retry_after)
+                return 429, headers
+            if faults.error_rate and self.random.random() < faults.error_rate:
+                return 503, headers
+            delay = faults.latency + (self.random.uniform(0, faults.jitter) if faults.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        return None, headers
+
+    @staticmethod
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    @staticmethod
+    def paginate(items: t.List[t.Dict[str, t.Any]], query: t.Dict[str, t.List[str]]) -> t.Dict[str, t.Any]:
+        """
+        Slice a page of results, using the offset as `after` cursor, like HubSpot does.
+        """
+        offset = int(query.get("after", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+        response: t.Dict[str, t.Any] = {"total": len(items), "results": items[offset : offset + limit]}
+        if offset + limit < len(items):
+            response["paging"] = {"next": {"after": str(offset + limit)}}
+        return response
+
+    @staticmethod
+    def matches(item: t.Dict[str, t.Any], query: t.Dict[str, t.List[str]], fields: t.Dict[str, str]) -> bool:
+        """
+        Filter items by exact match, using a mapping of query parameters to item fields.
+        Multi-valued parameters match any of their values.
+        """
+        for parameter, field in fields.items():
+            if parameter in query and str(item.get(field)) not in query[parameter]:
+                return False
+        return True
+
+    # Blog posts.
+
+    def search_posts(self, query: t.Dict[str, t.List[str]]) -> t.Dict[str, t.Any]:
+        with self.lock:
+            posts = [post for post in self.posts.values() if self.matches(post, query, self.POST_FILTERS)]
+        return self.paginate(posts, query)
+
+    def create_post(self, data: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        if not data.get("name") or not data.get("contentGroupId"):
+            raise ApiError(400, "Blog post needs name and contentGroupId")
+        identifier = self.next_id()
+        now = self.now()
+        slug = data.get("slug") or identifier
+        post = {
+            "id": identifier,
+            "state": "DRAFT",
+            "currentState": "DRAFT",
+            "postBody": "",
+            "created": now,
+            "updated": now,
+            "url": f"{self.url}/blog/{slug}",
+            "archivedAt": 0,
+        }
+        post.update(data)
+        post["slug"] = slug
+        with self.lock:
+            self.posts[identifier] = post
+        return post
+
+    def get_post(self, identifier: str) -> t.Dict[str, t.Any]:
+        with self.lock:
+            if identifier not in self.posts:
+                raise ApiError(404, f"Blog post not found: {identifier}", category="OBJECT_NOT_FOUND")
+            return self.posts[identifier]
+
+    def update_post(self, identifier: str, data: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        post = self.get_post(identifier)
+        data.pop("id", None)
+        with self.lock:
+            post.update(data)
+            post["updated"] = self.now()
+        return post
+
+    def archive_post(self, identifier: str):
+        self.get_post(identifier)
+        with self.lock:
+            del self.posts[identifier]
+
+    def batch(
+        self, operation: t.Callable, inputs: t.List[t.Any], status: int = 200
+    ) -> t.Tuple[int, t.Dict[str, t.Any]]:
+        """
+        Apply an operation to each batch input, and collect results and errors, like HubSpot does (HTTP 207).
+        """
+        started = self.now()
+        results = []
+        errors = []
+        for item in inputs:
+            try:
+                results.append(operation(item))
+            except ApiError as ex:
+                errors.append(
+                    {
+                        "status": "error",
+                        "category": ex.category,
+                        "message": str(ex),
+                        "context": {"id": [item.get("id") if isinstance(item, dict) else item]},
+                        "errors": [],
+                        "links": {},
+                    }
+                )
+        response: t.Dict[str, t.Any] = {
+            "status": "COMPLETE",
+            "results": results,
+            "startedAt": started,
+            "completedAt": self.now(),
+        }
+        if errors:
+            response["errors"] = errors
+            response["numErrors"] = len(errors)
+            status = 207
+        return status, response
+
+    def batch_read_posts(self, data: t.Dict[str, t.Any]) -> t.Tuple[int, t.Dict[str, t.Any]]:
+        return self.batch(self.get_post, data.get("inputs", []))
+
+    def batch_create_posts(self, data: t.Dict[str, t.Any]) -> t.Tuple[int, t.Dict[str, t.Any]]:
+        return self.batch(self.create_post, data.get("inputs", []), status=201)
+
+    def batch_update_posts(self, data: t.Dict[str, t.Any]) -> t.Tuple[int, t.Dict[str, t.Any]]:
+        return self.batch(lambda item: self.update_post(str(item.get("id")), dict(item)), data.get("inputs", []))
+
+    # Files and folders.
+
+    def search_files(self, query: t.Dict[str, t.List[str]]) -> t.Dict[str, t.Any]:
+        with self.lock:
+            files = [file for file in self.files.values() if self.matches(file, query, self.FILE_FILTERS)]
+        return self.paginate(files, query)
+
+    def search_folders(self, query: t.Dict[str, t.List[str]]) -> t.Dict[str, t.Any]:
+        with self.lock:
+            folders = [folder for folder in self.folders.values() if self.matches(folder, query, self.FOLDER_FILTERS)]
+        return self.paginate(folders, query)
+
+    def get_or_create_folder(self, path: str) -> t.Dict[str, t.Any]:
+        path = "/" + path.strip("/")
+        now = self.now()
+        # Look up and create the folder atomically, so concurrent uploads share it.
+        with self.lock:
+            for folder in self.folders.values():
+                if folder["path"] == path:
+                    return folder
+            folder = {
+                "id": str(next(self.ids)),
+                "name": PurePosixPath(path).name,
+                "path": path,
+                "createdAt": now,
+                "updatedAt": now,
+                "archived": False,
+            }
+            self.folders[folder["id"]] = folder
+        return folder
+
+    def upload_file(self, form: t.Dict[str, t.Tuple[t.Optional[str], bytes]]) -> t.Dict[str, t.Any]:
+        if "file" not in form:
+            raise ApiError(400, "File upload needs a file")
+        filename, content = form["file"]
+        name = form["fileName"][1].decode() if "fileName" in form else filename
+        if not name:
+            raise ApiError(400, "File upload needs a file name")
+        if "folderId" in form:
+            folder_id = form["folderId"][1].decode()
+            with self.lock:
+                if folder_id not in self.folders:
+                    raise ApiError(404, f"Folder not found: {folder_id}", category="OBJECT_NOT_FOUND")
+                folder = self.folders[folder_id]
+        elif "folderPath" in form:
+            folder = self.get_or_create_folder(form["folderPath"][1].decode())
+        else:
+            raise ApiError(400, "File upload needs folderId or folderPath")
+        options = json.loads(form["options"][1]) if "options" in form else {}
+
+        identifier = self.next_id()
+        now = self.now()
+        path = PurePosixPath(folder["path"]) / name
+        file = {
+            "id": identifier,
+            "name": path.stem,
+            "extension": path.suffix.lstrip("."),
+            "path": str(path),
+            "parentFolderId": folder["id"],
+            "size": len(content),
+            "url": f"{self.url}/hubfs{path}",
+            "access": options.get("access", "PUBLIC_INDEXABLE"),
+            "createdAt": now,
+            "updatedAt": now,
+            "archived": False,
+        }
+        with self.lock:
+            self.files[identifier] = file
+            self.contents[identifier] = content
+        return file
+
+    def get_file(self, identifier: str) -> t.Dict[str, t.Any]:
+        with self.lock:
+            if identifier not in self.files:
+                raise ApiError(404, f"File not found: {identifier}", category="OBJECT_NOT_FOUND")
+            return self.files[identifier]
+
+    def replace_file(self, identifier: str, form: t.Dict[str, t.Tuple[t.Optional[str], bytes]]) -> t.Dict[str, t.Any]:
+        file = self.get_file(identifier)
+        if "file" not in form:
+            raise ApiError(400, "File replacement needs a file")
+        content = form["file"][1]
+        with self.lock:
+            file["size"] = len(content)
+            file["updatedAt"] = self.now()
+            self.contents[identifier] = content
+        return file
+
+    def archive_file(self, identifier: str):
+        self.get_file(identifier)
+        with self.lock:
+            del self.files[identifier]
+            del self.contents[identifier]
+
+    def get_file_content(self, path: str) -> bytes:
+        with self.lock:
+            for identifier, file in self.files.items():
+                if file["path"] == path:
+                    return self.contents[identifier]
+        raise ApiError(404, f"File not found: {path}", category="OBJECT_NOT_FOUND")
+
+
+def parse_multipart(content_type: str, body: bytes) -> t.Dict[str, t.Tuple[t.Optional[str], bytes]]:
+    """
+    Decode a `multipart/form-data` request body into a dictionary of `(filename, content)` tuples, by field name.
+    """
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+    )
+    form = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True)
+        form[str(name)] = (part.get_filename(), payload if isinstance(payload, bytes) else b"")
+    return form
+
+
+class FakeHubSpotHandler(BaseHTTPRequestHandler):
+    """
+    Route requests to the stand-in server, and render its responses like the HubSpot API does.
+    """
+
+    server: FakeHubSpotServer
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    ID = r"(?P<identifier>\d+)"
+    ROUTES: t.List[t.Tuple[str, str, "re.Pattern[str]"]] = [
+        ("GET", "search_posts", re.compile(r"/cms/v3/blogs/posts")),
+        ("POST", "create_post", re.compile(r"/cms/v3/blogs/posts")),
+        ("GET", "get_post", re.compile(rf"/cms/v3/blogs/posts/{ID}")),
+        ("PATCH", "update_post", re.compile(rf"/cms/v3/blogs/posts/{ID}")),
+        ("DELETE", "archive_post", re.compile(rf"/cms/v3/blogs/posts/{ID}")),
+        ("POST", "batch_read_posts", re.compile(r"/cms/v3/blogs/posts/batch/read")),
+        ("POST", "batch_create_posts", re.compile(r"/cms/v3/blogs/posts/batch/create")),
+        ("POST", "batch_update_posts", re.compile(r"/cms/v3/blogs/posts/batch/update")),
+        ("GET", "search_files", re.compile(r"/files/v3/files/search")),
+        ("POST", "upload_file", re.compile(r"/files/v3/files")),
+        ("GET", "get_file", re.compile(rf"/files/v3/files/{ID}")),
+        ("PUT", "replace_file", re.compile(rf"/files/v3/files/{ID}")),
+        ("DELETE", "archive_file", re.compile(rf"/files/v3/files/{ID}")),
+        ("GET", "search_folders", re.compile(r"/files/v3/folders/search")),
+        ("GET", "get_file_content", re.compile(r"/hubfs(?P<path>/.+)")),
+    ]
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_PATCH(self):
+        self.dispatch()
+
+    def do_PUT(self):
+        self.dispatch()
+
+    def do_DELETE(self):
+        self.dispatch()
+
+    def dispatch(self):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        route = self.route(url.path)
+        if route is None:
+            self.respond(404, {"status": "error", "message": f"No route: {self.command} {url.path}"})
+            return
+        operation, match = route
+
+        with self.server.lock:
+            self.server.requests[operation] += 1
+
+        status, headers = self.server.inject_fault()
+        if status == 429:
+            self.respond(429, {"status": "error", "errorType": "RATE_LIMIT", "message": "Rate limit hit"}, headers)
+            return
+        if status is not None:
+            self.respond(status, {"status": "error", "message": "Service unavailable"}, headers)
+            return
+        if operation != "get_file_content" and not self.headers.get("Authorization", "").startswith("Bearer "):
+            self.respond(401, {"status": "error", "message": "Authentication credentials not found"}, headers)
+            return
+
+        encoding = self.headers.get("Content-Encoding")
+        if encoding is not None:
+            with self.server.lock:
+                self.server.encodings[encoding] += 1
+            if encoding != "gzip" or not self.server.compression:
+                self.respond(415, {"status": "error", "message": f"Unsupported content encoding: {encoding}"})
+                return
+            body = gzip.decompress(body)
+
+        args: t.List[t.Any] = [unquote(value) for value in match.groupdict().values()]
+        if operation.startswith("search_"):
+            args.append(parse_qs(url.query))
+        elif self.command in ["POST", "PATCH", "PUT"]:
+            content_type = self.headers.get("Content-Type", "")
+            if content_type.startswith("multipart/form-data"):
+                args.append(parse_multipart(content_type, body))
+            else:
+                args.append(json.loads(body or b"{}"))
+
+        try:
+            result = getattr(self.server, operation)(*args)
+        except ApiError as ex:
+            self.respond(ex.status, {"status": "error", "message": str(ex), "category": ex.category}, headers)
+            return
+        if isinstance(result, tuple):
+            status, data = result
+            self.respond(status, data, headers)
+        elif isinstance(result, bytes):
+            self.respond(200, result, headers)
+        elif result is None:
+            self.respond(204, None, headers)
+        else:
+            self.respond(201 if self.command == "POST" else 200, result, headers)
+
+    def route(self, path: str) -> t.Optional[t.Tuple[str, "re.Match[str]"]]:
+        for method, operation, pattern in self.ROUTES:
+            match = pattern.fullmatch(path)
+            if method == self.command and match:
+                return operation, match
+        return None
+
+    def respond(self, status: int, data: t.Any, headers: t.Optional[t.Dict[str, str]] = None):
+        with self.server.lock:
+            self.server.status[status] += 1
+        if isinstance(data, bytes):
+            body, content_type = data, "application/octet-stream"
+        else:
+            body, content_type = (json.dumps(data).encode() if data is not None else b""), "application/json"
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        # Compress larger JSON responses, like HubSpot does.
+        if (
+            content_type == "application/json"
+            and len(body) >= 1024
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        ):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        logger.debug(f"{self.address_string()} {format % args}")
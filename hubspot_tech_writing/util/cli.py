@@ -5,11 +5,21 @@ import typing as t
 import click
 
 from hubspot_tech_writing.util.common import setup_logging
+from hubspot_tech_writing.util.metrics import metrics
+from hubspot_tech_writing.util.profiling import profiler
 
 logger = logging.getLogger(__name__)
 
 
-def boot_click(ctx: click.Context, verbose: bool = False, debug: bool = False):
+def boot_click(
+    ctx: click.Context,
+    verbose: bool = False,
+    debug: bool = False,
+    with_metrics: bool = False,
+    metrics_file: t.Optional[str] = None,
+    profile: bool = False,
+    profile_file: t.Optional[str] = None,
+):
     """
     Bootstrap the CLI application.
     """
@@ -22,6 +32,37 @@ def boot_click(ctx: click.Context, verbose: bool = False, debug: bool = False):
     # Setup logging, according to `verbose` / `debug` flags.
     setup_logging(level=log_level, verbose=verbose)
 
+    # Collect API call metrics, and report them at the end of the run.
+    if with_metrics or metrics_file:
+        metrics.reset()
+        metrics.enabled = True
+        ctx.call_on_close(lambda: report_metrics(metrics_file))
+
+    # Attribute time to processing stages, and report it at the end of the run.
+    if profile or profile_file:
+        profiler.start(mode="cprofile" if profile_file else "stats")
+        ctx.call_on_close(lambda: report_profile(profile_file))
+
+
+def report_metrics(metrics_file: t.Optional[str] = None):
+    """
+    Display summary of API call metrics, and optionally write them to a JSON file.
+    """
+    if metrics_file:
+        logger.info(f"Writing metrics to file: {metrics_file}")
+        metrics.write(metrics_file)
+    click.echo(metrics.summary(), err=True)
+
+
+def report_profile(profile_file: t.Optional[str] = None):
+    """
+    Display summary of time spent per processing stage, and optionally write `cProfile` statistics to a file.
+    """
+    profiler.stop(profile_file)
+    if profile_file:
+        logger.info(f"Writing profile to file: {profile_file}")
+    click.echo(profiler.summary(), err=True)
+
 
 def docstring_format_verbatim(text: t.Optional[str]) -> str:
     """
@@ -1,4 +1,6 @@
+import hashlib
 import logging
+import os
 import typing as t
 from pathlib import Path
 
@@ -18,6 +20,19 @@ def setup_logging(level=logging.INFO, verbose: bool = False):
     logging.getLogger("urllib3.connectionpool").setLevel(level)
 
 
+def cache_directory(access_token: t.Optional[str] = None) -> Path:
+    """
+    Return the directory for storing local state, like upload manifests.
+
+    When an access token is given, the directory is specific to the HubSpot
+    portal, without storing the token itself.
+    """
+    base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "hubspot-tech-writing"
+    if access_token:
+        return base / hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:16]
+    return base
+
+
 class ContentTypeResolver:
     MARKUP_SUFFIXES = [".md", ".rst"]
     HTML_SUFFIXES = [".html", ".html5", ".htm"]
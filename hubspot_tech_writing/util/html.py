@@ -1,10 +1,20 @@
+import binascii
 import dataclasses
+import hashlib
 import logging
+import mimetypes
+import re
 import typing as t
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
+from html import escape, unescape
+from html.parser import HTMLParser
 from pathlib import Path
+from urllib.parse import unquote_to_bytes
 
-from bs4 import BeautifulSoup
+from hubspot_tech_writing.util.common import cache_directory
+from hubspot_tech_writing.util.image import ImageOptimizer
+from hubspot_tech_writing.util.profiling import profiled
 
 logger = logging.getLogger(__name__)
 
@@ -13,21 +23,114 @@ logger = logging.getLogger(__name__)
 class HTMLImage:
     alt: str
     src: str
+    # The offsets of the raw `src` attribute value within the HTML document.
+    start: t.Optional[int] = None
+    end: t.Optional[int] = None
+    # Candidate images for responsive images, and the condition to choose between them.
+    srcset: t.Optional[str] = None
+    sizes: t.Optional[str] = None
+
+
+class ImageScanner(HTMLParser):
+    """
+    Find all <img ...> tags of an HTML document, recording the exact offsets of their `src` attribute values.
+
+    The document is tokenized, without building a tree. Tags within `<script>` and
+    `<style>` elements, comments, and attribute values are not mistaken for images.
+    """
+
+    # An attribute within the raw text of a start tag, optionally with a quoted or unquoted value.
+    ATTRIBUTE = re.compile(r"""([^\s/>][^\s/=>]*)(?:\s*=\s*('[^']*'|"[^"]*"|(?!['"])[^>\s]*))?""")
+
+    def __init__(self, html: str):
+        super().__init__(convert_charrefs=True)
+        self.html = html
+        # The offsets where lines start, for converting positions reported by the parser into offsets.
+        self.lines = [0] + [match.end() for match in re.finditer("\n", html)]
+        self.images: t.List[HTMLImage] = []
+
+    def scan(self) -> t.List[HTMLImage]:
+        self.feed(self.html)
+        self.close()
+        return self.images
+
+    def handle_starttag(self, tag: str, attrs: t.List[t.Tuple[str, t.Optional[str]]]):
+        if tag != "img":
+            return
+        text = self.get_starttag_text() or ""
+        lineno, column = self.getpos()
+        offset = self.lines[lineno - 1] + column
+        alt = next((value or "" for name, value in attrs if name == "alt"), "")
+        srcset = next((value or "" for name, value in attrs if name == "srcset"), None)
+        for match in self.ATTRIBUTE.finditer(text, 1 + len(tag)):
+            if match.group(1).lower() != "src" or not match.group(2):
+                continue
+            start, end = match.span(2)
+            if match.group(2)[0] in "'\"":
+                start, end = start + 1, end - 1
+            src = unescape(text[start:end])
+            if src:
+                self.images.append(HTMLImage(alt=alt, src=src, start=offset + start, end=offset + end, srcset=srcset))
+            return
+
+    def handle_startendtag(self, tag: str, attrs: t.List[t.Tuple[str, t.Optional[str]]]):
+        self.handle_starttag(tag, attrs)
+
+
+# File name extensions for image media types, where `mimetypes` is ambiguous.
+IMAGE_EXTENSIONS = {"image/jpeg": ".jpg", "image/svg+xml": ".svg"}
+
+
+def decode_data_uri(uri: str) -> t.Tuple[str, bytes]:
+    """
+    Decode a `data:` URI into its media type and content.
+
+    Only the payload is sliced off the URI, and decoded directly.
+    """
+    header, separator, _ = uri.partition(",")
+    if not header.startswith("data:") or not separator:
+        raise ValueError(f"Invalid data URI: {uri[:64]}")
+    parameters = header[5:].split(";")
+    mimetype = parameters[0].lower() or "text/plain"
+    if "base64" in parameters[1:]:
+        return mimetype, binascii.a2b_base64(uri[len(header) + 1 :])
+    return mimetype, unquote_to_bytes(uri[len(header) + 1 :])
 
 
 class HTMLImageTranslator:
     """
     Translate local image references into remote ones, by uploading them.
     After that, replace URLs in HTML document.
+
+    When an image optimizer is given, local images are downscaled and
+    recompressed before uploading them. When it is configured to generate
+    variants of different widths, they are uploaded, too, and referenced
+    using `srcset` and `sizes` attributes.
+
+    Images embedded using `data:` URIs are extracted into files, named by their
+    content hash, and uploaded like all other images, because HubSpot rejects
+    blog posts containing them.
     """
 
-    def __init__(self, html: str, source_path: t.Union[str, Path], uploader: t.Optional[t.Callable] = None):
+    # The number of images to upload concurrently.
+    CONCURRENCY = 4
+
+    def __init__(
+        self,
+        html: str,
+        source_path: t.Union[str, Path],
+        uploader: t.Optional[t.Callable] = None,
+        optimizer: t.Optional[ImageOptimizer] = None,
+    ):
         self.html_in: str = html
         self.html_out: t.Optional[str] = None
         self.source_path = source_path
         self.uploader = uploader
+        self.optimizer = optimizer
         self.images_in: t.List[HTMLImage] = []
         self.images_local: t.List[HTMLImage] = []
+        self.images_optimized: t.Dict[str, str] = {}
+        self.images_variants: t.Dict[str, t.Dict[int, str]] = {}
         self.images_remote: t.List[HTMLImage] = []
 
     def __str__(self):
@@ -40,44 +143,103 @@ class HTMLImageTranslator:
         return self
 
     def process(self):
+        self.optimize()
         self.upload()
         self.produce()
         return self
 
+    @profiled("images.scan")
     def scan(self) -> "HTMLImageTranslator":
         """
-        Scan input HTML for all <img ...> tags.
+        Scan input HTML for all <img ...> tags, recording where their sources are referenced.
+        Images without a source are left alone.
         """
-        soup = BeautifulSoup(self.html_in, features="html.parser")
-        images = soup.find_all(name="img")
-        self.images_in = []
-        for image in images:
-            self.images_in.append(HTMLImage(src=str(image.get("src", "")), alt=str(image.get("alt", ""))))
+        self.images_in = ImageScanner(self.html_in).scan()
         return self
 
+    @profiled("images.resolve")
     def resolve(self) -> "HTMLImageTranslator":
         """
         Process discovered image elements, computing effective paths.
+
+        Remote images are left alone, and so is embedded content which is not an
+        image, or can not be decoded.
         """
         if self.source_path is None:
             return self
         parent_path = Path(self.source_path)
         if parent_path.is_file():
             parent_path = parent_path.parent
+        images_in = []
         self.images_local = []
         for image in self.images_in:
             image_new = deepcopy(image)
-            if not image.src.startswith("http://") and not image.src.startswith("https://"):
-                # Use absolute paths 1:1.
-                if image.src.startswith("/"):
-                    pass
-
-                # Relative paths are relative to the original document.
-                else:
-                    image_new.src = str(Path(parent_path) / image.src)
+            if image.src.startswith("data:"):
+                try:
+                    image_new.src = str(self.extract(image.src))
+                except ValueError as ex:
+                    logger.warning(f"Leaving embedded image untouched: {ex}")
+                    continue
+            elif image.src.startswith("http://") or image.src.startswith("https://"):
+                continue
+            # Use absolute paths 1:1.
+            elif image.src.startswith("/"):
+                pass
+
+            # Relative paths are relative to the original document.
+            else:
+                image_new.src = str(Path(parent_path) / image.src)
+            images_in.append(image)
             self.images_local.append(image_new)
+        self.images_in = images_in
+        return self
+
+    def extract(self, uri: str) -> Path:
+        """
+        Decode an image embedded using a `data:` URI, and store it into a file named by its content hash.
+        """
+        mimetype, content = decode_data_uri(uri)
+        if not mimetype.startswith("image/"):
+            raise ValueError(f"Embedded content is not an image: {mimetype}")
+        extension = IMAGE_EXTENSIONS.get(mimetype) or mimetypes.guess_extension(mimetype) or ""
+        digest = hashlib.sha256(content).hexdigest()
+        path = cache_directory() / "embedded" / f"embedded-{digest[:16]}{extension}"
+        if not path.exists():
+            logger.info(f"Extracting embedded image: {path.name} ({len(content)} bytes)")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+        return path
+
+    @profiled("images.optimize")
+    def optimize(self) -> "HTMLImageTranslator":
+        """
+        Optimize local images, and remember the paths to the optimized versions.
+        """
+        if self.optimizer is None:
+            return self
+        sources = [image.src for image in self.images_local]
+        self.images_optimized = self.optimizer.optimize(sources)
+        self.images_variants = self.optimizer.variants(sources)
         return self
 
+    def files(self, src: str) -> t.List[t.Tuple[t.Optional[int], str, str]]:
+        """
+        Return the files to upload for a local image, with their widths, if known, paths, and names.
+
+        Optimized images are uploaded under the name of the original, and their
+        narrower variants with the width appended to it.
+        """
+        path = self.images_optimized.get(src, src)
+        name = Path(src).name
+        files: t.List[t.Tuple[t.Optional[int], str, str]] = [(None, path, name)]
+        for width, variant in self.images_variants.get(src, {}).items():
+            if variant == path:
+                files[0] = (width, path, name)
+            else:
+                files.append((width, variant, f"{Path(src).stem}-{width}w{Path(src).suffix}"))
+        return files
+
+    @profiled("images.upload")
     def upload(self) -> "HTMLImageTranslator":
         """
         Upload images to HubSpot API, and store URLs.
@@ -85,20 +247,55 @@ class HTMLImageTranslator:
         if self.uploader is None:
             logger.warning("No upload without uploader")
             return self
+        # Upload each image only once, even when it is referenced multiple times, and upload images concurrently.
+        sources = list(dict.fromkeys(image.src for image in self.images_local))
+        files = list(dict.fromkeys((path, name) for src in sources for _, path, name in self.files(src)))
+        uploader = self.uploader
+
+        def upload(file: t.Tuple[str, str]) -> str:
+            path, name = file
+            return uploader(source=path, name=name).url
+
+        with ThreadPoolExecutor(max_workers=self.CONCURRENCY) as executor:
+            image_urls = dict(zip(files, executor.map(upload, files)))
         for image_local in self.images_local:
-            hs_file = self.uploader(source=image_local.src, name=Path(image_local.src).name)
-            image_url = hs_file.url
             image_remote: HTMLImage = deepcopy(image_local)
-            image_remote.src = image_url
+            candidates = self.files(image_local.src)
+            _, path, name = candidates[0]
+            image_remote.src = image_urls[(path, name)]
+            # Images which are responsive already are left alone.
+            widths = [width for width, _, _ in candidates if width is not None]
+            if len(widths) > 1 and len(widths) == len(candidates) and image_local.srcset is None and self.optimizer:
+                image_remote.srcset = ", ".join(
+                    f"{image_urls[(path, name)]} {width}w" for width, path, name in sorted(candidates)
+                )
+                image_remote.sizes = self.optimizer.sizes
             self.images_remote.append(image_remote)
         return self
 
+    @profiled("images.produce")
     def produce(self) -> "HTMLImageTranslator":
         """
         Produce HTML output, with all image references replaced by their remote targets.
+
+        Only the `src` attribute values found by `scan` are replaced, splicing the
+        output together in a single pass over the input. Responsive images get
+        `srcset` and `sizes` attributes, following their `src` attribute.
         """
-        html = self.html_in
+        parts = []
+        position = 0
         for image_in, image_remote in zip(self.images_in, self.images_remote):
-            html = html.replace(image_in.src, image_remote.src)
-        self.html_out = html
+            if image_in.start is None or image_in.end is None:
+                continue
+            parts.append(self.html_in[position : image_in.start])
+            parts.append(escape(image_remote.src))
+            position = image_in.end
+            if image_remote.srcset and image_in.srcset is None:
+                # Skip the closing quote of the `src` attribute value.
+                if self.html_in[image_in.start - 1] in "'\"":
+                    position += 1
+                parts.append(self.html_in[image_in.end : position])
+                parts.append(f' srcset="{escape(image_remote.srcset)}" sizes="{escape(image_remote.sizes or "100vw")}"')
+        parts.append(self.html_in[position:])
+        self.html_out = "".join(parts)
         return self
@@ -0,0 +1,205 @@
+import importlib.util
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import typing as t
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from hubspot_tech_writing.util.common import cache_directory
+from hubspot_tech_writing.util.io import file_digest
+from hubspot_tech_writing.util.metrics import format_bytes, metrics
+
+logger = logging.getLogger(__name__)
+
+
+def optimize_image(source: str, target: str, max_width: int, quality: int) -> str:
+    """
+    Downscale an image wider than `max_width`, and recompress it, writing the outcome to `target`.
+
+    PNG images are recompressed losslessly, JPEG and WebP images using the given
+    `quality`. When the outcome is not smaller than the original, and the image
+    was not downscaled, the original is used as is.
+
+    Runs in a worker process, so it must be a module-level function.
+    """
+    from PIL import Image
+
+    tmppath = f"{target}.{os.getpid()}.tmp"
+    with Image.open(source) as original:
+        kind = original.format
+        image: Image.Image = original
+        resized = original.width > max_width
+        if resized:
+            height = max(1, round(original.height * max_width / original.width))
+            image = original.resize((max_width, height), Image.Resampling.LANCZOS)
+
+        options: t.Dict[str, t.Any]
+        if kind == "PNG":
+            options = {"optimize": True}
+        elif kind == "JPEG":
+            options = {"quality": quality, "optimize": True, "progressive": True}
+        elif kind == "WEBP":
+            options = {"quality": quality, "method": 6}
+        else:
+            options = {}
+            resized = False
+        if options:
+            image.save(tmppath, format=kind, **options)
+
+    if not options or (not resized and os.stat(tmppath).st_size >= os.stat(source).st_size):
+        if options:
+            os.unlink(tmppath)
+        shutil.copyfile(source, tmppath)
+    os.replace(tmppath, target)
+    return target
+
+
+class ImageOptimizer:
+    """
+    Downscale and recompress images before uploading them, using a pool of worker processes.
+
+    Outcomes are cached on disk by content hash and settings, so each image is
+    optimized only once, also across program invocations. Optimizing images needs
+    the Pillow package. When it is not installed, images are uploaded as they are.
+
+    When `widths` are given, narrower variants of each image are generated, too,
+    for responsive images. Browsers choose between them using the `sizes` condition.
+    """
+
+    SUFFIXES = [".png", ".jpg", ".jpeg", ".webp"]
+
+    def __init__(
+        self,
+        max_width: int = 2000,
+        quality: int = 90,
+        directory: t.Optional[t.Union[str, Path]] = None,
+        concurrency: t.Optional[int] = None,
+        widths: t.Optional[t.Sequence[int]] = None,
+        sizes: str = "100vw",
+    ):
+        self.max_width = max_width
+        self.quality = quality
+        self.widths = sorted(set(widths or []))
+        self.sizes = sizes
+        self.directory = Path(directory) if directory else cache_directory() / "images"
+        self.concurrency = concurrency
+        self.executor: t.Optional[ProcessPoolExecutor] = None
+        self.futures: t.Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return (
+            f"{self.__class__.__name__} max_width={self.max_width}, quality={self.quality}, "
+            f"widths={self.widths}, path={self.directory}"
+        )
+
+    def __enter__(self) -> "ImageOptimizer":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec("PIL") is not None
+
+    def accepts(self, source: t.Union[str, Path]) -> bool:
+        return Path(source).suffix.lower() in self.SUFFIXES and Path(source).is_file()
+
+    def target(self, digest: str, suffix: str, width: t.Optional[int] = None) -> Path:
+        return self.directory / f"{digest}-w{width or self.max_width}-q{self.quality}{suffix.lower()}"
+
+    def submit(
+        self, source: t.Union[str, Path], width: t.Optional[int] = None, digest: t.Optional[str] = None
+    ) -> Future:
+        """
+        Optimize an image in a worker process, unless it has been optimized before.
+        When `width` is given, downscale it to that width, instead of `max_width`.
+        The future resolves to the path of the optimized image.
+        """
+        width = width or self.max_width
+        target = self.target(digest or file_digest(source), Path(source).suffix, width)
+        key = str(target)
+        with self.lock:
+            future = self.futures.get(key)
+            if future is None and target.exists():
+                future = self.futures[key] = Future()
+                future.set_result(key)
+            metrics.cache("image-optimizer", hit=future is not None)
+            if future is None:
+                if self.executor is None:
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    # The pool may be started from within worker threads. Forking them could copy held locks.
+                    self.executor = ProcessPoolExecutor(
+                        max_workers=self.concurrency, mp_context=multiprocessing.get_context("spawn")
+                    )
+                future = self.futures[key] = self.executor.submit(optimize_image, str(source), key, width, self.quality)
+        return future
+
+    def optimize(self, sources: t.List[str]) -> t.Dict[str, str]:
+        """
+        Optimize images concurrently, and return the paths to the optimized images, by source path.
+
+        Sources which are not supported image files, or failed to optimize, are skipped.
+        """
+        if not self.available():
+            logger.warning("Image optimization needs the Pillow package, uploading images as they are")
+            return {}
+        futures = {source: self.submit(source) for source in dict.fromkeys(sources) if self.accepts(source)}
+        results: t.Dict[str, str] = {}
+        for source, future in futures.items():
+            try:
+                results[source] = future.result()
+            except Exception as ex:
+                logger.warning(f"Optimizing image failed, uploading it as it is: {source}: {ex}")
+        if results:
+            saved = sum(os.stat(source).st_size - os.stat(target).st_size for source, target in results.items())
+            logger.info(f"Optimized {len(results)} images, saving {format_bytes(saved)}")
+        return results
+
+    def variants(self, sources: t.List[str]) -> t.Dict[str, t.Dict[int, str]]:
+        """
+        Generate narrower variants of images concurrently, and return their paths by width, by source path.
+
+        Variants are only generated for widths smaller than the width of the optimized
+        image, which is included, too. Sources which are not supported image files,
+        or failed to optimize, are skipped.
+        """
+        if not self.widths or not self.available():
+            return {}
+        from PIL import Image
+
+        futures: t.Dict[str, t.Dict[int, Future]] = {}
+        for source in dict.fromkeys(sources):
+            if not self.accepts(source):
+                continue
+            try:
+                with Image.open(source) as image:
+                    width = min(image.width, self.max_width)
+            except Exception as ex:
+                logger.warning(f"Reading image failed, not generating variants: {source}: {ex}")
+                continue
+            digest = file_digest(source)
+            futures[source] = {width: self.submit(source, digest=digest)}
+            for variant in self.widths:
+                if variant < width:
+                    futures[source][variant] = self.submit(source, width=variant, digest=digest)
+
+        results: t.Dict[str, t.Dict[int, str]] = {}
+        for source, variants in futures.items():
+            try:
+                results[source] = {width: future.result() for width, future in sorted(variants.items())}
+            except Exception as ex:
+                logger.warning(f"Generating image variants failed: {source}: {ex}")
+        if results:
+            count = sum(len(variants) - 1 for variants in results.values())
+            logger.info(f"Generated {count} variants of {len(results)} images")
+        return results
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -1,22 +1,49 @@
 import contextlib
+import hashlib
 import io
 import typing as t
 from pathlib import Path
 
 import requests
 
+from hubspot_tech_writing.util.profiling import profiler
+
+# Read files in chunks of 1 MiB when computing content hashes.
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
 
 @contextlib.contextmanager
 def to_io(source: t.Union[str, Path, t.IO]) -> t.Generator[t.IO, None, None]:
     if isinstance(source, (str, Path)):
         source = str(source)
         fp: t.IO
-        if source.startswith("http://") or source.startswith("https://"):
-            response = requests.get(source, timeout=10.0)
-            fp = io.StringIO(response.text)
-        else:
-            fp = open(source, "r")
+        with profiler.stage("fetch"):
+            if source.startswith("http://") or source.startswith("https://"):
+                response = requests.get(source, timeout=10.0)
+                fp = io.StringIO(response.text)
+            else:
+                fp = open(source, "r")
     else:
         fp = source
     yield fp
     fp.close()
+
+
+def file_digest(path: t.Union[str, Path], algorithm: str = "sha256") -> str:
+    """
+    Compute the hex digest of a file's content.
+
+    The file is read in chunks, so memory usage stays constant for large files.
+    """
+    hasher = hashlib.new(algorithm)
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(DIGEST_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def text_digest(text: str, algorithm: str = "sha256") -> str:
+    """
+    Compute the hex digest of a text, encoded as UTF-8.
+    """
+    return hashlib.new(algorithm, text.encode("utf-8")).hexdigest()
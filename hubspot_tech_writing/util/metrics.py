@@ -0,0 +1,315 @@
+import bisect
+import contextlib
+import dataclasses
+import json
+import re
+import threading
+import time
+import typing as t
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from hubspot_tech_writing.util.ratelimit import RateLimiter
+
+
+class Histogram:
+    """
+    Latency histogram with fixed bucket boundaries, in milliseconds.
+    """
+
+    BOUNDARIES = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDARIES) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.BOUNDARIES, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Approximate a percentile by the upper boundary of the bucket it falls into.
+        """
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                if index < len(self.BOUNDARIES):
+                    return min(float(self.BOUNDARIES[index]), self.max)
+                break
+        return self.max
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        buckets = {f"le_{boundary}": count for boundary, count in zip(self.BOUNDARIES, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 3),
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": round(self.max, 3),
+            "buckets": buckets,
+        }
+
+
+@dataclasses.dataclass
+class EndpointMetrics:
+    calls: int = 0
+    errors: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    # Bytes not sent thanks to compressing request bodies.
+    bytes_saved: int = 0
+    latency: Histogram = dataclasses.field(default_factory=Histogram)
+    status: t.Dict[str, int] = dataclasses.field(default_factory=dict)
+
+
+class Metrics:
+    """
+    Collect metrics about HubSpot API calls, per endpoint, and about cache usage.
+
+    Collection is disabled by default, in order not to spend cycles on computing
+    request sizes, unless metrics have been requested.
+    """
+
+    # Path segments which are resource identifiers, or folder paths.
+    IDENTIFIER_PATTERN = re.compile(r"/(\d+|%2F[^/]*)(?=/|$)")
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.endpoints: t.Dict[str, EndpointMetrics] = {}
+        self.caches: t.Dict[str, t.Dict[str, int]] = {}
+        self.rate_limiters: t.List[RateLimiter] = []
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+            self.caches = {}
+            self.rate_limiters = []
+            self.started = time.monotonic()
+
+    @classmethod
+    def endpoint(cls, method: str, url: str) -> str:
+        """
+        Compute endpoint label from HTTP method and URL, replacing resource identifiers.
+        """
+        path = cls.IDENTIFIER_PATTERN.sub("/{id}", urlsplit(url).path)
+        return f"{method.upper()} {path}"
+
+    @staticmethod
+    def request_size(body: t.Any = None, post_params: t.Any = None) -> int:
+        """
+        Compute the size of a request body, as passed to the generated HubSpot API client.
+        """
+        size = 0
+        if isinstance(body, (bytes, str)):
+            size += len(body)
+        elif isinstance(body, (dict, list)):
+            size += len(json.dumps(body))
+        elif body is not None and hasattr(body, "__len__"):
+            # Streaming bodies, like `MultipartFile`, know their length.
+            size += len(body)
+        for _, value in post_params or []:
+            if isinstance(value, tuple):
+                size += len(value[1])
+            else:
+                size += len(str(value))
+        return size
+
+    def measure(self, func: t.Callable, method: str, url: str, *args, **kwargs):
+        """
+        Invoke a function performing an HTTP request, and record its metrics.
+        """
+        if not self.enabled:
+            return func(method, url, *args, **kwargs)
+        bytes_sent = self.request_size(kwargs.get("body"), kwargs.get("post_params"))
+        start = time.perf_counter()
+        try:
+            response = func(method, url, *args, **kwargs)
+        except Exception as ex:
+            self.record(
+                method,
+                url,
+                duration=time.perf_counter() - start,
+                status=getattr(ex, "status", None),
+                bytes_sent=bytes_sent,
+                bytes_received=len(getattr(ex, "body", None) or b""),
+            )
+            raise
+        self.record(
+            method,
+            url,
+            duration=time.perf_counter() - start,
+            status=getattr(response, "status", None),
+            bytes_sent=bytes_sent,
+            bytes_received=len(getattr(response, "data", None) or b""),
+        )
+        return response
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        duration: float,
+        status: t.Optional[int] = None,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+    ):
+        """
+        Record a single HTTP request.
+        """
+        if not self.enabled:
+            return
+        label = self.endpoint(method, url)
+        with self.lock:
+            metrics = self.endpoints.setdefault(label, EndpointMetrics())
+            metrics.calls += 1
+            if status is None or not 200 <= status <= 299:
+                metrics.errors += 1
+            metrics.status[str(status)] = metrics.status.get(str(status), 0) + 1
+            metrics.bytes_sent += bytes_sent
+            metrics.bytes_received += bytes_received
+            metrics.latency.add(duration * 1000)
+
+    def compressed(self, method: str, url: str, saved: int):
+        """
+        Record the number of bytes saved by compressing a request body.
+        """
+        if not self.enabled:
+            return
+        label = self.endpoint(method, url)
+        with self.lock:
+            self.endpoints.setdefault(label, EndpointMetrics()).bytes_saved += saved
+
+    def cache(self, name: str, hit: bool):
+        """
+        Record a cache hit or miss.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            counters = self.caches.setdefault(name, {"hits": 0, "misses": 0})
+            counters["hits" if hit else "misses"] += 1
+
+    def add_rate_limiter(self, rate_limiter: RateLimiter):
+        """
+        Include the counters of a rate limiter into the report.
+        """
+        with self.lock:
+            if not any(item is rate_limiter for item in self.rate_limiters):
+                self.rate_limiters.append(rate_limiter)
+
+    @contextlib.contextmanager
+    def enable(self):
+        """
+        Enable metrics collection within a context.
+        """
+        enabled = self.enabled
+        self.enabled = True
+        try:
+            yield self
+        finally:
+            self.enabled = enabled
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        with self.lock:
+            rate_limit: t.Dict[str, int] = {}
+            for rate_limiter in self.rate_limiters:
+                for name, value in dataclasses.asdict(rate_limiter.stats).items():
+                    rate_limit[name] = rate_limit.get(name, 0) + value
+            endpoints = {
+                label: {
+                    "calls": metrics.calls,
+                    "errors": metrics.errors,
+                    "status": dict(metrics.status),
+                    "bytes_sent": metrics.bytes_sent,
+                    "bytes_received": metrics.bytes_received,
+                    "bytes_saved": metrics.bytes_saved,
+                    "latency_ms": metrics.latency.to_dict(),
+                }
+                for label, metrics in sorted(self.endpoints.items())
+            }
+            return {
+                "duration_s": round(time.monotonic() - self.started, 3),
+                "calls": sum(metrics.calls for metrics in self.endpoints.values()),
+                "bytes_sent": sum(metrics.bytes_sent for metrics in self.endpoints.values()),
+                "bytes_received": sum(metrics.bytes_received for metrics in self.endpoints.values()),
+                "bytes_saved": sum(metrics.bytes_saved for metrics in self.endpoints.values()),
+                "rate_limit": rate_limit,
+                "caches": {name: dict(counters) for name, counters in sorted(self.caches.items())},
+                "endpoints": endpoints,
+            }
+
+    def write(self, path: t.Union[str, Path]):
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2))
+
+    def summary(self) -> str:
+        """
+        Format metrics as a plain text table.
+        """
+        data = self.to_dict()
+        header = ("Endpoint", "Calls", "Errors", "Mean ms", "p50 ms", "p90 ms", "p99 ms", "Max ms", "Sent", "Received")
+        rows = [header]
+        for label, metrics in data["endpoints"].items():
+            latency = metrics["latency_ms"]
+            rows.append(
+                (
+                    label,
+                    str(metrics["calls"]),
+                    str(metrics["errors"]),
+                    f"{latency['mean']:.1f}",
+                    f"{latency['p50']:.0f}",
+                    f"{latency['p90']:.0f}",
+                    f"{latency['p99']:.0f}",
+                    f"{latency['max']:.1f}",
+                    format_bytes(metrics["bytes_sent"]),
+                    format_bytes(metrics["bytes_received"]),
+                )
+            )
+        widths = [max(len(row[index]) for row in rows) for index in range(len(header))]
+        lines = []
+        for number, row in enumerate(rows):
+            cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            lines.append("  ".join(cells))
+            if number == 0:
+                lines.append("  ".join("-" * width for width in widths))
+        lines.append("")
+        lines.append(
+            f"Total: {data['calls']} calls in {data['duration_s']:.1f}s, "
+            f"sent {format_bytes(data['bytes_sent'])}, received {format_bytes(data['bytes_received'])}"
+        )
+        if data["bytes_saved"]:
+            lines.append(f"Compression: saved {format_bytes(data['bytes_saved'])} of request bodies")
+        if data["rate_limit"]:
+            lines.append("Rate limit: " + ", ".join(f"{name}={value}" for name, value in data["rate_limit"].items()))
+        for name, counters in data["caches"].items():
+            lines.append(f"Cache {name}: hits={counters['hits']}, misses={counters['misses']}")
+        return "\n".join(lines)
+
+
+def format_bytes(size: int) -> str:
+    value = float(size)
+    for unit in ["B", "KiB", "MiB"]:
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+# Process-wide metrics registry, used by all HubSpot adapters unless specified otherwise.
+metrics = Metrics()
@@ -0,0 +1,113 @@
+import logging
+import mimetypes
+import time
+import typing as t
+import uuid
+from pathlib import Path
+
+from hubspot_tech_writing.util.metrics import format_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class Progress:
+    """
+    Report progress and throughput of a transfer, logging at most once per interval.
+    """
+
+    def __init__(self, label: str, total: int, interval: float = 2.0, clock: t.Callable[[], float] = time.monotonic):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.clock = clock
+        self.done = 0
+        self.started = clock()
+        self.reported = self.started
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    @property
+    def rate(self) -> float:
+        """
+        Throughput in bytes per second.
+        """
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def update(self, count: int):
+        self.done += count
+        now = self.clock()
+        if now - self.reported >= self.interval:
+            self.reported = now
+            percent = 100 * self.done / self.total if self.total else 100.0
+            logger.info(
+                f"Uploading {self.label}: {percent:.0f}% ({format_bytes(self.done)} of {format_bytes(self.total)}), "
+                f"{format_bytes(int(self.rate))}/s"
+            )
+
+    def finish(self):
+        logger.info(
+            f"Uploaded {self.label}: {format_bytes(self.done)} in {self.elapsed:.1f}s, {format_bytes(int(self.rate))}/s"
+        )
+
+
+class MultipartFile:
+    """
+    Stream a `multipart/form-data` request body, consisting of form fields, and a single
+    file read from disk in chunks, so memory usage stays constant regardless of the file size.
+
+    The body is an iterable of byte strings with a known length, which urllib3
+    sends without buffering it. Each iteration reads the file again, so the same
+    instance can be used for retrying a request.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        fields: t.List[t.Tuple[str, str]],
+        name: str,
+        path: t.Union[str, Path],
+        chunk_size: t.Optional[int] = None,
+        progress: bool = True,
+    ):
+        self.path = Path(path)
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.progress = progress
+        self.size = self.path.stat().st_size
+        self.boundary = uuid.uuid4().hex
+
+        parts = []
+        for field, value in fields:
+            parts.append(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field}"\r\n\r\n{value}\r\n'.encode()
+            )
+        mimetype = mimetypes.guess_type(self.path.name)[0] or "application/octet-stream"
+        parts.append(
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{self.path.name}"\r\n'
+            f"Content-Type: {mimetype}\r\n\r\n".encode()
+        )
+        self.head = b"".join(parts)
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return len(self.head) + self.size + len(self.tail)
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        progress = Progress(label=self.path.name, total=self.size) if self.progress else None
+        yield self.head
+        with open(self.path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(self.chunk_size), b""):
+                if progress is not None:
+                    progress.update(len(chunk))
+                yield chunk
+        if progress is not None:
+            progress.finish()
+        yield self.tail
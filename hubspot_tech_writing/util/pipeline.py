@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+import typing as t
+from concurrent.futures import Executor, Future
+
+from hubspot_tech_writing.util.profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+
+class Pipeline:
+    """
+    Run stages of work concurrently, each one as soon as the stages it depends on have finished.
+
+    A stage is invoked with its own arguments, followed by the results of the stages
+    it depends on, in order. When a stage fails, the stages depending on it fail with
+    the same exception, without being invoked. Stages are only submitted to the
+    executor when they are ready to run, so they never block a worker waiting for
+    other stages.
+    """
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        self.futures: t.Dict[str, Future] = {}
+        self.durations: t.Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def stage(self, name: str, func: t.Callable, *args, after: t.Sequence[str] = ()) -> Future:
+        """
+        Add a stage, which runs `func` after the stages named in `after`.
+        """
+        if name in self.futures:
+            raise ValueError(f"Stage already exists: {name}")
+        missing = [dependency for dependency in after if dependency not in self.futures]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {', '.join(missing)}")
+        dependencies = [self.futures[dependency] for dependency in after]
+        future: Future = Future()
+        self.futures[name] = future
+
+        def run(*results):
+            start = time.perf_counter()
+            try:
+                with profiler.stage(f"pipeline.{name}"):
+                    return func(*args, *results)
+            finally:
+                with self.lock:
+                    self.durations[name] = time.perf_counter() - start
+
+        def relay(inner: Future):
+            exception = inner.exception()
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(inner.result())
+
+        def start():
+            for dependency in dependencies:
+                exception = dependency.exception()
+                if exception is not None:
+                    logger.debug(f"Skipping stage {name}, because a stage it depends on failed: {exception}")
+                    future.set_exception(exception)
+                    return
+            logger.debug(f"Starting stage: {name}")
+            self.executor.submit(run, *[dependency.result() for dependency in dependencies]).add_done_callback(relay)
+
+        remaining = [len(dependencies)]
+
+        def done(_: Future):
+            with self.lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                start()
+
+        if not dependencies:
+            start()
+        for dependency in dependencies:
+            dependency.add_done_callback(done)
+        return future
+
+    def result(self, name: str) -> t.Any:
+        """
+        Wait for a stage to finish, and return its result, or raise its exception.
+        """
+        return self.futures[name].result()
@@ -0,0 +1,183 @@
+import contextlib
+import cProfile
+import dataclasses
+import functools
+import io
+import pstats
+import sys
+import threading
+import time
+import typing as t
+from pathlib import Path
+
+
+@dataclasses.dataclass
+class StageTimes:
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+
+
+class Profiler:
+    """
+    Attribute wall clock and CPU time to processing stages, like converting
+    documents, scanning images, or saving blog posts.
+
+    CPU time is measured per thread, because stages run concurrently. Stages may
+    nest, for example, `convert` includes `postprocess`. Optionally, the whole
+    program is profiled using `cProfile`, for drilling down into individual functions.
+    Threads started while profiling, like the workers of thread pools, are profiled, too.
+    After stopping, they uninstall their profilers on their next instrumented stage.
+
+    Profiling is disabled by default, so instrumented stages cost next to nothing.
+    """
+
+    MODES = ["stats", "cprofile"]
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: t.Dict[str, StageTimes] = {}
+        self.lock = threading.Lock()
+        self.profile: t.Optional[cProfile.Profile] = None
+        self.thread_profiles: t.List[cProfile.Profile] = []
+        # The `cProfile` profiler of the current thread, when it has its own.
+        self.local = threading.local()
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> t.Generator[None, None, None]:
+        """
+        Measure a stage within a context.
+        """
+        if not self.enabled:
+            if self.thread_profiles:
+                self.release_thread()
+            yield
+            return
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            with self.lock:
+                times = self.stages.setdefault(name, StageTimes())
+                times.calls += 1
+                times.wall += wall
+                times.cpu += cpu
+
+    def start(self, mode: str = "stats"):
+        """
+        Start profiling. In `cprofile` mode, also profile all function calls, of all threads.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}. Use one of: {', '.join(self.MODES)}")
+        self.reset()
+        self.enabled = True
+        if mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.thread_profiles = []
+            self.profile.enable()
+            # Up to Python 3.11, `cProfile` only profiles the thread which enabled it.
+            # Since Python 3.12, it uses `sys.monitoring`, covering all threads.
+            if sys.version_info < (3, 12):
+                threading.setprofile(self.profile_thread)
+
+    def profile_thread(self, frame, event, arg):
+        """
+        Profile a new thread using its own `cProfile` profiler, which replaces this hook on the first event.
+        """
+        if not self.enabled or self.profile is None:
+            sys.setprofile(None)
+            return
+        profile = cProfile.Profile()
+        with self.lock:
+            self.thread_profiles.append(profile)
+        self.local.profile = profile
+        profile.enable()
+
+    def release_thread(self):
+        """
+        Stop the `cProfile` profiler of the current thread, if it has its own.
+        """
+        profile = getattr(self.local, "profile", None)
+        if profile is not None:
+            self.local.profile = None
+            profile.disable()
+
+    def stats(self, stream: t.Optional[t.IO] = None) -> pstats.Stats:
+        """
+        Merge the `cProfile` statistics of all profiled threads.
+        """
+        if self.profile is None:
+            raise ValueError("Profiling function calls has not been started")
+        with self.lock:
+            profiles = list(self.thread_profiles)
+        return pstats.Stats(self.profile, *profiles, stream=stream)
+
+    def stop(self, path: t.Optional[t.Union[str, Path]] = None):
+        """
+        Stop profiling, and write the `cProfile` statistics to a `.prof` file, when given.
+        """
+        self.enabled = False
+        if self.profile is not None:
+            threading.setprofile(None)
+            self.profile.disable()
+            with self.lock:
+                profiles = list(self.thread_profiles)
+            # Up to Python 3.11, disabling a profiler only uninstalls it from the calling thread.
+            # Other threads uninstall their profilers on their next instrumented stage.
+            for profile in profiles:
+                profile.disable()
+            self.release_thread()
+            if path is not None:
+                self.stats().dump_stats(str(path))
+
+    def summary(self, limit: int = 25) -> str:
+        """
+        Format stage times as a plain text table, sorted by wall clock time,
+        followed by the functions with the highest cumulative time, in `cprofile` mode.
+        """
+        with self.lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1].wall, reverse=True)
+        header = ("Stage", "Calls", "Wall s", "CPU s")
+        rows = [header] + [(name, str(times.calls), f"{times.wall:.3f}", f"{times.cpu:.3f}") for name, times in stages]
+        widths = [max(len(row[index]) for row in rows) for index in range(len(header))]
+        lines = []
+        for number, row in enumerate(rows):
+            cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            lines.append("  ".join(cells))
+            if number == 0:
+                lines.append("  ".join("-" * width for width in widths))
+        if self.profile is not None:
+            buffer = io.StringIO()
+            self.stats(stream=buffer).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+            lines.append("")
+            lines.append(buffer.getvalue().strip())
+        return "\n".join(lines)
+
+
+# Process-wide profiler, used by all instrumented stages.
+profiler = Profiler()
+
+
+def profiled(name: str) -> t.Callable[[t.Callable], t.Callable]:
+    """
+    Decorate a function, in order to measure it as a stage of the process-wide profiler.
+    """
+
+    def decorator(func: t.Callable) -> t.Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with profiler.stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,223 @@
+import asyncio
+import dataclasses
+import logging
+import random
+import threading
+import time
+import typing as t
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket for limiting the rate of operations.
+
+    Tokens are reserved under a lock, while waiting happens outside of it,
+    so the bucket can be shared between threads and asyncio tasks.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: t.Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.timestamp = clock()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Reserve a token, and return the number of seconds to wait until it is available.
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+            self.timestamp = now
+            self.tokens -= 1
+            delay = max(0.0, -self.tokens / self.rate)
+            return max(delay, self.paused_until - now)
+
+    def pause(self, seconds: float):
+        """
+        Block all consumers for the given number of seconds, e.g. when the server asks to back off.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def acquire(self) -> float:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+@dataclasses.dataclass
+class RateLimitStats:
+    """
+    Counters about rate-limited API calls.
+    """
+
+    # Number of API calls, excluding retries.
+    calls: int = 0
+    # Number of API calls which had to wait for the client-side rate limiter.
+    delayed: int = 0
+    # Number of responses indicating the server-side rate limit was hit (HTTP 429).
+    throttled: int = 0
+    # Number of retried requests.
+    retried: int = 0
+    # Number of API calls which failed after exhausting all retries.
+    failed: int = 0
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when the daily API quota has been used up, so retrying is pointless.
+    """
+
+
+class RateLimiter:
+    """
+    Limit the rate of HubSpot API calls, and retry throttled requests.
+
+    - Requests are admitted by a token bucket, shared by all users of the limiter.
+    - Requests failing with HTTP 429, or with HTTP 5xx on idempotent methods, are retried,
+      using exponential backoff with full jitter.
+    - The `Retry-After` and `X-HubSpot-RateLimit-*` response headers are honored.
+
+    https://developers.hubspot.com/docs/api/usage-details
+    """
+
+    # HubSpot allows 100 requests per 10 seconds for private apps on the lowest tier.
+    DEFAULT_RATE = 10.0
+    DEFAULT_BURST = 10.0
+
+    RETRY_STATUS = [429]
+    RETRY_STATUS_IDEMPOTENT = [500, 502, 503, 504]
+    IDEMPOTENT_METHODS = ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+
+    registry: t.Dict[str, "RateLimiter"] = {}
+    registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: float = DEFAULT_BURST,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        self.bucket = TokenBucket(rate=rate, capacity=burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = RateLimitStats()
+        self.stats_lock = threading.Lock()
+
+    @classmethod
+    def for_access_token(cls, access_token: str) -> "RateLimiter":
+        """
+        Return the rate limiter shared by all clients using the same access token, i.e. HubSpot portal.
+        """
+        with cls.registry_lock:
+            if access_token not in cls.registry:
+                cls.registry[access_token] = cls()
+            return cls.registry[access_token]
+
+    def count(self, **increments: int):
+        with self.stats_lock:
+            for name, value in increments.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    def call(self, method: str, func: t.Callable, *args, **kwargs):
+        """
+        Invoke a function performing an HTTP request, rate-limited, and with retries.
+        """
+        self.count(calls=1)
+        attempt = 0
+        while True:
+            if self.bucket.acquire() > 0:
+                self.count(delayed=1)
+            try:
+                response = func(*args, **kwargs)
+            except Exception as ex:
+                delay = self.get_retry_delay(method, ex, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.count(retried=1)
+                logger.warning(f"Retrying request in {delay:.2f} seconds ({attempt}/{self.max_retries}): {ex}")
+                time.sleep(delay)
+                continue
+            self.observe(getattr(response, "getheaders", dict)())
+            return response
+
+    async def call_async(self, method: str, func: t.Callable[..., t.Awaitable], *args, **kwargs):
+        """
+        Invoke a coroutine function performing an HTTP request, rate-limited, and with retries.
+        """
+        self.count(calls=1)
+        attempt = 0
+        while True:
+            if await self.bucket.acquire_async() > 0:
+                self.count(delayed=1)
+            try:
+                response = await func(*args, **kwargs)
+            except Exception as ex:
+                delay = self.get_retry_delay(method, ex, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.count(retried=1)
+                logger.warning(f"Retrying request in {delay:.2f} seconds ({attempt}/{self.max_retries}): {ex}")
+                await asyncio.sleep(delay)
+                continue
+            self.observe(getattr(response, "headers", {}))
+            return response
+
+    def get_retry_delay(self, method: str, ex: Exception, attempt: int) -> t.Optional[float]:
+        """
+        Decide whether a failed request should be retried, and return the delay, or `None`.
+        """
+        status = getattr(ex, "status", None)
+        headers = getattr(ex, "headers", None) or {}
+        if status == 429:
+            self.count(throttled=1)
+            if headers.get("X-HubSpot-RateLimit-Daily-Remaining") == "0":
+                self.count(failed=1)
+                raise RateLimitExceeded("Daily HubSpot API quota exhausted") from ex
+        elif not (status in self.RETRY_STATUS_IDEMPOTENT and method.upper() in self.IDEMPOTENT_METHODS):
+            return None
+        if attempt >= self.max_retries:
+            self.count(failed=1)
+            return None
+
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))  # noqa: S311
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        elif status == 429 and headers.get("X-HubSpot-RateLimit-Interval-Milliseconds"):
+            delay = max(delay, float(headers["X-HubSpot-RateLimit-Interval-Milliseconds"]) / 1000)
+
+        # Make all other consumers of the rate limiter back off, too.
+        if status == 429:
+            self.bucket.pause(delay)
+        return delay
+
+    def observe(self, headers: t.Mapping[str, str]):
+        """
+        Back off proactively when the server reports that the rate limit window is exhausted.
+        """
+        remaining = headers.get("X-HubSpot-RateLimit-Remaining")
+        interval = headers.get("X-HubSpot-RateLimit-Interval-Milliseconds")
+        if remaining == "0" and interval:
+            self.bucket.pause(float(interval) / 1000)
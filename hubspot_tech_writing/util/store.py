@@ -0,0 +1,315 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import threading
+import typing as t
+from pathlib import Path
+
+from hubspot_tech_writing.util.common import cache_directory
+
+logger = logging.getLogger(__name__)
+
+
+def write_json_atomic(path: Path, data: t.Any):
+    """
+    Write JSON data to file, replacing it atomically.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmppath = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmppath, "w") as fp:
+        json.dump(data, fp, indent=2, sort_keys=True)
+    os.replace(tmppath, path)
+
+
+@dataclasses.dataclass
+class ManifestEntry:
+    id: str  # noqa: A003
+    url: str
+    name: str
+
+
+class UploadManifest:
+    """
+    Remember which files have been uploaded to HubSpot, keyed by content hash
+    and target folder, in order to skip uploading unchanged files again.
+    """
+
+    FILENAME = "manifest.json"
+
+    def __init__(self, path: t.Optional[t.Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self.entries: t.Dict[str, ManifestEntry] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def __str__(self):
+        return f"{self.__class__.__name__} path={self.path}, entries={len(self.entries)}"
+
+    @classmethod
+    def for_access_token(cls, access_token: t.Optional[str]) -> "UploadManifest":
+        """
+        Create a manifest stored at the default location for the given HubSpot portal.
+        """
+        return cls(path=cache_directory(access_token) / cls.FILENAME)
+
+    @staticmethod
+    def key(digest: str, folder: str) -> str:
+        return f"{folder}:{digest}"
+
+    def load(self):
+        """
+        Load manifest from file, if it exists.
+        """
+        if self.path is None or not self.path.exists():
+            return
+        logger.info(f"Loading upload manifest: {self.path}")
+        data = json.loads(self.path.read_text())
+        self.entries = {key: ManifestEntry(**value) for key, value in data.items()}
+
+    def save(self):
+        """
+        Save manifest to file.
+        """
+        if self.path is None:
+            return
+        # Write while holding the lock, so a concurrent save of an older state can not win.
+        with self.lock:
+            data = {key: dataclasses.asdict(entry) for key, entry in self.entries.items()}
+            write_json_atomic(self.path, data)
+
+    def get(self, digest: str, folder: str, name: t.Optional[str] = None) -> t.Optional[ManifestEntry]:
+        """
+        Look up a file by content hash and folder. When `name` is given, it must match, too.
+        """
+        entry = self.entries.get(self.key(digest, folder))
+        if entry is None or (name is not None and entry.name != name):
+            return None
+        return entry
+
+    def put(self, digest: str, folder: str, name: str, file: t.Any):
+        """
+        Record an uploaded HubSpot file, and persist the manifest.
+        """
+        entry = ManifestEntry(id=str(file.id), url=file.url, name=name)
+        with self.lock:
+            self.entries[self.key(digest, folder)] = entry
+        self.save()
+
+    def forget(self, identifiers: t.Iterable[t.Any]) -> int:
+        """
+        Remove entries of HubSpot files which have been deleted, by file identifier, and persist the manifest.
+        """
+        identifiers = {str(identifier) for identifier in identifiers}
+        with self.lock:
+            keys = [key for key, entry in self.entries.items() if entry.id in identifiers]
+            for key in keys:
+                del self.entries[key]
+        if keys:
+            logger.info(f"Removed {len(keys)} deleted files from upload manifest")
+            self.save()
+        return len(keys)
+
+
+class BlogPostRecord(t.NamedTuple):
+    id: str  # noqa: A003
+    slug: t.Optional[str]
+    updated: t.Optional[str]
+
+
+class BlogPostIndex:
+    """
+    Remember blog post identifiers by name and slug, in order to skip
+    looking up blog posts before updating them.
+    """
+
+    FILENAME = "blogposts.json"
+
+    def __init__(self, path: t.Optional[t.Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self.names: t.Dict[str, BlogPostRecord] = {}
+        self.slugs: t.Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def __str__(self):
+        return f"{self.__class__.__name__} path={self.path}, entries={len(self.names)}"
+
+    @classmethod
+    def for_access_token(cls, access_token: t.Optional[str]) -> "BlogPostIndex":
+        """
+        Create an index stored at the default location for the given HubSpot portal.
+        """
+        return cls(path=cache_directory(access_token) / cls.FILENAME)
+
+    def load(self):
+        """
+        Load index from file, if it exists.
+        """
+        if self.path is None or not self.path.exists():
+            return
+        logger.info(f"Loading blog post index: {self.path}")
+        data = json.loads(self.path.read_text())
+        self.names = {name: BlogPostRecord(*record) for name, record in data.items()}
+        self.slugs = {record.slug: name for name, record in self.names.items() if record.slug}
+
+    def save(self):
+        """
+        Save index to file, storing records as compact arrays.
+        """
+        if self.path is None:
+            return
+        with self.lock:
+            data = {name: list(record) for name, record in self.names.items()}
+            write_json_atomic(self.path, data)
+
+    def get(self, name: str) -> t.Optional[BlogPostRecord]:
+        return self.names.get(name)
+
+    def get_by_slug(self, slug: str) -> t.Optional[BlogPostRecord]:
+        name = self.slugs.get(slug)
+        if name is None:
+            return None
+        return self.names.get(name)
+
+    def put(self, name: str, post: t.Any):
+        """
+        Record a blog post, and persist the index.
+        """
+        updated = post.updated.isoformat() if hasattr(post.updated, "isoformat") else post.updated
+        record = BlogPostRecord(id=str(post.id), slug=post.slug, updated=updated)
+        with self.lock:
+            if self.names.get(name) == record:
+                return
+            self.names[name] = record
+            if record.slug:
+                self.slugs[record.slug] = name
+        self.save()
+
+    def forget(self, name: str):
+        """
+        Invalidate a blog post, e.g. when it has been deleted, and persist the index.
+        """
+        with self.lock:
+            record = self.names.pop(name, None)
+            if record is None:
+                return
+            if record.slug:
+                self.slugs.pop(record.slug, None)
+        self.save()
+
+
+class PublishJournal:
+    """
+    Record completed steps of publishing documents, in order to resume an interrupted run.
+
+    Steps are appended to a JSON Lines file as soon as they complete:
+    uploaded files (content hash and folder to URL), created blog posts
+    (name to identifier), and saved blog post bodies (name to content hash).
+
+    There is one journal per HubSpot portal and set of published sources, so
+    concurrent runs publishing different documents do not discard each other's journals.
+    """
+
+    DIRECTORY = "journals"
+
+    def __init__(self, path: t.Optional[t.Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self.files: t.Dict[str, ManifestEntry] = {}
+        self.posts: t.Dict[str, str] = {}
+        self.bodies: t.Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def __str__(self):
+        return (
+            f"{self.__class__.__name__} path={self.path}, "
+            f"files={len(self.files)}, posts={len(self.posts)}, bodies={len(self.bodies)}"
+        )
+
+    @classmethod
+    def for_access_token(
+        cls, access_token: t.Optional[str], sources: t.Sequence[t.Union[str, Path]] = (), name: t.Optional[str] = None
+    ) -> "PublishJournal":
+        """
+        Create a journal stored at the default location for the given HubSpot portal, sources, and blog post name.
+        """
+        locations = sorted(
+            str(source) if str(source).startswith(("http://", "https://")) else str(Path(source).resolve())
+            for source in sources
+        )
+        identity = json.dumps({"sources": locations, "name": name or ""}, sort_keys=True)
+        digest = hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+        return cls(path=cache_directory(access_token) / cls.DIRECTORY / f"{digest}.jsonl")
+
+    def load(self):
+        """
+        Load journal from file, if it exists. A truncated last line, from a crash while writing, is ignored.
+        """
+        if self.path is None or not self.path.exists():
+            return
+        logger.info(f"Loading publish journal: {self.path}")
+        with open(self.path) as fp:
+            for line in fp:
+                try:
+                    self.apply(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Ignoring incomplete journal entry: {line.strip()}")
+
+    def apply(self, record: t.Dict[str, t.Any]):
+        step = record.get("step")
+        if step == "file":
+            self.files[record["key"]] = ManifestEntry(id=record["id"], url=record["url"], name=record["name"])
+        elif step == "post":
+            self.posts[record["name"]] = record["id"]
+        elif step == "body":
+            self.bodies[record["name"]] = record["digest"]
+
+    def append(self, record: t.Dict[str, t.Any]):
+        """
+        Record a completed step, and persist it right away.
+        """
+        with self.lock:
+            self.apply(record)
+            if self.path is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as fp:
+                fp.write(json.dumps(record, sort_keys=True) + "\n")
+                fp.flush()
+                os.fsync(fp.fileno())
+
+    def reset(self):
+        """
+        Start over, discarding all recorded steps.
+        """
+        with self.lock:
+            self.files = {}
+            self.posts = {}
+            self.bodies = {}
+            if self.path is not None and self.path.exists():
+                self.path.unlink()
+
+    def get_file(self, digest: str, folder: str, name: str) -> t.Optional[ManifestEntry]:
+        entry = self.files.get(UploadManifest.key(digest, folder))
+        if entry is None or entry.name != name:
+            return None
+        return entry
+
+    def put_file(self, digest: str, folder: str, name: str, file: t.Any):
+        key = UploadManifest.key(digest, folder)
+        self.append({"step": "file", "key": key, "id": str(file.id), "url": file.url, "name": name})
+
+    def get_post(self, name: str) -> t.Optional[str]:
+        return self.posts.get(name)
+
+    def put_post(self, name: str, identifier: str):
+        if self.posts.get(name) != str(identifier):
+            self.append({"step": "post", "name": name, "id": str(identifier)})
+
+    def get_body(self, name: str) -> t.Optional[str]:
+        return self.bodies.get(name)
+
+    def put_body(self, name: str, digest: str):
+        self.append({"step": "body", "name": name, "digest": digest})
@@ -3,6 +3,11 @@ from pathlib import Path
 
 import pytest
 
+from hubspot_tech_writing.testing import FakeHubSpotServer
+from hubspot_tech_writing.util.metrics import metrics
+from hubspot_tech_writing.util.profiling import profiler
+from hubspot_tech_writing.util.ratelimit import RateLimiter
+
 
 @pytest.fixture(autouse=True)
 def reset_environment() -> None:
@@ -10,6 +15,41 @@ def reset_environment() -> None:
         del os.environ["HUBSPOT_ACCESS_TOKEN"]
 
 
+@pytest.fixture(autouse=True)
+def reset_cache_directory(tmp_path, monkeypatch) -> None:
+    """
+    Keep local state like upload manifests away from the user's cache directory.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiters() -> None:
+    """
+    Don't share rate limiter state between test cases.
+    """
+    RateLimiter.registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics() -> None:
+    """
+    Don't share metrics between test cases.
+    """
+    metrics.reset()
+    metrics.enabled = False
+
+
+@pytest.fixture(autouse=True)
+def reset_profiler() -> None:
+    """
+    Don't share profiling state between test cases.
+    """
+    profiler.stop()
+    profiler.reset()
+    profiler.profile = None
+
+
 @pytest.fixture
 def markdownfile() -> Path:
     return Path(__file__).parent / "data" / "hubspot-blog-post-original.md"
@@ -26,3 +66,12 @@ def hubspot_access_token():
     It is a defunct / invalid HubSpot access token, just used for testing purposes.
     """
     return "pat-na1-e8805e92-b7fd-5c9b-adc8-2299569f56c2"
+
+
+@pytest.fixture
+def hubspot_server(request):
+    """
+    Local stand-in for the HubSpot API. Faults can be injected by parametrizing the fixture indirectly.
+    """
+    with FakeHubSpotServer(faults=getattr(request, "param", None)) as server:
+        yield server
@@ -0,0 +1,121 @@
+import json
+import zipfile
+
+import pytest
+
+from hubspot_tech_writing.bundle import Bundle
+from hubspot_tech_writing.core import Portal, build, publish_bundle, publish_bundles
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.testing import FakeHubSpotServer
+from hubspot_tech_writing.testing.loadtest import make_png
+from hubspot_tech_writing.util.store import UploadManifest
+
+
+@pytest.fixture
+def document(tmp_path):
+    (tmp_path / "image-1.png").write_bytes(make_png(4, 4, seed=1))
+    (tmp_path / "image-2.png").write_bytes(make_png(4, 4, seed=2))
+    path = tmp_path / "document.md"
+    path.write_text("# Foobar\n\n![One](image-1.png)\n![Two](image-2.png)\n![Again](image-1.png)\n")
+    return path
+
+
+def test_build_bundle(document, tmp_path):
+    """
+    Building a bundle replaces image references by placeholders, and stores each image once, by content hash.
+    """
+    path = build(document, target=tmp_path / "first.bundle")
+    with zipfile.ZipFile(path) as archive:
+        metadata = json.loads(archive.read("bundle.json"))
+        html = archive.read("post.html").decode()
+        names = archive.namelist()
+    assert metadata["name"] == "document"
+    assert sorted(image["name"] for image in metadata["images"]) == ["image-1.png", "image-2.png"]
+    assert sorted(names) == sorted(["bundle.json", "post.html"] + [image["path"] for image in metadata["images"]])
+    for image in metadata["images"]:
+        assert html.count(f"hstw-image:{image['digest']}") == (2 if image["name"] == "image-1.png" else 1)
+    assert "image-1.png" not in html
+
+    # Bundles are reproducible.
+    assert build(document, target=tmp_path / "second.bundle").read_bytes() == path.read_bytes()
+
+
+def test_build_bundle_not_a_document(tmp_path):
+    with pytest.raises(ValueError) as ex:
+        build(tmp_path / "image.png")
+    assert ex.match("Only documents can be bundled")
+
+
+def test_publish_bundle(hubspot_access_token, hubspot_server, document, tmp_path, mocker):
+    """
+    Publishing a bundle uploads its images, and the blog post, without converting the document again.
+    """
+    path = build(document, target=tmp_path / "document.bundle")
+    convert = mocker.patch("hubspot_tech_writing.core.convert")
+    scanner = mocker.patch("hubspot_tech_writing.util.html.ImageScanner")
+    manifest = UploadManifest.for_access_token(hubspot_access_token)
+
+    for _ in range(2):
+        hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+        post = publish_bundle(
+            access_token=hubspot_access_token,
+            bundle=path,
+            content_group_id="42",
+            folder_path="/blog/test",
+            manifest=manifest,
+            hubspot_adapter=hsa,
+        )
+        assert post.name == "document"
+        assert post.post_body.count(f"{hubspot_server.url}/hubfs/blog/test/image-1.png") == 2
+        assert post.post_body.count(f"{hubspot_server.url}/hubfs/blog/test/image-2.png") == 1
+        assert "hstw-image:" not in post.post_body
+    convert.assert_not_called()
+    scanner.assert_not_called()
+    assert len(hubspot_server.posts) == 1
+    assert hubspot_server.requests["upload_file"] == 2
+
+
+def test_publish_bundle_preflight(hubspot_access_token, hubspot_server, document, tmp_path):
+    path = build(document, target=tmp_path / "document.bundle")
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    with pytest.raises(ValueError) as ex:
+        publish_bundle(access_token=hubspot_access_token, bundle=path, content_group_id="42", hubspot_adapter=hsa)
+    assert ex.match("Folder is required for uploading files")
+    assert hubspot_server.total_requests == 0
+
+
+def test_read_bundle_corrupt(document, tmp_path):
+    bundle = Bundle.build(document, html='<img src="image-1.png">')
+    bundle.write(tmp_path / "document.bundle")
+    with zipfile.ZipFile(tmp_path / "document.bundle") as source, zipfile.ZipFile(
+        tmp_path / "corrupt.bundle", "w"
+    ) as target:
+        for name in source.namelist():
+            target.writestr(name, b"foo" if name.startswith("images/") else source.read(name))
+    with pytest.raises(ValueError) as ex:
+        Bundle.read(tmp_path / "corrupt.bundle", directory=tmp_path / "extracted")
+    assert ex.match("Bundle is corrupt, image does not match its digest")
+    assert not list((tmp_path / "extracted").iterdir())
+
+
+def test_publish_bundles(hubspot_server, document, tmp_path, mocker):
+    """
+    Publish a bundle to multiple portals concurrently, reading it only once. A failing portal does not stop the others.
+    """
+    path = build(document, target=tmp_path / "document.bundle")
+    read = mocker.patch("hubspot_tech_writing.core.Bundle.read", wraps=Bundle.read)
+    with FakeHubSpotServer() as other_server:
+        portals = [
+            Portal(access_token=access_token, hubspot_adapter=HubSpotAdapter(access_token=access_token, host=url))
+            for access_token, url in [
+                ("pat-staging", hubspot_server.url),
+                ("pat-production", other_server.url),
+                ("pat-bad", "http://127.0.0.1:9"),
+            ]
+        ]
+        results = publish_bundles(portals=portals, bundle=path, content_group_id="42", folder_path="/blog/test")
+        assert list(results) == [portal.label for portal in portals[:2]]
+        for server in [hubspot_server, other_server]:
+            assert len(server.posts) == 1
+            assert server.requests["upload_file"] == 2
+    assert read.call_count == 1
@@ -1,9 +1,10 @@
-from unittest.mock import Mock
+from unittest.mock import ANY, Mock
 
 import pytest
 from click.testing import CliRunner
 
 from hubspot_tech_writing.cli import cli
+from hubspot_tech_writing.util.store import UploadManifest
 
 
 def test_version():
@@ -90,4 +91,238 @@ def test_delete_file(mocker):
         args="--debug delete file --id=138458225506 --access-token=foo",
         catch_exceptions=False,
     )
-    delete_file.assert_called_once_with(access_token="foo", identifier="138458225506", path=None)  # noqa: S106
+    delete_file.assert_called_once_with(
+        access_token="foo", identifier="138458225506", path=None, manifest=ANY  # noqa: S106
+    )
+    assert delete_file.call_args.kwargs["manifest"].path == UploadManifest.for_access_token("foo").path
+
+
+def test_delete_blogposts(mocker):
+    runner = CliRunner()
+    delete_blogposts: Mock = mocker.patch("hubspot_tech_writing.cli.delete_blogposts")
+    runner.invoke(
+        cli,
+        args="--debug delete posts --pattern=testdrive-* --content-group-id=55844199082 --access-token=foo",
+        catch_exceptions=False,
+    )
+    delete_blogposts.assert_called_once_with(
+        access_token="foo", name_pattern="testdrive-*", content_group_id="55844199082"  # noqa: S106
+    )
+
+
+def test_delete_files(mocker):
+    runner = CliRunner()
+    delete_files: Mock = mocker.patch("hubspot_tech_writing.cli.delete_files")
+    runner.invoke(
+        cli,
+        args="--debug delete files --path-prefix=/testdrive --pattern=*.png --access-token=foo",
+        catch_exceptions=False,
+    )
+    delete_files.assert_called_once_with(
+        access_token="foo", path_prefix="/testdrive", name_pattern="*.png", manifest=ANY  # noqa: S106
+    )
+    assert delete_files.call_args.kwargs["manifest"].path == UploadManifest.for_access_token("foo").path
+
+
+def test_delete_files_manifest(mocker, tmp_path):
+    """
+    Deleted files are removed from the given upload manifest, or from none.
+    """
+    runner = CliRunner()
+    delete_files: Mock = mocker.patch("hubspot_tech_writing.cli.delete_files")
+    runner.invoke(
+        cli,
+        args=f"delete files --path-prefix=/testdrive --manifest-file={tmp_path / 'manifest.json'} --access-token=foo",
+        catch_exceptions=False,
+    )
+    assert delete_files.call_args.kwargs["manifest"].path == tmp_path / "manifest.json"
+
+    delete_file: Mock = mocker.patch("hubspot_tech_writing.cli.delete_file")
+    runner.invoke(
+        cli,
+        args="delete file --id=138458225506 --no-manifest --access-token=foo",
+        catch_exceptions=False,
+    )
+    assert delete_file.call_args.kwargs["manifest"] is None
+
+
+def test_upload_many(mocker):
+    runner = CliRunner()
+    upload_many: Mock = mocker.patch("hubspot_tech_writing.cli.upload_many", return_value=["foo", "bar"])
+    result = runner.invoke(
+        cli,
+        args="upload foo.md bar.md --content-group-id=55844199082 --no-manifest --access-token=foo",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    upload_many.assert_called_once_with(
+        access_token="foo",  # noqa: S106
+        sources=["foo.md", "bar.md"],
+        content_group_id="55844199082",
+        folder_id=None,
+        folder_path=None,
+        manifest=None,
+        hubspot_adapter=None,
+        blogpost_index=None,
+        journal=ANY,
+        optimizer=None,
+    )
+
+
+def test_upload_no_journal(mocker):
+    runner = CliRunner()
+    upload_many: Mock = mocker.patch("hubspot_tech_writing.cli.upload_many", return_value=["foo", "bar"])
+    result = runner.invoke(
+        cli,
+        args="upload foo.md bar.md --no-manifest --no-journal --access-token=foo",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert upload_many.call_args.kwargs["journal"] is None
+
+    result = runner.invoke(cli, args="upload foo.md --no-journal --resume --access-token=foo")
+    assert result.exit_code == 2
+    assert "The `--resume` option can not be used together with `--no-journal`" in result.output
+
+
+def test_upload_many_with_name():
+    runner = CliRunner()
+    result = runner.invoke(cli, args="upload foo.md bar.md --name=foo --access-token=foo")
+    assert result.exit_code == 2
+    assert "The `--name` option can not be used when uploading multiple files" in result.output
+
+
+def test_export(mocker, tmp_path):
+    runner = CliRunner()
+    export: Mock = mocker.patch("hubspot_tech_writing.cli.export", return_value=Mock(images_failed=0))
+    result = runner.invoke(
+        cli,
+        args=f"export {tmp_path} --content-group-id=55844199082 --format=jsonl --images --access-token=foo",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    export.assert_called_once_with(
+        access_token="foo",  # noqa: S106
+        target=str(tmp_path),
+        content_group_id="55844199082",
+        format="jsonl",
+        images=True,
+    )
+
+
+def test_upload_portals(mocker):
+    runner = CliRunner()
+    publish: Mock = mocker.patch("hubspot_tech_writing.cli.publish", return_value={"foo": None, "bar": None})
+    result = runner.invoke(
+        cli,
+        args="upload foo.md --content-group-id=55844199082 --no-manifest --access-token=foo --access-token=bar",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    publish.assert_called_once_with(
+        portals=ANY,
+        sources=["foo.md"],
+        name=None,
+        content_group_id="55844199082",
+        folder_id=None,
+        folder_path=None,
+        optimizer=None,
+    )
+    portals = publish.call_args.kwargs["portals"]
+    assert [portal.access_token for portal in portals] == ["foo", "bar"]
+    assert [portal.manifest for portal in portals] == [None, None]
+
+
+def test_upload_portals_duplicate(mocker):
+    """
+    CLI test: Access tokens given multiple times publish to their portal only once.
+    """
+    runner = CliRunner()
+    publish: Mock = mocker.patch("hubspot_tech_writing.cli.publish", return_value={"foo": None, "bar": None})
+    result = runner.invoke(
+        cli,
+        args="upload foo.md --no-manifest --access-token=foo --access-token=bar --access-token=foo",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert [portal.access_token for portal in publish.call_args.kwargs["portals"]] == ["foo", "bar"]
+
+    upload: Mock = mocker.patch("hubspot_tech_writing.cli.upload")
+    result = runner.invoke(
+        cli, args="upload foo.md --no-manifest --access-token=foo --access-token=foo", catch_exceptions=False
+    )
+    assert result.exit_code == 0
+    assert upload.call_count == 1
+
+
+def test_upload_portals_failure(mocker):
+    runner = CliRunner()
+    mocker.patch("hubspot_tech_writing.cli.publish", return_value={"foo": None})
+    result = runner.invoke(cli, args="upload foo.md --access-token=foo --access-token=bar")
+    assert result.exit_code == 1
+
+
+def test_upload_portals_with_manifest_file():
+    runner = CliRunner()
+    result = runner.invoke(cli, args="upload foo.md --manifest-file=foo.json --access-token=foo --access-token=bar")
+    assert result.exit_code == 2
+    assert "The `--manifest-file` option can not be used when publishing to multiple portals" in result.output
+
+
+def test_upload_compress(mocker):
+    runner = CliRunner()
+    upload: Mock = mocker.patch("hubspot_tech_writing.cli.upload")
+    result = runner.invoke(
+        cli, args="upload foo.md --compress --no-manifest --access-token=foo", catch_exceptions=False
+    )
+    assert result.exit_code == 0
+    assert upload.call_args.kwargs["hubspot_adapter"].compression is True
+
+
+def test_upload_image_widths(mocker):
+    runner = CliRunner()
+    upload: Mock = mocker.patch("hubspot_tech_writing.cli.upload")
+    result = runner.invoke(
+        cli, args="upload foo.md --image-widths=960,480 --no-manifest --access-token=foo", catch_exceptions=False
+    )
+    assert result.exit_code == 0
+    optimizer = upload.call_args.kwargs["optimizer"]
+    assert optimizer.widths == [480, 960]
+    assert optimizer.max_width == 2000
+
+    result = runner.invoke(cli, args="upload foo.md --image-widths=480,foo --access-token=foo")
+    assert result.exit_code == 2
+    assert "Use comma-separated widths in pixels" in result.output
+
+
+def test_build(mocker, tmp_path):
+    runner = CliRunner()
+    build: Mock = mocker.patch("hubspot_tech_writing.cli.build", return_value="foo.bundle")
+    result = runner.invoke(cli, args="build foo.md -o foo.bundle", catch_exceptions=False)
+    assert result.exit_code == 0
+    assert result.output == "foo.bundle\n"
+    build.assert_called_once_with(source="foo.md", target="foo.bundle", name=None, optimizer=None)
+
+
+def test_publish_portals(mocker, tmp_path):
+    runner = CliRunner()
+    bundle = tmp_path / "foo.bundle"
+    bundle.write_bytes(b"")
+
+    def publish_first(portals, **kwargs):
+        for portal in portals:
+            portal.journal.put_post("foo", "12345")
+        return {portals[0].label: None}
+
+    publish_bundles: Mock = mocker.patch("hubspot_tech_writing.cli.publish_bundles", side_effect=publish_first)
+    result = runner.invoke(
+        cli,
+        args=f"publish {bundle} --folder-path=/foo --no-manifest --access-token=foo --access-token=bar",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 1
+    assert [portal.access_token for portal in publish_bundles.call_args.kwargs["portals"]] == ["foo", "bar"]
+    assert publish_bundles.call_args.kwargs["folder_path"] == "/foo"
+    # The journal of the portal publishing failed for is kept, in order to resume publishing.
+    journals = [portal.journal for portal in publish_bundles.call_args.kwargs["portals"]]
+    assert [journal.path.exists() for journal in journals] == [False, True]
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from hubspot_tech_writing.core import export, upload
+from hubspot_tech_writing.export import BlogExporter
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.testing.loadtest import make_png
+
+
+@pytest.fixture
+def portal(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    A HubSpot API stand-in with two blog posts, one of them referencing images, and one in another blog.
+    """
+    (tmp_path / "image-1.png").write_bytes(make_png(4, 4, seed=1))
+    (tmp_path / "image-2.png").write_bytes(make_png(4, 4, seed=2))
+    (tmp_path / "first.md").write_text("# First\n\n![One](image-1.png)\n![Two](image-2.png)\n![Again](image-1.png)\n")
+    (tmp_path / "second.md").write_text("# Second\n")
+    (tmp_path / "other.md").write_text("# Other\n")
+    for name, content_group_id in [("first", "42"), ("second", "42"), ("other", "43")]:
+        upload(
+            access_token=hubspot_access_token,
+            source=tmp_path / f"{name}.md",
+            name=name,
+            content_group_id=content_group_id,
+            folder_path="/blog/export",
+            hubspot_adapter=HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url),
+        )
+    return hubspot_server
+
+
+def test_export_html(hubspot_access_token, portal, tmp_path):
+    """
+    Export blog posts and their images, and verify a second export skips unchanged blog posts.
+    """
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=portal.url)
+    target = tmp_path / "out"
+    result = export(
+        access_token=hubspot_access_token, target=target, content_group_id="42", images=True, hubspot_adapter=hsa
+    )
+    assert (result.exported, result.skipped, result.images, result.images_failed) == (2, 0, 2, 0)
+
+    posts = {post["name"]: post for post in portal.posts.values()}
+    first = posts["first"]
+    assert (target / "posts" / f"{first['id']}.html").read_text() == first["postBody"]
+    metadata = json.loads((target / "posts" / f"{first['id']}.json").read_text())
+    assert metadata["name"] == "first"
+    assert metadata["contentGroupId"] == "42"
+    assert "postBody" not in metadata
+    assert sorted(metadata["images"].values()) == ["images/blog/export/image-1.png", "images/blog/export/image-2.png"]
+    assert (target / "images/blog/export/image-1.png").read_bytes() == make_png(4, 4, seed=1)
+    assert not (target / "posts" / f"{posts['other']['id']}.html").exists()
+    assert portal.requests["get_file_content"] == 2
+
+    # Exporting again skips unchanged blog posts, and images downloaded before.
+    portal.update_post(first["id"], {"postBody": "<p>Updated</p>"})
+    result = export(
+        access_token=hubspot_access_token, target=target, content_group_id="42", images=True, hubspot_adapter=hsa
+    )
+    assert (result.exported, result.skipped, result.images) == (1, 1, 0)
+    assert (target / "posts" / f"{first['id']}.html").read_text() == "<p>Updated</p>"
+    assert portal.requests["get_file_content"] == 2
+
+
+def test_export_html_image_failed(hubspot_access_token, portal, tmp_path):
+    """
+    Blog posts whose images failed to download are exported again, and their images downloaded, by the next export.
+    """
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=portal.url)
+    target = tmp_path / "out"
+    image = next(file for file in portal.files.values() if file["name"] == "image-2")
+    path = image["path"]
+    image["path"] = "/blog/export/unavailable.png"
+    result = export(
+        access_token=hubspot_access_token, target=target, content_group_id="42", images=True, hubspot_adapter=hsa
+    )
+    assert (result.exported, result.skipped, result.images, result.images_failed) == (2, 0, 1, 1)
+    first = next(post for post in portal.posts.values() if post["name"] == "first")
+    assert first["id"] not in json.loads((target / "export-state.json").read_text())
+
+    image["path"] = path
+    result = export(
+        access_token=hubspot_access_token, target=target, content_group_id="42", images=True, hubspot_adapter=hsa
+    )
+    assert (result.exported, result.skipped, result.images, result.images_failed) == (1, 1, 1, 0)
+    assert (target / "images/blog/export/image-2.png").read_bytes() == make_png(4, 4, seed=2)
+    assert first["id"] in json.loads((target / "export-state.json").read_text())
+
+
+def test_export_jsonl(hubspot_access_token, portal, tmp_path):
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=portal.url)
+    hsa.PAGE_SIZE = 2
+    result = BlogExporter(hubspot_adapter=hsa, target=tmp_path / "out", format="jsonl").run()
+    assert result.exported == 3
+    lines = (tmp_path / "out" / "posts.jsonl").read_text().splitlines()
+    assert sorted(json.loads(line)["name"] for line in lines) == ["first", "other", "second"]
+    assert all(json.loads(line)["postBody"] for line in lines)
+    assert portal.requests["search_posts"] >= 2
+
+
+def test_export_image_path(tmp_path):
+    exporter = BlogExporter(hubspot_adapter=None, target=tmp_path)  # type: ignore[arg-type]
+    assert (
+        exporter.image_path("https://example.org/hubfs/blog/My%20Image.png?w=10")
+        == tmp_path / "images/blog/My Image.png"
+    )
+    assert exporter.image_path("https://example.org/hubfs/../../etc/passwd") == tmp_path / "images/etc/passwd"
+    assert exporter.image_path("https://example.org/hubfs/") is None
+
+
+def test_export_unknown_format(tmp_path):
+    with pytest.raises(ValueError) as ex:
+        BlogExporter(hubspot_adapter=None, target=tmp_path, format="xml")  # type: ignore[arg-type]
+    assert ex.match("Unknown export format: xml")
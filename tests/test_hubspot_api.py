@@ -1,4 +1,11 @@
+import itertools
 import re
+import threading
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import ANY
 
 import pytest
 
@@ -99,3 +106,129 @@ def test_get_or_create_file_with_folder_path_and_identifier(mocker, tmpfile_unkn
     with pytest.raises(ValueError) as ex:
         hubspot_adapter.get_or_create_file(file)
     assert ex.match("Use either `folder_id` or `folder_path`, but not both")
+
+
+def test_get_file_by_name_folder_index(mocker, tmpfile_unknown, hubspot_adapter):
+    """
+    Files are looked up in a folder index, which is acquired once per folder, across all pages.
+    """
+    from .test_hubspot_blogpost import mkresponse
+
+    def response_simulator(self, method, url, query_params=None, **kwargs):
+        query_params = dict(query_params or [])
+        if method == "GET" and url == "https://api.hubapi.com/files/v3/folders/search":
+            return mkresponse({"results": [{"id": "42", "path": "/path/to/foo"}]})
+        if method == "GET" and url == "https://api.hubapi.com/files/v3/files/search" and "after" not in query_params:
+            return mkresponse(
+                {
+                    "results": [{"id": "1", "name": "foo", "extension": "png", "path": "/path/to/foo/foo.png"}],
+                    "paging": {"next": {"after": "cursor-2"}},
+                }
+            )
+        if method == "GET" and url == "https://api.hubapi.com/files/v3/files/search":
+            assert query_params["after"] == "cursor-2"
+            return mkresponse(
+                {"results": [{"id": "2", "name": "foo", "extension": "jpg", "path": "/path/to/foo/foo.jpg"}]}
+            )
+        raise ValueError(f"No HTTP conversation mock for: method={method}, url={url}")
+
+    request = mocker.patch("hubspot.files.rest.RESTClientObject.request", autospec=True, side_effect=response_simulator)
+    mocker.patch("hubspot_tech_writing.hubspot_api.HubSpotFile.load")
+
+    def get_file(name):
+        file = HubSpotFile(
+            hubspot_adapter=hubspot_adapter, source=tmpfile_unknown, name=name, folder_path="/path/to/foo"
+        )
+        return hubspot_adapter.get_file_by_name(file)
+
+    assert get_file("foo.png").id == "1"
+    assert get_file("foo.jpg").id == "2"
+    with pytest.raises(FileNotFoundError):
+        get_file("foo.gif")
+    assert request.call_count == 3
+
+
+def test_folder_index_concurrency(hubspot_access_token, hubspot_server):
+    """
+    Different folders are listed concurrently, duplicate lookups of the same folder wait for the first one.
+    """
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    iter_files = hsa.iter_files
+    active: t.List[t.Any] = []
+    listings = []
+    lock = threading.Lock()
+
+    def iter_files_slow(**criteria):
+        with lock:
+            active.append(criteria)
+            listings.append(len(active))
+        time.sleep(0.1)
+        yield from iter_files(**criteria)
+        with lock:
+            active.remove(criteria)
+
+    hsa.iter_files = iter_files_slow  # type: ignore[method-assign]
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        indexes = list(executor.map(hsa.get_folder_index, ["1", "2", "1", "3", "1"]))
+
+    assert indexes == [{}] * 5
+    assert len(listings) == 3
+    assert max(listings) == 3
+    assert hubspot_server.requests["search_files"] == 3
+
+
+def test_folder_path_normalized(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    Folder paths are matched regardless of leading and trailing slashes, so existing files are found.
+    """
+    source = tmp_path / "foo.png"
+    source.write_bytes(b"foo")
+    for folder_path in ["blog/images/", "/blog/images", "blog/images", "/blog/images/"]:
+        hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+        file = HubSpotFile(hubspot_adapter=hsa, source=source, name="foo.png", folder_path=folder_path)
+        assert file.identifier is not None
+        assert hsa.folder_ids == {"/blog/images": ANY}
+    assert hubspot_server.requests["upload_file"] == 1
+
+
+class PageSimulator:
+    """
+    Simulate a paginated API operation, recording all requests.
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.requests: t.List[t.Tuple[t.Optional[str], int]] = []
+
+    def __call__(self, limit: int, after: t.Optional[str] = None, **kwargs):
+        self.requests.append((after, limit))
+        start = int(after or 0)
+        end = min(start + limit, self.total)
+        paging = None
+        if end < self.total:
+            paging = SimpleNamespace(next=SimpleNamespace(after=str(end)))
+        return SimpleNamespace(results=list(range(start, end)), paging=paging)
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_paginate_all_pages(hubspot_adapter, prefetch):
+    get_page = PageSimulator(total=25)
+    results = list(hubspot_adapter.paginate(get_page, page_size=10, prefetch=prefetch))
+    assert results == list(range(25))
+    assert get_page.requests == [(None, 10), ("10", 10), ("20", 10)]
+
+
+def test_paginate_lazy(hubspot_adapter):
+    """
+    Pages are requested lazily, prefetching at most one page ahead.
+    """
+    get_page = PageSimulator(total=100)
+    iterator = hubspot_adapter.paginate(get_page, page_size=10, prefetch=False)
+    assert next(iterator) == 0
+    assert len(get_page.requests) == 1
+
+    get_page = PageSimulator(total=100)
+    iterator = hubspot_adapter.paginate(get_page, page_size=10, prefetch=True)
+    assert list(itertools.islice(iterator, 15)) == list(range(15))
+    iterator.close()
+    assert len(get_page.requests) <= 3
@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+from hubspot.cms.blogs.blog_posts import BlogPost
+
+pytest.importorskip("httpx")
+
+from hubspot_tech_writing.hubspot_api_async import (  # noqa: E402
+    AsyncApiException,
+    AsyncHubSpotAdapter,
+    AsyncHubSpotBlogPost,
+    AsyncHubSpotFile,
+)
+from hubspot_tech_writing.testing import Faults  # noqa: E402
+from hubspot_tech_writing.testing.loadtest import make_png  # noqa: E402
+from hubspot_tech_writing.util.metrics import metrics  # noqa: E402
+from hubspot_tech_writing.util.ratelimit import RateLimiter  # noqa: E402
+from hubspot_tech_writing.util.store import BlogPostIndex  # noqa: E402
+
+
+def make_adapter(access_token, server, **kwargs) -> AsyncHubSpotAdapter:
+    return AsyncHubSpotAdapter(
+        access_token=access_token, host=server.url, rate_limiter=RateLimiter(rate=1000.0, burst=1000.0), **kwargs
+    )
+
+
+def test_async_blogpost_lifecycle(hubspot_access_token, hubspot_server):
+    """
+    Create, update, find, and archive a blog post, using the asynchronous adapter.
+    """
+    metrics.enabled = True
+
+    async def main():
+        async with make_adapter(hubspot_access_token, hubspot_server) as hsa:
+            article = await AsyncHubSpotBlogPost(hsa, name="hstw-async", content_group_id="42").load()
+            assert article.identifier is not None
+            post = await article.set(post_body="<p>Hello</p>").save()
+            assert post is not None
+            assert post.post_body == "<p>Hello</p>"
+
+            # Loading again finds the existing blog post.
+            again = await AsyncHubSpotBlogPost(hsa, name="hstw-async").load()
+            assert again.identifier == article.identifier
+            assert (await hsa.get_blogpost(str(article.identifier))).post_body == "<p>Hello</p>"
+
+            await again.delete()
+            with pytest.raises(FileNotFoundError):
+                await hsa.get_blogpost_by_name("hstw-async")
+
+    asyncio.run(main())
+    assert hubspot_server.requests["create_post"] == 1
+    assert hubspot_server.requests["update_post"] == 1
+    assert hubspot_server.requests["archive_post"] == 1
+    assert not hubspot_server.posts
+    assert metrics.endpoints["POST /cms/v3/blogs/posts"].calls == 1
+
+
+def test_async_blogpost_errors(hubspot_access_token, hubspot_server):
+    async def main():
+        async with make_adapter(hubspot_access_token, hubspot_server) as hsa:
+            with pytest.raises(ValueError) as ex:
+                await AsyncHubSpotBlogPost(hsa, name="unknown").load()
+            assert ex.match("Blog \\(content group\\) identifier is required")
+            with pytest.raises(AttributeError):
+                AsyncHubSpotBlogPost(hsa, name="unknown").set(unknown="foo")
+            with pytest.raises(AsyncApiException) as ex:
+                await hsa.get_blogpost("404")
+            assert ex.value.status == 404
+
+    asyncio.run(main())
+
+
+def test_async_blogpost_index_stale(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    When the blog post from the local index is gone, it is looked up again, and the index is updated.
+    """
+    index = BlogPostIndex(path=tmp_path / "blogposts.json")
+    index.put("hstw-async", BlogPost(id="99999", slug="hstw-async"))
+
+    async def main():
+        async with make_adapter(hubspot_access_token, hubspot_server) as hsa:
+            article = await AsyncHubSpotBlogPost(hsa, name="hstw-async", content_group_id="42", index=index).load()
+            assert article.identifier == "99999"
+            return await article.set(post_body="<p>Hello</p>").save()
+
+    post = asyncio.run(main())
+    assert post.post_body == "<p>Hello</p>"
+    assert hubspot_server.requests["update_post"] == 2
+    assert hubspot_server.requests["create_post"] == 1
+    assert index.get("hstw-async").id == post.id != "99999"
+
+
+def test_async_iter_blogposts(hubspot_access_token, hubspot_server):
+    """
+    Iterating blog posts follows the paging cursors.
+    """
+
+    async def main():
+        async with make_adapter(hubspot_access_token, hubspot_server) as hsa:
+            await asyncio.gather(*[hsa.create_blogpost(f"post-{index}", "42") for index in range(5)])
+            return [post.name async for post in hsa.iter_blogposts(page_size=2)]
+
+    assert sorted(asyncio.run(main())) == [f"post-{index}" for index in range(5)]
+    assert hubspot_server.requests["search_posts"] == 3
+
+
+@pytest.mark.parametrize("hubspot_server", [Faults(throttle_rate=0.3, retry_after=0, seed=42)], indirect=True)
+def test_async_files(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    Upload files concurrently, while being throttled, find them again, replace, and archive them.
+    """
+    for index in range(4):
+        (tmp_path / f"image-{index}.png").write_bytes(make_png(4, 4, seed=index))
+
+    async def main():
+        async with make_adapter(hubspot_access_token, hubspot_server) as hsa:
+            files = await asyncio.gather(
+                *[
+                    AsyncHubSpotFile(hsa, source=tmp_path / f"image-{index}.png", folder_path="/blog/async").load()
+                    for index in range(4)
+                ]
+            )
+            assert len({file.identifier for file in files}) == 4
+
+        async with make_adapter(hubspot_access_token, hubspot_server) as hsa:
+            file = await AsyncHubSpotFile(hsa, source=tmp_path / "image-0.png", folder_path="/blog/async").load()
+            assert file.identifier == files[0].identifier
+            (tmp_path / "image-0.png").write_bytes(make_png(8, 8, seed=7))
+            result = await file.save()
+            assert result.size == (tmp_path / "image-0.png").stat().st_size
+            await file.delete()
+
+    asyncio.run(main())
+    assert sorted(file["path"] for file in hubspot_server.files.values()) == [
+        "/blog/async/image-1.png",
+        "/blog/async/image-2.png",
+        "/blog/async/image-3.png",
+    ]
+    assert hubspot_server.status[429] > 0
+
+
+def test_async_folder_index_concurrency(hubspot_access_token, hubspot_server):
+    """
+    Different folders are listed concurrently, duplicate lookups of the same folder wait for the first one.
+    """
+    active = []
+    listings = []
+
+    async def main():
+        async with make_adapter(hubspot_access_token, hubspot_server) as hsa:
+            iter_files = hsa.iter_files
+
+            async def iter_files_slow(**criteria):
+                active.append(criteria)
+                listings.append(len(active))
+                await asyncio.sleep(0.05)
+                async for file in iter_files(**criteria):
+                    yield file
+                active.remove(criteria)
+
+            hsa.iter_files = iter_files_slow  # type: ignore[method-assign]
+            return await asyncio.gather(*[hsa.get_folder_index(folder_id) for folder_id in ["1", "2", "1", "3", "1"]])
+
+    assert asyncio.run(main()) == [{}] * 5
+    assert len(listings) == 3
+    assert max(listings) == 3
+    assert hubspot_server.requests["search_files"] == 3
+
+
+def test_async_adapter_no_access_token():
+    with pytest.raises(ValueError) as ex:
+        AsyncHubSpotAdapter(access_token="")
+    assert ex.match("Communicating with the HubSpot API needs an access token")
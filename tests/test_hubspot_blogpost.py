@@ -2,10 +2,17 @@ import json
 import os
 
 import pytest
+from hubspot.cms.blogs.blog_posts import BlogPost
+from hubspot.cms.blogs.blog_posts.exceptions import ApiException, NotFoundException
 from hubspot.cms.blogs.blog_posts.rest import RESTResponse
 from urllib3 import HTTPResponse
 
-from hubspot_tech_writing.core import delete_blogpost, upload
+from hubspot_tech_writing.core import delete_blogpost, delete_blogposts, upload, upload_many
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter, HubSpotBlogPost, HubSpotFile
+from hubspot_tech_writing.preflight import PreflightError
+from hubspot_tech_writing.testing.server import ApiError
+from hubspot_tech_writing.util.common import cache_directory
+from hubspot_tech_writing.util.store import BlogPostIndex, PublishJournal
 
 
 def mkresponse(data, status=200, reason="OK"):
@@ -35,6 +42,12 @@ def response_simulator_update(self, method, url, **kwargs):
     return response
 
 
+def response_simulator_update_stale(self, method, url, **kwargs):
+    if method == "PATCH" and url == "https://api.hubapi.com/cms/v3/blogs/posts/99999":
+        raise NotFoundException(http_resp=mkresponse({"status": "error"}, status=404, reason="Not Found"))
+    return response_simulator_update(self, method, url, **kwargs)
+
+
 def response_simulator_delete_id(self, method, url, **kwargs):
     if method == "GET" and url == "https://api.hubapi.com/cms/v3/blogs/posts/12345":
         response = mkresponse({"total": 1, "results": [{"id": "12345"}]})
@@ -109,6 +122,93 @@ def test_upload_blogpost_update(hubspot_access_token, mocker, caplog, tmp_path):
     assert "Saving blog post: HubSpotBlogPost identifier=12345, name=hstw-test" in caplog.text
 
 
+def test_upload_blogpost_update_partial(hubspot_access_token, mocker, tmp_path):
+    """
+    Updating a blog post only sends modified attributes.
+    """
+    tmpfile = tmp_path / "foo.html"
+    tmpfile.write_text("<p>Franz jagt im komplett verwahrlosten Taxi quer durch Bayern.</p>")
+
+    request = mocker.patch(
+        "hubspot.cms.blogs.blog_posts.rest.RESTClientObject.request",
+        autospec=True,
+        side_effect=response_simulator_update,
+    )
+    upload(access_token=hubspot_access_token, source=tmpfile, name="hstw-test")
+
+    assert request.call_args_list[-1].kwargs["body"] == {
+        "postBody": "<p>Franz jagt im komplett verwahrlosten Taxi quer durch Bayern.</p>"
+    }
+
+
+def test_blogpost_update_by_identifier_without_fetch(hubspot_access_token, mocker):
+    request = mocker.patch(
+        "hubspot.cms.blogs.blog_posts.rest.RESTClientObject.request",
+        autospec=True,
+        side_effect=response_simulator_update,
+    )
+    hsa = HubSpotAdapter(access_token=hubspot_access_token)
+    article = HubSpotBlogPost(hubspot_adapter=hsa, identifier="12345", fetch=False)
+    article.set(post_body="<p>Foo</p>", html_title="Foo").save()
+
+    assert [call.args[1] for call in request.call_args_list] == ["PATCH"]
+    assert request.call_args_list[-1].kwargs["body"] == {"postBody": "<p>Foo</p>", "htmlTitle": "Foo"}
+    assert article.changes == {}
+
+    # Saving without changes does not invoke the API.
+    article.save()
+    assert request.call_count == 1
+
+    with pytest.raises(AttributeError) as ex:
+        article.set(foo="bar")
+    assert ex.match("Unknown blog post attribute: foo")
+
+
+def test_upload_blogpost_update_index(hubspot_access_token, mocker, caplog, tmp_path):
+    """
+    When the blog post is known from the local index, it is updated without looking it up.
+    """
+    tmpfile = tmp_path / "foo.html"
+    tmpfile.write_text("<p>Franz jagt im komplett verwahrlosten Taxi quer durch Bayern.</p>")
+    index = BlogPostIndex(path=tmp_path / "blogposts.json")
+
+    request = mocker.patch(
+        "hubspot.cms.blogs.blog_posts.rest.RESTClientObject.request",
+        autospec=True,
+        side_effect=response_simulator_update,
+    )
+    upload(access_token=hubspot_access_token, source=tmpfile, name="hstw-test", blogpost_index=index)
+    assert [call.args[1] for call in request.call_args_list] == ["GET", "PATCH"]
+    assert BlogPostIndex(path=tmp_path / "blogposts.json").get("hstw-test").id == "12345"
+
+    request.reset_mock()
+    upload(access_token=hubspot_access_token, source=tmpfile, name="hstw-test", blogpost_index=index)
+    assert [call.args[1] for call in request.call_args_list] == ["PATCH"]
+    assert "Found blog post in local index: id=12345" in caplog.text
+
+
+def test_upload_blogpost_update_index_stale(hubspot_access_token, mocker, caplog, tmp_path):
+    """
+    When the blog post from the local index is gone, it is looked up again, and the index is updated.
+    """
+    tmpfile = tmp_path / "foo.html"
+    tmpfile.write_text("<p>Franz jagt im komplett verwahrlosten Taxi quer durch Bayern.</p>")
+    index = BlogPostIndex(path=tmp_path / "blogposts.json")
+    index.put("hstw-test", BlogPost(id="99999", slug="hstw-test"))
+
+    request = mocker.patch(
+        "hubspot.cms.blogs.blog_posts.rest.RESTClientObject.request",
+        autospec=True,
+        side_effect=response_simulator_update_stale,
+    )
+    upload(access_token=hubspot_access_token, source=tmpfile, name="hstw-test", blogpost_index=index)
+
+    assert [call.args[1] for call in request.call_args_list] == ["PATCH", "GET", "PATCH"]
+    assert "Blog post in local index is stale, reloading" in caplog.text
+    assert request.call_args_list[-1].kwargs["body"]["postBody"].startswith("<p>Franz jagt")
+    assert index.get("hstw-test").id == "12345"
+
+
 def test_delete_by_identifier(hubspot_access_token, mocker, caplog):
     mocker.patch.dict(os.environ, {"CONFIRM": "yes"})
     mocker.patch("hubspot.cms.blogs.blog_posts.rest.RESTClientObject.request", response_simulator_delete_id)
@@ -128,3 +228,298 @@ def test_delete_fail(hubspot_access_token, mocker, caplog):
     with pytest.raises(ValueError) as ex:
         delete_blogpost(access_token=hubspot_access_token)
     assert ex.match("Deleting blog post needs post id or name")
+
+
+def response_simulator_delete_bulk(self, method, url, query_params=None, **kwargs):
+    query_params = dict(query_params or [])
+    if method == "GET" and url == "https://api.hubapi.com/cms/v3/blogs/posts" and "after" not in query_params:
+        assert query_params["contentGroupId"] == "55844199082"
+        response = mkresponse(
+            {
+                "total": 3,
+                "results": [{"id": "1", "name": "testdrive-1"}, {"id": "2", "name": "other"}],
+                "paging": {"next": {"after": "2"}},
+            }
+        )
+    elif method == "GET" and url == "https://api.hubapi.com/cms/v3/blogs/posts":
+        response = mkresponse({"total": 3, "results": [{"id": "3", "name": "testdrive-3"}]})
+    elif method == "DELETE" and url.startswith("https://api.hubapi.com/cms/v3/blogs/posts/"):
+        response = mkresponse({})
+    else:
+        raise ValueError(f"No HTTP conversation mock for: method={method}, url={url}")
+    return response
+
+
+def test_delete_bulk(hubspot_access_token, mocker):
+    confirm = mocker.patch("hubspot_tech_writing.hubspot_api.confirm", return_value=True)
+    request = mocker.patch(
+        "hubspot.cms.blogs.blog_posts.rest.RESTClientObject.request",
+        autospec=True,
+        side_effect=response_simulator_delete_bulk,
+    )
+    deleted = delete_blogposts(
+        access_token=hubspot_access_token, name_pattern="testdrive-*", content_group_id="55844199082"
+    )
+
+    confirm.assert_called_once_with("Please confirm deletion (archival) of 2 blog posts")
+    assert sorted(post.id for post in deleted) == ["1", "3"]
+    assert len([call for call in request.call_args_list if call.args[1] == "DELETE"]) == 2
+
+
+def test_delete_bulk_fail(hubspot_access_token):
+    with pytest.raises(ValueError) as ex:
+        delete_blogposts(access_token=hubspot_access_token)
+    assert ex.match("Deleting blog posts needs name pattern or content group id")
+
+
+@pytest.fixture
+def documents(tmp_path):
+    """
+    Three documents, two of them sharing an image.
+    """
+    (tmp_path / "shared.png").write_bytes(b"shared")
+    (tmp_path / "only.png").write_bytes(b"only")
+    (tmp_path / "post-a.md").write_text("# A\n\n![Shared](shared.png)\n![Only](only.png)\n")
+    (tmp_path / "post-b.md").write_text("# B\n\n![Shared](shared.png)\n")
+    (tmp_path / "post-c.md").write_text("# C\n")
+    return sorted(tmp_path.glob("*.md"))
+
+
+def test_upload_many(hubspot_access_token, hubspot_server, documents, tmp_path):
+    """
+    Upload many documents, creating and updating blog posts using batch requests.
+    """
+    index = BlogPostIndex(path=tmp_path / "blogposts.json")
+
+    def run():
+        hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+        return upload_many(
+            access_token=hubspot_access_token,
+            sources=documents,
+            content_group_id="42",
+            folder_path="/blog/test",
+            hubspot_adapter=hsa,
+            blogpost_index=index,
+        )
+
+    # First run creates all blog posts, uploading shared images only once.
+    posts = run()
+    assert sorted(post.name for post in posts) == ["post-a", "post-b", "post-c"]
+    assert hubspot_server.requests["upload_file"] == 2
+    assert hubspot_server.requests["search_posts"] == 1
+    assert hubspot_server.requests["batch_create_posts"] == 1
+    assert hubspot_server.requests["create_post"] == 0
+    post_b = next(post for post in hubspot_server.posts.values() if post["name"] == "post-b")
+    assert f"{hubspot_server.url}/hubfs/blog/test/shared.png" in post_b["postBody"]
+    assert index.get("post-b").id == post_b["id"]
+
+    # Second run resolves all blog posts from the index, and updates them.
+    run()
+    assert len(hubspot_server.posts) == 3
+    assert hubspot_server.requests["search_posts"] == 1
+    assert hubspot_server.requests["batch_read_posts"] == 1
+    assert hubspot_server.requests["batch_update_posts"] == 1
+    assert hubspot_server.requests["update_post"] == 0
+
+    # Third run invalidates the stale index entry of a deleted blog post, and creates it again.
+    hubspot_server.archive_post(post_b["id"])
+    run()
+    assert len(hubspot_server.posts) == 3
+    assert hubspot_server.requests["search_posts"] == 2
+    assert hubspot_server.requests["batch_create_posts"] == 2
+    assert index.get("post-b").id != post_b["id"]
+
+
+def test_upload_many_partial_failure(hubspot_access_token, hubspot_server, documents, tmp_path, mocker):
+    """
+    When uploading an image fails, the files and blog posts which do not need it are uploaded anyway.
+    """
+    save = HubSpotFile.save
+
+    def save_failing(self):
+        if self.name == "only.png":
+            raise ApiException(status=500, reason="Internal Server Error")
+        return save(self)
+
+    mocker.patch.object(HubSpotFile, "save", autospec=True, side_effect=save_failing)
+    (tmp_path / "other.png").write_bytes(b"other")
+    results = upload_many(
+        access_token=hubspot_access_token,
+        sources=[*documents, tmp_path / "only.png", tmp_path / "other.png"],
+        content_group_id="42",
+        folder_path="/blog/test",
+        hubspot_adapter=HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url),
+    )
+    assert sorted(result.name for result in results) == ["other", "post-b", "post-c"]
+    assert sorted(post["name"] for post in hubspot_server.posts.values()) == ["post-b", "post-c"]
+
+
+def test_upload_many_chunks(hubspot_access_token, hubspot_server, documents):
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    hsa.BATCH_SIZE = 2
+    posts = upload_many(
+        access_token=hubspot_access_token, sources=documents, content_group_id="42", hubspot_adapter=hsa
+    )
+    assert len(posts) == 3
+    assert hubspot_server.requests["batch_create_posts"] == 2
+
+
+def test_upload_many_without_content_group(hubspot_access_token, hubspot_server, documents):
+    """
+    Creating blog posts needs a content group, which is validated before uploading any images.
+    """
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    hubspot_server.create_post({"name": "post-a", "contentGroupId": "42"})
+    with pytest.raises(ValueError) as ex:
+        upload_many(access_token=hubspot_access_token, sources=documents, folder_path="/blog/test", hubspot_adapter=hsa)
+    assert ex.match("Blog \\(content group\\) identifier is required for creating blog posts: post-b, post-c")
+    assert hubspot_server.requests["search_posts"] == 3
+    assert hubspot_server.requests["upload_file"] == 0
+
+
+def test_publish_journal(tmp_path):
+    journal = PublishJournal(path=tmp_path / "journal.jsonl")
+    journal.put_post("foo", "12345")
+    journal.put_body("foo", "abc")
+    with open(journal.path, "a") as fp:
+        fp.write('{"step": "body", "name": "foo", "dig')
+
+    journal = PublishJournal(path=tmp_path / "journal.jsonl")
+    assert journal.get_post("foo") == "12345"
+    assert journal.get_body("foo") == "abc"
+
+    journal.reset()
+    assert not journal.path.exists()
+    assert journal.get_post("foo") is None
+
+
+def test_publish_journal_location(hubspot_access_token, tmp_path, monkeypatch):
+    """
+    Journals are specific to the HubSpot portal, the published sources, and the blog post name.
+    """
+    monkeypatch.chdir(tmp_path)
+    journal = PublishJournal.for_access_token(hubspot_access_token, sources=["foo.md", "bar.md"])
+    journal.put_post("foo", "12345")
+    assert journal.path.parent == cache_directory(hubspot_access_token) / "journals"
+    assert PublishJournal.for_access_token(hubspot_access_token, sources=[tmp_path / "bar.md", "foo.md"]).posts
+    assert not PublishJournal.for_access_token(hubspot_access_token, sources=["foo.md"]).posts
+    assert not PublishJournal.for_access_token(hubspot_access_token, sources=["foo.md", "bar.md"], name="bar").posts
+    assert not PublishJournal.for_access_token("pat-na1-other", sources=["foo.md", "bar.md"]).posts
+
+    # Starting over with other sources leaves the journal alone.
+    PublishJournal.for_access_token(hubspot_access_token, sources=["baz.md"]).reset()
+    assert journal.path.exists()
+
+
+def test_upload_resume(hubspot_access_token, hubspot_server, documents, tmp_path, mocker):
+    """
+    An upload interrupted after uploading images continues where it stopped.
+    """
+    journal = PublishJournal(path=tmp_path / "journal.jsonl")
+
+    def run():
+        hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+        return upload(
+            access_token=hubspot_access_token,
+            source=documents[0],
+            name="post-a",
+            content_group_id="42",
+            folder_path="/blog/test",
+            hubspot_adapter=hsa,
+            journal=journal,
+        )
+
+    # The first run fails after uploading images, because the blog post can not be created.
+    create_post = mocker.patch.object(hubspot_server, "create_post", side_effect=ApiError(400, "Simulated failure"))
+    with pytest.raises(ApiException) as ex:
+        run()
+    assert ex.match("Simulated failure")
+    assert hubspot_server.requests["upload_file"] == 2
+    assert len(journal.files) == 2
+
+    # The second run skips uploading images.
+    mocker.stop(create_post)
+    run()
+    assert hubspot_server.requests["upload_file"] == 2
+    assert hubspot_server.requests["replace_file"] == 2
+    assert hubspot_server.requests["create_post"] == 2
+    assert hubspot_server.requests["update_post"] == 1
+
+    # The third run has nothing left to do.
+    requests = hubspot_server.total_requests
+    post = run()
+    assert post.id == journal.get_post("post-a")
+    assert hubspot_server.total_requests == requests
+
+
+def test_upload_preflight(hubspot_access_token, hubspot_server, documents):
+    """
+    Problems are reported before uploading anything, all at once.
+    """
+    documents[0].write_text("# A\n\n![Missing](missing.png)\n")
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    hsa.MAX_IMAGE_SIZE = 5
+
+    with pytest.raises(PreflightError) as ex:
+        upload_many(access_token=hubspot_access_token, sources=documents, folder_path="/blog/test", hubspot_adapter=hsa)
+    assert len(ex.value.problems) == 2
+    assert ex.match("File not found: .*missing.png")
+    assert ex.match("File is too large: .*shared.png")
+    assert hubspot_server.total_requests == 0
+
+    # Single documents are verified, too. Blog posts are resolved after local checks succeeded.
+    hsa.MAX_IMAGE_SIZE = 1024 * 1024
+    with pytest.raises(PreflightError) as ex:
+        upload(access_token=hubspot_access_token, source=documents[1], name=None, hubspot_adapter=hsa)
+    assert ex.match("Blog post does not exist: post-b")
+    assert hubspot_server.requests["search_posts"] == 1
+    assert hubspot_server.requests["upload_file"] == 0
+
+
+def test_upload_remote_image(hubspot_access_token, hubspot_server, documents):
+    """
+    Remote images are referenced as they are, without uploading them.
+    """
+    documents[0].write_text("# A\n\n![Remote](https://example.org/remote.png)\n![Only](only.png)\n")
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+
+    upload(
+        access_token=hubspot_access_token,
+        source=documents[0],
+        name=None,
+        content_group_id="42",
+        folder_path="/blog/test",
+        hubspot_adapter=hsa,
+    )
+    assert hubspot_server.requests["upload_file"] == 1
+    assert hubspot_server.requests["create_post"] == 1
+    (post,) = hubspot_server.posts.values()
+    assert 'src="https://example.org/remote.png"' in post["postBody"]
+
+
+def test_upload_many_resume(hubspot_access_token, hubspot_server, documents, tmp_path):
+    journal = PublishJournal(path=tmp_path / "journal.jsonl")
+
+    def run():
+        hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+        return upload_many(
+            access_token=hubspot_access_token,
+            sources=documents,
+            content_group_id="42",
+            folder_path="/blog/test",
+            hubspot_adapter=hsa,
+            journal=journal,
+        )
+
+    run()
+    assert sorted(journal.posts) == ["post-a", "post-b", "post-c"]
+
+    # Only the changed document is updated, without resolving blog posts again.
+    documents[2].write_text("# C\n\nUpdated.\n")
+    posts = run()
+    assert len(posts) == 3
+    assert hubspot_server.requests["search_posts"] == 1
+    assert hubspot_server.requests["upload_file"] == 2
+    assert hubspot_server.requests["batch_update_posts"] == 1
+    post_c = next(post for post in hubspot_server.posts.values() if post["name"] == "post-c")
+    assert "Updated." in post_c["postBody"]
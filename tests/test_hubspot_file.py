@@ -3,16 +3,20 @@ import re
 
 import pytest
 
-from hubspot_tech_writing.core import delete_file, upload
+from hubspot_tech_writing.core import delete_file, delete_files, upload
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.util.store import UploadManifest
 
 from .test_hubspot_blogpost import mkresponse
 
 
 def response_simulator_upload(self, method, url, **kwargs):
-    if method == "GET" and url == "https://api.hubapi.com/files/v3/files/search":
+    if method == "GET" and url == "https://api.hubapi.com/files/v3/folders/search":
+        response = mkresponse({"total": 1, "results": [{"id": "66833198083", "path": "/path/to/testdrive"}]})
+    elif method == "GET" and url == "https://api.hubapi.com/files/v3/files/search":
         response = mkresponse({"total": 0, "results": []})
     elif method == "POST" and url == "https://api.hubapi.com/files/v3/files":
-        response = mkresponse({"id": "12345"}, status=201, reason="Created")
+        response = mkresponse({"id": "12345", "parentFolderId": "66833198083"}, status=201, reason="Created")
     elif method == "PUT" and url == "https://api.hubapi.com/files/v3/files/12345":
         response = mkresponse({"id": "12345"})
     else:
@@ -32,6 +36,39 @@ def response_simulator_delete(self, method, url, **kwargs):
     return response
 
 
+def response_simulator_delete_bulk(self, method, url, query_params=None, **kwargs):
+    query_params = dict(query_params or [])
+    if method == "GET" and url == "https://api.hubapi.com/files/v3/folders/search":
+        response = mkresponse(
+            {
+                "results": [
+                    {"id": "1", "path": "/testdrive"},
+                    {"id": "2", "path": "/testdrive/sub"},
+                    {"id": "3", "path": "/testdrive-other"},
+                ]
+            }
+        )
+    elif (
+        method == "GET" and url == "https://api.hubapi.com/files/v3/files/search" and "parentFolderIds" in query_params
+    ):
+        folder_id = query_params["parentFolderIds"][0]
+        response = mkresponse(
+            {
+                "results": [
+                    {"id": f"{folder_id}{index}", "path": f"/folder{folder_id}/file{index}.{extension}"}
+                    for index, extension in enumerate(["png", "png", "jpg"])
+                ]
+            }
+        )
+    elif method == "GET" and url == "https://api.hubapi.com/files/v3/files/search":
+        response = mkresponse({"results": []})
+    elif method == "DELETE" and url.startswith("https://api.hubapi.com/files/v3/files/"):
+        response = mkresponse({})
+    else:
+        raise ValueError(f"No HTTP conversation mock for: method={method}, url={url}")
+    return response
+
+
 def test_upload_file_folder_id_success(mocker, caplog, tmp_path):
     tmpfile = tmp_path / "foo.png"
     tmpfile.write_bytes(b"foo")
@@ -66,6 +103,41 @@ def test_upload_file_folder_path_success(mocker, caplog, tmp_path):
     assert "Saving file: HubSpotFile identifier=12345, name=hstw-test" in caplog.text
 
 
+def test_upload_file_manifest_skip_unchanged(hubspot_access_token, mocker, caplog, tmp_path):
+    tmpfile = tmp_path / "foo.png"
+    tmpfile.write_bytes(b"foo")
+    manifest = UploadManifest(path=tmp_path / "manifest.json")
+
+    request = mocker.patch(
+        "hubspot.files.rest.RESTClientObject.request", autospec=True, side_effect=response_simulator_upload
+    )
+    kwargs = {
+        "access_token": hubspot_access_token,
+        "source": tmpfile,
+        "name": "hstw-test",
+        "folder_path": "/path/to/testdrive",
+        "manifest": manifest,
+        "hubspot_adapter": HubSpotAdapter(access_token=hubspot_access_token),
+    }
+
+    # The first upload talks to the API, and records the file in the manifest.
+    upload(**kwargs)
+    assert request.call_count == 4
+    assert UploadManifest(path=tmp_path / "manifest.json").entries
+
+    # The second upload of the same content is served from the manifest,
+    # verifying the file still exists using the folder index.
+    entry = upload(**kwargs)
+    assert request.call_count == 4
+    assert entry.id == "12345"
+    assert "File is unchanged, skipping upload: id=12345" in caplog.text
+
+    # Changed content is uploaded again, replacing the file found in the folder index.
+    tmpfile.write_bytes(b"bar")
+    upload(**kwargs)
+    assert request.call_count == 5
+
+
 def test_upload_file_fail_no_access_token():
     with pytest.raises(TypeError) as ex:
         upload(source=None, name=None)
@@ -109,3 +181,35 @@ def test_delete_fail(hubspot_access_token, mocker, caplog):
     with pytest.raises(ValueError) as ex:
         delete_file(access_token=hubspot_access_token)
     assert ex.match("Deleting files needs file id or path")
+
+
+def test_delete_files_bulk(hubspot_access_token, mocker, caplog):
+    """
+    Deleting files in bulk confirms once, and only archives matching files within the folder hierarchy.
+    """
+    confirm = mocker.patch("hubspot_tech_writing.hubspot_api.confirm", return_value=True)
+    request = mocker.patch(
+        "hubspot.files.rest.RESTClientObject.request", autospec=True, side_effect=response_simulator_delete_bulk
+    )
+    deleted = delete_files(access_token=hubspot_access_token, path_prefix="/testdrive", name_pattern="*.png")
+
+    confirm.assert_called_once_with("Please confirm deletion (archival) of 4 files")
+    assert sorted(file.id for file in deleted) == ["10", "11", "20", "21"]
+    urls = sorted(call.args[2] for call in request.call_args_list if call.args[1] == "DELETE")
+    assert urls == [f"https://api.hubapi.com/files/v3/files/{identifier}" for identifier in ["10", "11", "20", "21"]]
+    assert "About to delete 4 files:" in caplog.text
+
+
+def test_delete_files_bulk_declined(hubspot_access_token, mocker):
+    mocker.patch("hubspot_tech_writing.hubspot_api.confirm", return_value=False)
+    request = mocker.patch(
+        "hubspot.files.rest.RESTClientObject.request", autospec=True, side_effect=response_simulator_delete_bulk
+    )
+    assert delete_files(access_token=hubspot_access_token, path_prefix="/testdrive") == []
+    assert not [call for call in request.call_args_list if call.args[1] == "DELETE"]
+
+
+def test_delete_files_bulk_fail(hubspot_access_token):
+    with pytest.raises(ValueError) as ex:
+        delete_files(access_token=hubspot_access_token)
+    assert ex.match("Deleting files needs path prefix or name pattern")
@@ -0,0 +1,220 @@
+import base64
+from pathlib import Path
+from unittest.mock import ANY, Mock
+
+import pytest
+from PIL import Image
+
+from hubspot_tech_writing.testing.loadtest import make_png
+from hubspot_tech_writing.testing.rewrite import run_benchmark
+from hubspot_tech_writing.util.html import HTMLImageTranslator, ImageScanner, decode_data_uri
+from hubspot_tech_writing.util.image import ImageOptimizer
+from hubspot_tech_writing.util.metrics import metrics
+
+
+def test_image_translator_upload_duplicates_once(tmp_path):
+    """
+    Images referenced multiple times within a document are uploaded only once.
+    """
+    html = '<p><img src="foo.png" alt="one"></p><p><img src="foo.png" alt="two"></p><img src="bar.png">'
+    uploader = Mock(side_effect=lambda source, name: Mock(url=f"https://hubfs.example.org/{name}"))
+
+    hit = HTMLImageTranslator(html=html, source_path=tmp_path, uploader=uploader)
+    hit.discover().process()
+
+    assert uploader.call_count == 2
+    assert hit.html_out.count("https://hubfs.example.org/foo.png") == 2
+    assert "https://hubfs.example.org/bar.png" in hit.html_out
+
+
+def test_image_scanner_offsets():
+    """
+    The offsets of `src` attribute values are recorded, for all quoting styles, and across lines.
+    Images within scripts and comments, and images without a source, are ignored.
+    """
+    html = (
+        "<p>foo.png</p>\n<IMG ALT='x &amp; y' SRC = 'a&amp;b.png'/>"
+        '<script>var s = \'<img src="script.png">\';</script><!-- <img src="comment.png"> -->\n'
+        '<img\n  data-src="lazy.png"\n  src=unquoted.png class="c"><img alt="none"><img src="">'
+        '<img title=\'src="fake.png"\' src="real.png">'
+    )
+    images = ImageScanner(html).scan()
+    assert [(image.src, image.alt) for image in images] == [
+        ("a&b.png", "x & y"),
+        ("unquoted.png", ""),
+        ("real.png", ""),
+    ]
+    assert [html[image.start : image.end] for image in images] == ["a&amp;b.png", "unquoted.png", "real.png"]
+
+
+def test_image_translator_produce_only_references(tmp_path):
+    """
+    Only image references are replaced, not text mentioning the image, nor other images containing its name.
+    """
+    html = '<p>See foo.png</p><img src="foo.png"><img src="logo-foo.png"><img src="foo.png">'
+    uploader = Mock(side_effect=lambda source, name: Mock(url=f"https://hubfs.example.org/{name}?a=1&b=2"))
+
+    hit = HTMLImageTranslator(html=html, source_path=tmp_path, uploader=uploader)
+    hit.discover().process()
+
+    assert hit.html_out == (
+        '<p>See foo.png</p><img src="https://hubfs.example.org/foo.png?a=1&amp;b=2">'
+        '<img src="https://hubfs.example.org/logo-foo.png?a=1&amp;b=2">'
+        '<img src="https://hubfs.example.org/foo.png?a=1&amp;b=2">'
+    )
+
+
+def test_image_translator_benchmark():
+    """
+    Rewriting hundreds of image references in a single pass is much faster than replacing each of them.
+    """
+    result = run_benchmark(images=500, repeat=3)
+    assert result.images == 500
+    assert result.produce < result.baseline
+    assert "Rewrote 500 image references" in result.summary()
+
+
+@pytest.fixture
+def optimizer(tmp_path):
+    with ImageOptimizer(max_width=32, directory=tmp_path / "optimized", concurrency=2) as optimizer:
+        yield optimizer
+
+
+def test_image_optimizer(tmp_path, optimizer):
+    """
+    Wide images are downscaled, images which can not be improved are used as they are,
+    and outcomes are cached by content hash.
+    """
+    metrics.enabled = True
+    (tmp_path / "wide.png").write_bytes(make_png(64, 16, seed=1))
+    (tmp_path / "small.png").write_bytes(make_png(16, 16, seed=2))
+    (tmp_path / "vector.svg").write_text("<svg/>")
+    sources = [str(tmp_path / name) for name in ["wide.png", "small.png", "vector.svg", "missing.png", "wide.png"]]
+
+    results = optimizer.optimize(sources)
+    assert list(results) == sources[:2]
+    with Image.open(results[sources[0]]) as image:
+        assert image.size == (32, 8)
+    assert Path(results[sources[1]]).read_bytes() == Path(sources[1]).read_bytes()
+    assert metrics.caches["image-optimizer"] == {"hits": 0, "misses": 2}
+
+    # Another optimizer finds the outcomes in the cache directory.
+    with ImageOptimizer(max_width=32, directory=optimizer.directory) as other:
+        assert other.optimize(sources) == results
+        assert other.executor is None
+    assert metrics.caches["image-optimizer"] == {"hits": 2, "misses": 2}
+
+
+def test_image_optimizer_without_pillow(tmp_path, optimizer, mocker):
+    mocker.patch.object(ImageOptimizer, "available", return_value=False)
+    (tmp_path / "wide.png").write_bytes(make_png(64, 16))
+    assert optimizer.optimize([str(tmp_path / "wide.png")]) == {}
+
+
+def test_image_translator_optimize(tmp_path, optimizer):
+    """
+    Optimized images are uploaded under the name of the original image.
+    """
+    (tmp_path / "wide.png").write_bytes(make_png(64, 16))
+    html = '<img src="wide.png"><img src="https://example.org/remote.png">'
+    uploader = Mock(side_effect=lambda source, name: Mock(url=f"https://hubfs.example.org/{name}"))
+
+    hit = HTMLImageTranslator(html=html, source_path=tmp_path, uploader=uploader, optimizer=optimizer)
+    hit.discover().process()
+
+    uploader.assert_any_call(source=ANY, name="wide.png")
+    source = next(call.kwargs["source"] for call in uploader.call_args_list if call.kwargs["name"] == "wide.png")
+    assert Path(source).parent == optimizer.directory
+    assert 'src="https://hubfs.example.org/wide.png"' in hit.html_out
+
+
+def test_image_translator_variants(tmp_path):
+    """
+    Narrower variants of images are uploaded, and referenced using `srcset`. Images narrower than
+    all variants, and images which are responsive already, are left alone. Variants are cached.
+    """
+    metrics.enabled = True
+    (tmp_path / "wide.png").write_bytes(make_png(64, 16, seed=1))
+    (tmp_path / "small.png").write_bytes(make_png(16, 16, seed=2))
+    html = '<p><img alt="wide" src="wide.png"></p><img src=small.png><img src="wide.png" srcset="wide.png 1x">'
+    uploader = Mock(side_effect=lambda source, name: Mock(url=f"https://hubfs.example.org/{name}"))
+
+    for _ in range(2):
+        uploader.reset_mock()
+        with ImageOptimizer(
+            max_width=48,
+            directory=tmp_path / "optimized",
+            widths=[16, 32, 100],
+            sizes="(max-width: 600px) 100vw, 600px",
+        ) as optimizer:
+            hit = HTMLImageTranslator(html=html, source_path=tmp_path, uploader=uploader, optimizer=optimizer)
+            hit.discover().process()
+        assert hit.html_out == (
+            '<p><img alt="wide" src="https://hubfs.example.org/wide.png" '
+            'srcset="https://hubfs.example.org/wide-16w.png 16w, '
+            'https://hubfs.example.org/wide-32w.png 32w, https://hubfs.example.org/wide.png 48w" '
+            'sizes="(max-width: 600px) 100vw, 600px"></p><img src=https://hubfs.example.org/small.png>'
+            '<img src="https://hubfs.example.org/wide.png" srcset="wide.png 1x">'
+        )
+        assert sorted(call.kwargs["name"] for call in uploader.call_args_list) == [
+            "small.png",
+            "wide-16w.png",
+            "wide-32w.png",
+            "wide.png",
+        ]
+        variant = next(
+            call.kwargs["source"] for call in uploader.call_args_list if call.kwargs["name"] == "wide-16w.png"
+        )
+        with Image.open(variant) as image:
+            assert image.size == (16, 4)
+    # The second run finds all variants in the cache directory.
+    assert optimizer.executor is None
+    assert metrics.caches["image-optimizer"] == {"hits": 8, "misses": 4}
+
+
+def test_image_translator_data_uri(tmp_path):
+    """
+    Embedded images are extracted into files, uploaded once per content, and replaced by their URLs.
+    """
+    content = make_png(4, 4)
+    uri = f"data:image/png;base64,{base64.b64encode(content).decode()}"
+    html = f'<img src="{uri}" alt="one"><img src="{uri}" alt="two"><img src="data:image/svg+xml,%3Csvg%2F%3E">'
+    uploader = Mock(side_effect=lambda source, name: Mock(url=f"https://hubfs.example.org/{name}"))
+
+    hit = HTMLImageTranslator(html=html, source_path=tmp_path, uploader=uploader)
+    hit.discover().process()
+
+    assert uploader.call_count == 2
+    png, svg = sorted((call.kwargs for call in uploader.call_args_list), key=lambda kwargs: kwargs["name"][-4:])
+    assert Path(png["source"]).read_bytes() == content
+    assert png["name"].startswith("embedded-") and png["name"].endswith(".png")
+    assert Path(svg["source"]).read_bytes() == b"<svg/>"
+    assert "data:" not in hit.html_out
+    assert hit.html_out.count(f"https://hubfs.example.org/{png['name']}") == 2
+
+
+def test_image_translator_data_uri_invalid(tmp_path, caplog):
+    """
+    Embedded content which is not an image, or can not be decoded, is left untouched.
+    """
+    (tmp_path / "foo.png").write_bytes(make_png(4, 4))
+    html = '<img src="data:text/plain,foo"><img src="data:image/png;base64,A"><img src="foo.png">'
+    uploader = Mock(side_effect=lambda source, name: Mock(url=f"https://hubfs.example.org/{name}"))
+
+    hit = HTMLImageTranslator(html=html, source_path=tmp_path, uploader=uploader)
+    hit.discover().process()
+
+    uploader.assert_called_once_with(source=str(tmp_path / "foo.png"), name="foo.png")
+    assert hit.html_out == (
+        '<img src="data:text/plain,foo"><img src="data:image/png;base64,A"><img src="https://hubfs.example.org/foo.png">'
+    )
+    assert "Leaving embedded image untouched: Embedded content is not an image: text/plain" in caplog.text
+
+
+def test_decode_data_uri():
+    assert decode_data_uri("data:image/gif;base64,R0lG") == ("image/gif", b"GIF")
+    assert decode_data_uri("data:,foo%20bar") == ("text/plain", b"foo bar")
+    with pytest.raises(ValueError):
+        decode_data_uri("data:image/gif;base64")
+    with pytest.raises(ValueError):
+        decode_data_uri("data:image/gif;base64,R0lG\u00e4")
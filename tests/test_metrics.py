@@ -0,0 +1,71 @@
+import json
+
+from click.testing import CliRunner
+
+from hubspot_tech_writing.cli import cli
+from hubspot_tech_writing.util.metrics import Histogram, Metrics
+
+from .test_hubspot_blogpost import response_simulator_update
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for value in [1, 2, 3, 20, 20, 20, 20, 20, 400, 1200]:
+        histogram.add(value)
+    assert histogram.count == 10
+    assert histogram.mean == 170.6
+    assert histogram.percentile(0.5) == 25
+    assert histogram.percentile(0.9) == 500
+    assert histogram.percentile(0.99) == 1200
+    assert histogram.to_dict()["buckets"]["le_5"] == 3
+
+
+def test_metrics_endpoint_label():
+    assert (
+        Metrics.endpoint("patch", "https://api.hubapi.com/cms/v3/blogs/posts/12345") == "PATCH /cms/v3/blogs/posts/{id}"
+    )
+    assert (
+        Metrics.endpoint("GET", "https://api.hubapi.com/files/v3/folders/%2Ffoo%2Fbar") == "GET /files/v3/folders/{id}"
+    )
+    assert Metrics.endpoint("GET", "https://api.hubapi.com/cms/v3/blogs/posts?name=foo") == "GET /cms/v3/blogs/posts"
+
+
+def test_metrics_disabled():
+    """
+    Collection is disabled by default.
+    """
+    metrics = Metrics()
+    metrics.record("GET", "https://api.hubapi.com/foo", duration=0.1)
+    metrics.cache("foo", hit=True)
+    assert metrics.to_dict()["calls"] == 0
+    assert metrics.to_dict()["caches"] == {}
+
+
+def test_metrics_cli_upload(hubspot_access_token, mocker, tmp_path):
+    """
+    CLI test: Invoke `hstw --metrics-file=metrics.json upload ...`, and verify metrics.
+    """
+    tmpfile = tmp_path / "foo.html"
+    tmpfile.write_text("<p>Franz jagt im komplett verwahrlosten Taxi quer durch Bayern.</p>")
+    metrics_file = tmp_path / "metrics.json"
+    mocker.patch("hubspot.cms.blogs.blog_posts.rest.RESTClientObject.request", response_simulator_update)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        args=f"--metrics-file={metrics_file} upload {tmpfile} --name=hstw-test --access-token={hubspot_access_token}",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+
+    data = json.loads(metrics_file.read_text())
+    assert data["calls"] == 2
+    assert data["endpoints"]["GET /cms/v3/blogs/posts"]["calls"] == 1
+    assert data["endpoints"]["PATCH /cms/v3/blogs/posts/{id}"]["calls"] == 1
+    assert data["endpoints"]["PATCH /cms/v3/blogs/posts/{id}"]["bytes_sent"] > 50
+    assert data["endpoints"]["PATCH /cms/v3/blogs/posts/{id}"]["latency_ms"]["count"] == 1
+    assert data["caches"]["blogpost-index"] == {"hits": 0, "misses": 1}
+    assert data["rate_limit"]["calls"] == 2
+
+    assert "PATCH /cms/v3/blogs/posts/{id}" in result.output
+    assert "Total: 2 calls" in result.output
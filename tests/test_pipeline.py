@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hubspot_tech_writing.util.pipeline import Pipeline
+
+
+def test_pipeline_dependencies():
+    """
+    Stages receive the results of the stages they depend on, and independent stages run concurrently.
+    """
+    barrier = threading.Barrier(2, timeout=5)
+
+    def concurrent(value):
+        barrier.wait()
+        return value
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pipeline = Pipeline(executor)
+        pipeline.stage("a", concurrent, "foo")
+        pipeline.stage("b", concurrent, "bar")
+        pipeline.stage("c", lambda prefix, a, b: f"{prefix}{a}{b}", "-", after=["a", "b"])
+        assert pipeline.result("c") == "-foobar"
+    assert sorted(pipeline.durations) == ["a", "b", "c"]
+
+
+def test_pipeline_failure():
+    """
+    When a stage fails, the stages depending on it fail without being invoked.
+    """
+    invoked = []
+
+    def fail():
+        raise ValueError("Stage failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pipeline = Pipeline(executor)
+        pipeline.stage("a", fail)
+        pipeline.stage("b", invoked.append, "b")
+        pipeline.stage("c", invoked.append, after=["a", "b"])
+        with pytest.raises(ValueError) as ex:
+            pipeline.result("c")
+        assert ex.match("Stage failed")
+    assert invoked == ["b"]
+
+    with pytest.raises(ValueError) as ex:
+        pipeline.stage("d", fail, after=["unknown"])
+    assert ex.match("Stage d depends on unknown stages: unknown")
+    with pytest.raises(ValueError) as ex:
+        pipeline.stage("a", fail)
+    assert ex.match("Stage already exists: a")
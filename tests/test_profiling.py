@@ -0,0 +1,136 @@
+import pstats
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from click.testing import CliRunner
+
+from hubspot_tech_writing.cli import cli
+from hubspot_tech_writing.util.profiling import Profiler, profiled, profiler
+
+
+def test_profiler_stages():
+    profiler = Profiler(enabled=True)
+    for _ in range(2):
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                time.sleep(0.01)
+    assert profiler.stages["outer"].calls == 2
+    assert profiler.stages["inner"].calls == 2
+    assert profiler.stages["outer"].wall >= profiler.stages["inner"].wall >= 0.02
+    # Sleeping does not consume CPU time.
+    assert profiler.stages["inner"].cpu < profiler.stages["inner"].wall
+
+    lines = profiler.summary().splitlines()
+    assert lines[0].split() == ["Stage", "Calls", "Wall", "s", "CPU", "s"]
+    assert lines[2].startswith("outer")
+    assert lines[3].startswith("inner")
+
+
+def test_profiler_disabled():
+    profiler = Profiler(enabled=False)
+    with profiler.stage("foo"):
+        pass
+    assert profiler.stages == {}
+
+
+def test_profiled_decorator():
+    @profiled("double")
+    def double(value: int) -> int:
+        return value * 2
+
+    assert double(21) == 42
+    assert "double" not in profiler.stages
+
+    profiler.start()
+    assert double(21) == 42
+    profiler.stop()
+    assert profiler.stages["double"].calls == 1
+
+
+def test_profiler_cprofile(tmp_path):
+    profiler = Profiler()
+    profiler.start(mode="cprofile")
+    sorted(range(1000), key=str)
+    profiler.stop(tmp_path / "hstw.prof")
+    assert "function calls" in profiler.summary()
+    assert pstats.Stats(str(tmp_path / "hstw.prof")).total_calls > 0
+
+
+def busy() -> int:
+    return sum(range(10000))
+
+
+def test_profiler_cprofile_threads(tmp_path):
+    """
+    Function calls within worker threads are profiled, too.
+    """
+    profiler = Profiler()
+    profiler.start(mode="cprofile")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(executor.map(lambda _: busy(), range(4))) == [49995000] * 4
+    profiler.stop(tmp_path / "hstw.prof")
+    calls = {function: stats[1] for (_, _, function), stats in pstats.Stats(str(tmp_path / "hstw.prof")).stats.items()}
+    assert calls["busy"] == 4
+    assert "busy" in profiler.summary(limit=100)
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 12), reason="Since Python 3.12, cProfile covers all threads itself")
+def test_profiler_cprofile_threads_stop():
+    """
+    Worker threads outliving the profiled run stop profiling, and new threads are not profiled.
+    """
+    profiler = Profiler()
+
+    def work():
+        with profiler.stage("work"):
+            busy()
+        return sys.getprofile()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        profiler.start(mode="cprofile")
+        assert executor.submit(work).result() is not None
+        profiler.stop()
+        assert threading._profile_hook is None
+        # The worker thread uninstalls its profiler on its next instrumented stage.
+        executor.submit(work).result()
+        assert executor.submit(sys.getprofile).result() is None
+    calls = {function: stats[1] for (_, _, function), stats in profiler.stats().stats.items()}
+    assert calls["busy"] == 1
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(work).result() is None
+
+
+def test_profiler_unknown_mode():
+    with pytest.raises(ValueError) as ex:
+        Profiler().start(mode="foo")
+    assert ex.match("Unknown profiling mode: foo")
+
+
+def test_profile_cli_convert(markdownfile):
+    """
+    CLI test: Invoke `hstw --profile convert ...`, and verify the stages are reported.
+    """
+    runner = CliRunner()
+    result = runner.invoke(cli, args=f"--profile convert '{markdownfile}'", catch_exceptions=False)
+    assert result.exit_code == 0
+    assert "Stage" in result.output
+    assert "convert" in result.output
+    assert "postprocess" in result.output
+    assert "function calls" not in result.output
+    assert not profiler.enabled
+
+
+def test_profile_cli_profile_file(markdownfile, tmp_path):
+    """
+    CLI test: Invoke `hstw --profile-file=hstw.prof convert ...`, and verify the profile is written.
+    """
+    profile_file = tmp_path / "hstw.prof"
+    runner = CliRunner()
+    result = runner.invoke(cli, args=f"--profile-file={profile_file} convert '{markdownfile}'", catch_exceptions=False)
+    assert result.exit_code == 0
+    assert "postprocess" in result.output
+    assert "function calls" in result.output
+    assert pstats.Stats(str(profile_file)).total_calls > 0
@@ -0,0 +1,134 @@
+import json
+import threading
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter
+from hubspot_tech_writing.util.ratelimit import RateLimiter, RateLimitExceeded, TokenBucket
+
+
+class ThrottlingServer(ThreadingHTTPServer):
+    """
+    Stand-in for the HubSpot API, responding with HTTP 429 to the first requests.
+    """
+
+    def __init__(self, throttle: int, headers: t.Dict[str, str]):
+        super().__init__(("127.0.0.1", 0), ThrottlingHandler)
+        self.throttle = throttle
+        self.throttle_headers = headers
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    server: ThrottlingServer
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            throttled = self.server.requests <= self.server.throttle
+        if throttled:
+            body = json.dumps({"status": "error", "errorType": "RATE_LIMIT"}).encode()
+            self.send_response(429)
+            for name, value in self.server.throttle_headers.items():
+                self.send_header(name, value)
+        else:
+            body = json.dumps({"total": 0, "results": []}).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def throttling_server(request):
+    throttle, headers = request.param
+    server = ThrottlingServer(throttle=throttle, headers=headers)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_token_bucket_delay():
+    now = [0.0]
+    bucket = TokenBucket(rate=2.0, capacity=2.0, clock=lambda: now[0])
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    now[0] = 10.0
+    assert bucket.reserve() == 0
+    bucket.pause(3.0)
+    assert bucket.reserve() == pytest.approx(3.0)
+
+
+@pytest.mark.parametrize("throttling_server", [(2, {"Retry-After": "0"})], indirect=True)
+def test_rate_limiter_retry_on_429(hubspot_access_token, throttling_server):
+    limiter = RateLimiter(backoff_base=0.01)
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=throttling_server.url, rate_limiter=limiter)
+
+    response = hsa.hs.files.files_api.do_search(name="foo")
+
+    assert response.results == []
+    assert throttling_server.requests == 3
+    assert limiter.stats.calls == 1
+    assert limiter.stats.throttled == 2
+    assert limiter.stats.retried == 2
+    assert limiter.stats.failed == 0
+
+
+@pytest.mark.parametrize("throttling_server", [(100, {"Retry-After": "0"})], indirect=True)
+def test_rate_limiter_retries_exhausted(hubspot_access_token, throttling_server):
+    limiter = RateLimiter(backoff_base=0.01, max_retries=2)
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=throttling_server.url, rate_limiter=limiter)
+
+    with pytest.raises(Exception) as ex:
+        hsa.hs.files.files_api.do_search(name="foo")
+
+    assert ex.value.status == 429
+    assert throttling_server.requests == 3
+    assert limiter.stats.failed == 1
+
+
+@pytest.mark.parametrize("throttling_server", [(1, {"X-HubSpot-RateLimit-Daily-Remaining": "0"})], indirect=True)
+def test_rate_limiter_daily_quota_exhausted(hubspot_access_token, throttling_server):
+    limiter = RateLimiter(backoff_base=0.01)
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=throttling_server.url, rate_limiter=limiter)
+
+    with pytest.raises(RateLimitExceeded):
+        hsa.hs.files.files_api.do_search(name="foo")
+    assert throttling_server.requests == 1
+
+
+@pytest.mark.parametrize("throttling_server", [(5, {"Retry-After": "0"})], indirect=True)
+def test_rate_limiter_concurrent(hubspot_access_token, throttling_server):
+    """
+    The rate limiter is shared by concurrent callers, and all calls eventually succeed.
+    """
+    limiter = RateLimiter(rate=200, burst=5, backoff_base=0.01)
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=throttling_server.url, rate_limiter=limiter)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: hsa.hs.files.files_api.do_search(name="foo"), range(20)))
+
+    assert len(results) == 20
+    assert limiter.stats.calls == 20
+    assert limiter.stats.throttled == 5
+    assert throttling_server.requests == 25
+
+
+def test_rate_limiter_shared_per_access_token():
+    assert RateLimiter.for_access_token("foo") is RateLimiter.for_access_token("foo")
+    assert RateLimiter.for_access_token("foo") is not RateLimiter.for_access_token("bar")
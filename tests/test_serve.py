@@ -0,0 +1,291 @@
+import contextlib
+import http.client
+import json
+import socket
+import threading
+import typing as t
+from unittest.mock import ANY
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+from hubspot_tech_writing.cli import cli
+from hubspot_tech_writing.serve import JobRunner, JobServer, UnixJobServer
+
+
+@contextlib.contextmanager
+def running(server: t.Union[JobServer, UnixJobServer]):
+    """
+    Serve jobs in a background thread, within a context.
+    """
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+@pytest.fixture
+def job_server():
+    """
+    Serve jobs on an ephemeral port.
+    """
+    with running(JobServer(JobRunner(), port=0)) as server:
+        yield server
+
+
+def authorization(server: JobServer) -> t.Dict[str, str]:
+    return {"Authorization": f"Bearer {server.token}"}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def test_serve_convert(job_server, markdownfile):
+    """
+    Convert documents given by path, and by content, reusing the same connection.
+    """
+    with requests.Session() as session:
+        session.headers.update(authorization(job_server))
+        response = session.post(f"{job_server.url}/convert", json={"source": str(markdownfile)})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ok"
+        assert data["duration"] > 0
+        assert "<h1" in data["result"]["html"]
+
+        response = session.post(f"{job_server.url}/convert", json={"text": "# Hello"})
+        assert response.status_code == 200
+        assert 'id="hello"' in response.json()["result"]["html"]
+
+        status = session.get(f"{job_server.url}/status").json()
+    assert status["completed"] == {"convert": 2}
+    assert status["failed"] == {}
+
+
+def test_serve_convert_concurrent(job_server):
+    """
+    Jobs are processed concurrently.
+    """
+
+    def submit(index: int) -> str:
+        response = requests.post(
+            f"{job_server.url}/convert",
+            json={"text": f"# Document {index}"},
+            headers=authorization(job_server),
+            timeout=10,
+        )
+        return response.json()["result"]["html"]
+
+    threads = []
+    results: t.Dict[int, str] = {}
+    for index in range(16):
+        thread = threading.Thread(target=lambda index=index: results.update({index: submit(index)}))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    assert all(f"Document {index}" in results[index] for index in range(16))
+    assert job_server.runner.completed["convert"] == 16
+
+
+def test_serve_errors(job_server, tmp_path):
+    url = job_server.url
+    headers = authorization(job_server)
+
+    response = requests.post(f"{url}/unknown", json={}, headers=headers, timeout=10)
+    assert response.status_code == 404
+    assert response.json()["message"] == "No route: POST /unknown"
+
+    response = requests.post(
+        f"{url}/convert", data=b"{foo", headers={**headers, "Content-Type": "application/json"}, timeout=10
+    )
+    assert response.status_code == 400
+    assert response.json()["message"].startswith("Invalid JSON")
+
+    response = requests.post(f"{url}/convert", json=["foo"], headers=headers, timeout=10)
+    assert response.status_code == 400
+    assert response.json()["message"] == "Job request must be a JSON object"
+
+    response = requests.post(
+        f"{url}/convert", json={"source": str(tmp_path / "unknown.md")}, headers=headers, timeout=10
+    )
+    assert response.status_code == 400
+    assert response.json()["message"].startswith("Source does not exist")
+
+    (tmp_path / "foo.unknown").write_text("foo")
+    response = requests.post(
+        f"{url}/convert", json={"source": str(tmp_path / "foo.unknown")}, headers=headers, timeout=10
+    )
+    assert response.status_code == 400
+    assert response.json()["message"] == "Unknown file type: .unknown"
+
+    response = requests.post(
+        f"{url}/upload", json={"source": str(tmp_path / "foo.unknown")}, headers=headers, timeout=10
+    )
+    assert response.status_code == 400
+    assert response.json()["message"].startswith("Job needs an `access_token`")
+
+    assert requests.get(f"{url}/status", headers=headers, timeout=10).json()["failed"] == {"convert": 2, "upload": 1}
+
+
+def test_serve_rejected(job_server):
+    """
+    Requests without the secret token, and requests from web browsers, are rejected, before running jobs.
+    """
+    url = job_server.url
+    headers = authorization(job_server)
+    job = {"text": "# Hello"}
+
+    response = requests.post(f"{url}/convert", json=job, timeout=10)
+    assert response.status_code == 401
+    response = requests.post(f"{url}/convert", json=job, headers={"Authorization": "Bearer foo"}, timeout=10)
+    assert response.status_code == 401
+    assert requests.get(f"{url}/status", timeout=10).status_code == 401
+
+    # Simple cross-origin requests, which don't need a preflight request.
+    response = requests.post(f"{url}/convert", data=json.dumps(job), headers=headers, timeout=10)
+    assert response.status_code == 415
+    response = requests.post(
+        f"{url}/convert", data=json.dumps(job), headers={**headers, "Content-Type": "text/plain"}, timeout=10
+    )
+    assert response.status_code == 415
+
+    response = requests.post(
+        f"{url}/convert", json=job, headers={**headers, "Origin": "https://example.org"}, timeout=10
+    )
+    assert response.status_code == 403
+    assert response.json()["message"] == "Cross-origin requests are not allowed"
+
+    # DNS rebinding.
+    response = requests.post(
+        f"{url}/convert", json=job, headers={**headers, "Host": "attacker.example.org:8765"}, timeout=10
+    )
+    assert response.status_code == 403
+    assert response.json()["message"] == "Host not allowed: attacker.example.org:8765"
+
+    response = requests.post(
+        f"{url}/convert", json=job, headers={**headers, "Host": f"localhost:{job_server.server_address[1]}"}, timeout=10
+    )
+    assert response.status_code == 200
+    assert job_server.runner.completed["convert"] == 1
+    assert job_server.runner.failed == {}
+
+
+@pytest.mark.parametrize(
+    "length,authorized,status",
+    [
+        ("1000000000000", False, 401),
+        ("1000000000000", True, 413),
+        ("foo", True, 400),
+        ("-1", True, 400),
+    ],
+)
+def test_serve_content_length(job_server, length, authorized, status):
+    """
+    Requests are checked before reading their body, which is limited in size.
+    """
+    host, port = job_server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        connection.putrequest("POST", "/convert")
+        connection.putheader("Content-Type", "application/json")
+        connection.putheader("Content-Length", length)
+        if authorized:
+            connection.putheader("Authorization", f"Bearer {job_server.token}")
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == status
+        assert response.getheader("Connection") == "close"
+    finally:
+        connection.close()
+    assert job_server.runner.completed == {}
+
+
+def test_serve_token_file(tmp_path):
+    path = tmp_path / "hstw.token"
+    server = JobServer(JobRunner(), port=0, token="secret")  # noqa: S106
+    try:
+        assert server.write_token(path) == path
+        assert path.read_text() == "secret\n"
+        assert oct(path.stat().st_mode & 0o777) == "0o600"
+    finally:
+        server.server_close()
+    # Each server generates its own token.
+    servers = [JobServer(JobRunner(), port=0) for _ in range(2)]
+    try:
+        assert servers[0].token != servers[1].token
+    finally:
+        for server in servers:
+            server.server_close()
+
+
+def test_serve_upload(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    Upload documents, reusing the resident HubSpot client and blog post index between jobs.
+    """
+    tmpfile = tmp_path / "hstw-serve.html"
+    tmpfile.write_text("<p>Hello</p>")
+    runner = JobRunner(access_token=hubspot_access_token, host=hubspot_server.url)
+    with running(JobServer(runner, port=0)) as server:
+        job = {"source": str(tmpfile), "content_group_id": "42"}
+        for _ in range(3):
+            response = requests.post(f"{server.url}/upload", json=job, headers=authorization(server), timeout=10)
+            assert response.status_code == 200
+            assert response.json()["result"] == {"id": ANY, "name": "hstw-serve", "url": ANY}
+
+    assert len(runner.portals) == 1
+    assert len(hubspot_server.posts) == 1
+    assert hubspot_server.requests["create_post"] == 1
+    assert hubspot_server.requests["update_post"] == 3
+    # The blog post is only looked up by name once.
+    assert hubspot_server.requests["search_posts"] == 1
+
+
+def test_serve_unix_socket(tmp_path):
+    path = tmp_path / "hstw.sock"
+    path.touch()
+    with pytest.raises(OSError):
+        # Only stale sockets are replaced, no other files.
+        UnixJobServer(JobRunner(), path=path)
+    path.unlink()
+
+    with running(UnixJobServer(JobRunner(), path=path)):
+        assert oct(path.stat().st_mode & 0o777) == "0o600"
+        connection = UnixHTTPConnection(str(path))
+        connection.request(
+            "POST", "/convert", body=json.dumps({"text": "# Hello"}), headers={"Content-Type": "application/json"}
+        )
+        response = connection.getresponse()
+        assert response.status == 200
+        assert 'id="hello"' in json.loads(response.read())["result"]["html"]
+        connection.close()
+    assert not path.exists()
+
+
+def test_serve_cli(mocker):
+    serve = mocker.patch("hubspot_tech_writing.cli.serve")
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        args="serve --socket=hstw.sock --workers=8 --compress",
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    serve.assert_called_once_with(ANY, host="127.0.0.1", port=8765, socket_path="hstw.sock", token_path=None)
+    job_runner = serve.call_args.args[0]
+    assert job_runner.workers == 8
+    assert job_runner.compress is True
+    assert job_runner.manifest is True
+    assert job_runner.access_token is None
@@ -0,0 +1,352 @@
+import hubspot
+import pytest
+
+from hubspot_tech_writing import core
+from hubspot_tech_writing.core import Portal, publish, upload
+from hubspot_tech_writing.hubspot_api import HubSpotAdapter, HubSpotFile
+from hubspot_tech_writing.testing import FakeHubSpotServer, Faults
+from hubspot_tech_writing.testing.loadtest import make_png, run_loadtest
+from hubspot_tech_writing.testing.memory import MEGABYTE, run_benchmark
+from hubspot_tech_writing.testing.server import parse_multipart
+from hubspot_tech_writing.util.image import ImageOptimizer
+from hubspot_tech_writing.util.metrics import Metrics, metrics
+from hubspot_tech_writing.util.multipart import MultipartFile
+from hubspot_tech_writing.util.ratelimit import RateLimiter
+from hubspot_tech_writing.util.store import UploadManifest
+
+
+@pytest.fixture
+def document(tmp_path):
+    (tmp_path / "image-1.png").write_bytes(make_png(4, 4, seed=1))
+    (tmp_path / "image-2.png").write_bytes(make_png(4, 4, seed=2))
+    path = tmp_path / "document.md"
+    path.write_text("# Foobar\n\n![One](image-1.png)\n![Two](image-2.png)\n")
+    return path
+
+
+def test_server_upload_document(hubspot_access_token, hubspot_server, document):
+    """
+    Upload a document with images, and verify the stand-in server stored them.
+    """
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    post = upload(
+        access_token=hubspot_access_token,
+        source=document,
+        name="hstw-test",
+        content_group_id="42",
+        folder_path="/blog/test",
+        hubspot_adapter=hsa,
+    )
+    assert post.name == "hstw-test"
+    assert f"{hubspot_server.url}/hubfs/blog/test/image-1.png" in post.post_body
+    assert sorted(file["path"] for file in hubspot_server.files.values()) == [
+        "/blog/test/image-1.png",
+        "/blog/test/image-2.png",
+    ]
+    assert len(hubspot_server.posts) == 1
+    assert hubspot_server.requests["upload_file"] == 2
+    assert hubspot_server.requests["create_post"] == 1
+
+    # Uploading again finds existing files and blog post, and updates them.
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    upload(
+        access_token=hubspot_access_token,
+        source=document,
+        name="hstw-test",
+        folder_path="/blog/test",
+        hubspot_adapter=hsa,
+    )
+    assert len(hubspot_server.files) == 2
+    assert len(hubspot_server.posts) == 1
+    assert hubspot_server.requests["upload_file"] == 2
+    assert hubspot_server.requests["search_files"] == 1
+    assert hubspot_server.requests["update_post"] == 2
+
+
+def test_server_upload_responsive_images(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    Upload a document with variants of its image, and verify re-publishing does not upload them again.
+    """
+    (tmp_path / "image.png").write_bytes(make_png(64, 16, seed=1))
+    document = tmp_path / "document.md"
+    document.write_text("# Foobar\n\n![Wide](image.png)\n")
+    manifest = UploadManifest.for_access_token(hubspot_access_token)
+
+    for _ in range(2):
+        with ImageOptimizer(max_width=48, directory=tmp_path / "optimized", widths=[16, 32]) as optimizer:
+            post = upload(
+                access_token=hubspot_access_token,
+                source=document,
+                name="hstw-test",
+                content_group_id="42",
+                folder_path="/blog/test",
+                manifest=manifest,
+                hubspot_adapter=HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url),
+                optimizer=optimizer,
+            )
+        url = f"{hubspot_server.url}/hubfs/blog/test"
+        assert f'srcset="{url}/image-16w.png 16w, {url}/image-32w.png 32w, {url}/image.png 48w"' in post.post_body
+        assert 'sizes="100vw"' in post.post_body
+    assert sorted(file["path"] for file in hubspot_server.files.values()) == [
+        "/blog/test/image-16w.png",
+        "/blog/test/image-32w.png",
+        "/blog/test/image.png",
+    ]
+    assert hubspot_server.requests["upload_file"] == 3
+
+
+def test_server_paginate_and_delete(hubspot_access_token, hubspot_server, monkeypatch):
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    for number in range(5):
+        hubspot_server.create_post({"name": f"hstw-test-{number}", "contentGroupId": "42"})
+    hubspot_server.create_post({"name": "other", "contentGroupId": "43"})
+
+    assert len(list(hsa.iter_blogposts(page_size=2, contentGroupId="42"))) == 5
+    assert hubspot_server.requests["search_posts"] == 3
+
+    monkeypatch.setenv("CONFIRM", "yes")
+    deleted = hsa.delete_blogposts(hsa.find_blogposts(name_pattern="hstw-test-*"))
+    assert len(deleted) == 5
+    assert [post["name"] for post in hubspot_server.posts.values()] == ["other"]
+
+    with pytest.raises(hubspot.cms.blogs.blog_posts.exceptions.NotFoundException):
+        hsa.hs.cms.blogs.blog_posts.basic_api.get_by_id(deleted[0].id)
+
+
+def test_server_manifest_deleted_files(hubspot_access_token, hubspot_server, tmp_path, mocker, monkeypatch):
+    """
+    Deleted files are removed from the upload manifest, and uploaded again.
+    """
+    (tmp_path / "image-1.png").write_bytes(make_png(4, 4, seed=1))
+    (tmp_path / "image-2.png").write_bytes(make_png(4, 4, seed=2))
+    monkeypatch.setenv("CONFIRM", "yes")
+    mocker.patch.object(
+        core,
+        "HubSpotAdapter",
+        side_effect=lambda access_token: HubSpotAdapter(access_token=access_token, host=hubspot_server.url),
+    )
+
+    def run(name: str):
+        return upload(
+            access_token=hubspot_access_token,
+            source=tmp_path / name,
+            name=name,
+            folder_path="/blog/images",
+            manifest=UploadManifest.for_access_token(hubspot_access_token),
+            hubspot_adapter=HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url),
+        )
+
+    run("image-1.png")
+    second = run("image-2.png")
+    assert hubspot_server.requests["upload_file"] == 2
+
+    # Files deleted using `hstw delete files` are removed from the manifest right away.
+    core.delete_files(
+        access_token=hubspot_access_token,
+        path_prefix="/blog/images",
+        name_pattern="image-1*",
+        manifest=UploadManifest.for_access_token(hubspot_access_token),
+    )
+    assert [entry.id for entry in UploadManifest.for_access_token(hubspot_access_token).entries.values()] == [
+        str(second.id)
+    ]
+
+    # Files deleted otherwise are found missing when uploading them again.
+    hubspot_server.archive_file(str(second.id))
+    third = run("image-1.png")
+    fourth = run("image-2.png")
+    assert hubspot_server.requests["upload_file"] == 4
+    assert str(fourth.id) != str(second.id)
+    entries = UploadManifest.for_access_token(hubspot_access_token).entries.values()
+    assert sorted(entry.id for entry in entries) == sorted([str(third.id), str(fourth.id)])
+
+    # Files which still exist are skipped.
+    run("image-1.png")
+    assert hubspot_server.requests["upload_file"] == 4
+
+
+@pytest.mark.parametrize("hubspot_server", [Faults(throttle_rate=0.3, retry_after=0, seed=42)], indirect=True)
+def test_server_throttle(hubspot_access_token, hubspot_server, document):
+    """
+    Throttled requests, including file uploads, are retried by the rate limiter.
+    """
+    limiter = RateLimiter(backoff_base=0.01)
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url, rate_limiter=limiter)
+    upload(
+        access_token=hubspot_access_token,
+        source=document,
+        name="hstw-test",
+        content_group_id="42",
+        folder_path="/blog/test",
+        hubspot_adapter=hsa,
+    )
+    assert hubspot_server.status[429] > 0
+    assert limiter.stats.retried == hubspot_server.status[429]
+    assert limiter.stats.failed == 0
+    assert all(hubspot_server.contents.values())
+
+
+@pytest.mark.parametrize("hubspot_server", [Faults(rate_limit=3, rate_limit_interval=0.2)], indirect=True)
+def test_server_rate_limit_headers(hubspot_access_token, hubspot_server):
+    """
+    The rate limiter backs off proactively when the server reports the rate limit window is exhausted.
+    """
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url)
+    for _ in range(7):
+        assert list(hsa.iter_folders(path="/blog")) == []
+    assert hubspot_server.status == {200: 7}
+
+
+def test_loadtest():
+    result = run_loadtest(documents=3, images=2, image_size=512, concurrency=2)
+    assert result.failed == 0
+    assert result.images == 6
+    assert result.requests == result.metrics.to_dict()["calls"]
+    assert "Throughput:" in result.summary()
+
+
+def test_multipart_file(tmp_path):
+    """
+    A streamed multipart body is well-formed, has the announced length, and can be iterated again.
+    """
+    path = tmp_path / "image.png"
+    path.write_bytes(make_png(64, 64))
+    body = MultipartFile(fields=[("fileName", "foo.png")], name="file", path=path, chunk_size=1000)
+    for _ in range(2):
+        data = b"".join(body)
+        assert len(data) == len(body)
+        form = parse_multipart(body.content_type, data)
+        assert form["fileName"] == (None, b"foo.png")
+        assert form["file"] == ("image.png", path.read_bytes())
+
+
+@pytest.mark.parametrize("hubspot_server", [Faults(throttle_rate=0.3, retry_after=0, seed=42)], indirect=True)
+def test_server_streaming_upload(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    Files larger than the threshold are streamed from disk, also when retrying throttled requests.
+    """
+    path = tmp_path / "image.png"
+    path.write_bytes(make_png(64, 64, seed=1))
+    metrics = Metrics(enabled=True)
+    hsa = HubSpotAdapter(
+        access_token=hubspot_access_token,
+        host=hubspot_server.url,
+        rate_limiter=RateLimiter(backoff_base=0.01),
+        metrics=metrics,
+    )
+    hsa.STREAMING_THRESHOLD = 0
+
+    for _ in range(3):
+        file = HubSpotFile(hubspot_adapter=hsa, source=str(path), name="foo.png", folder_path="/blog/test")
+    assert hubspot_server.contents[file.identifier] == path.read_bytes()
+    assert len(hubspot_server.files) == 1
+
+    path.write_bytes(make_png(64, 64, seed=2))
+    file.save()
+    assert hubspot_server.contents[file.identifier] == path.read_bytes()
+    assert hubspot_server.status[429] > 0
+
+    sent = sum(endpoint["bytes_sent"] for endpoint in metrics.to_dict()["endpoints"].values())
+    assert sent > 2 * path.stat().st_size
+
+
+def test_memory_benchmark():
+    """
+    Streaming uploads keep the client memory usage well below the file size.
+    """
+    streaming, buffered = run_benchmark(size=8 * MEGABYTE)
+    assert streaming.peak < 4 * MEGABYTE
+    assert buffered.peak > 8 * MEGABYTE
+    assert "peak client memory" in streaming.summary()
+
+
+def test_server_publish_portals(hubspot_server, document, mocker):
+    """
+    Publish a document to two portals, converting it only once, and using separate manifests and rate limiters.
+    """
+    to_html = mocker.patch("hubspot_tech_writing.core.to_html", wraps=core.to_html)
+    with FakeHubSpotServer() as other_server:
+        portals = []
+        for access_token, server in [("pat-staging", hubspot_server), ("pat-production", other_server)]:
+            portals.append(
+                Portal(
+                    access_token=access_token,
+                    manifest=UploadManifest.for_access_token(access_token),
+                    hubspot_adapter=HubSpotAdapter(access_token=access_token, host=server.url),
+                )
+            )
+        results = publish(
+            portals=portals, sources=[document], name="hstw-test", content_group_id="42", folder_path="/blog/test"
+        )
+        assert sorted(results) == sorted(portal.label for portal in portals)
+        assert to_html.call_count == 1
+        for server in [hubspot_server, other_server]:
+            assert len(server.posts) == 1
+            assert len(server.files) == 2
+            assert f"{server.url}/hubfs/blog/test/image-1.png" in next(iter(server.posts.values()))["postBody"]
+        assert portals[0].hubspot_adapter.rate_limiter is not portals[1].hubspot_adapter.rate_limiter  # type: ignore[union-attr]
+        assert [len(portal.manifest.entries) for portal in portals] == [2, 2]  # type: ignore[union-attr]
+        assert portals[0].manifest.path != portals[1].manifest.path  # type: ignore[union-attr]
+
+
+def test_server_publish_portals_failure(hubspot_server, document):
+    """
+    A failing portal does not stop publishing to the others.
+    """
+    portals = [
+        Portal(access_token=access_token, hubspot_adapter=HubSpotAdapter(access_token=access_token, host=url))
+        for access_token, url in [("pat-good", hubspot_server.url), ("pat-bad", "http://127.0.0.1:9")]
+    ]
+    results = publish(portals=portals, sources=[document], name="hstw-test", content_group_id="42")
+    assert list(results) == [portals[0].label]
+    assert len(hubspot_server.posts) == 1
+
+
+def test_server_publish_portals_duplicate(hubspot_server, document):
+    portals = [Portal(access_token=access_token) for access_token in ["pat-same", "pat-same"]]
+    with pytest.raises(ValueError) as ex:
+        publish(portals=portals, sources=[document], name="hstw-test", content_group_id="42")
+    assert ex.match("Publishing to the same portal multiple times is not supported")
+    assert hubspot_server.total_requests == 0
+
+
+def test_server_compression(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    Large blog post updates are sent gzip-compressed, and the bytes saved are recorded.
+    """
+    metrics.enabled = True
+    source = tmp_path / "long.md"
+    source.write_text("# Long\n\n" + "```python\nprint('Hello, world.')\n```\n\n" * 500)
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url, compression=True)
+    post = upload(
+        access_token=hubspot_access_token, source=source, name="long", content_group_id="42", hubspot_adapter=hsa
+    )
+    assert post.post_body.count("Hello, world.") == 500
+    assert hubspot_server.encodings == {"gzip": 1}
+    assert next(iter(hubspot_server.posts.values()))["postBody"] == post.post_body
+
+    data = metrics.to_dict()
+    update = data["endpoints"]["PATCH /cms/v3/blogs/posts/{id}"]
+    assert update["bytes_saved"] > 0
+    assert update["bytes_sent"] + update["bytes_saved"] > len(post.post_body)
+    assert data["endpoints"]["POST /cms/v3/blogs/posts"]["bytes_saved"] == 0
+    assert data["bytes_saved"] == update["bytes_saved"]
+    assert "Compression: saved" in metrics.summary()
+
+
+def test_server_compression_rejected(hubspot_access_token, hubspot_server, tmp_path):
+    """
+    When the server rejects compressed requests, they are sent uncompressed.
+    """
+    hubspot_server.compression = False
+    source = tmp_path / "long.md"
+    source.write_text("# Long\n\n" + "Lorem ipsum dolor sit amet.\n\n" * 500)
+    hsa = HubSpotAdapter(access_token=hubspot_access_token, host=hubspot_server.url, compression=True)
+    for _ in range(2):
+        post = upload(
+            access_token=hubspot_access_token, source=source, name="long", content_group_id="42", hubspot_adapter=hsa
+        )
+        assert post.post_body.count("Lorem ipsum") == 500
+    assert hsa.compression is False
+    assert hubspot_server.encodings == {"gzip": 1}
+    assert hubspot_server.status[415] == 1